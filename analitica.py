@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# Análisis de viajes finalizados sobre arreglos datetime64: todo se calcula por
+# columnas y con groupby, sin recorrer filas, para que un año entero tome milisegundos.
+
+# Eslabón -> (hora de fin, hora de inicio)
+TRAMOS = {
+    "Duracion Cargue": ("hora_fin_cargue", "hora_inicio_cargue"),
+    "Transito": ("hora_llegada_planta", "hora_inicio_transito"),
+    "Espera Planta": ("hora_ingreso_planta", "hora_llegada_planta"),
+    "Inicio Descarga": ("hora_inicio_descarga", "hora_ingreso_planta"),
+    "Duracion Descarga": ("hora_fin_descarga", "hora_inicio_descarga"),
+}
+# Además de los eslabones: el viaje de punta a punta y el ciclo del camión
+# (de un inicio de cargue al siguiente del mismo camión en la jornada)
+TOTALES = ["Viaje completo", "Ciclo camion"]
+MEDIDAS = list(TRAMOS) + TOTALES
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+_MINUTO = np.timedelta64(1, "m")
+
+
+def _horas(viajes, columna):
+    return viajes[columna].to_numpy(dtype="datetime64[ns]")
+
+
+def duraciones(viajes):
+    """Minutos de cada eslabón, del viaje completo y del ciclo del camión, una fila por viaje."""
+    resultado = {nombre: (_horas(viajes, fin) - _horas(viajes, inicio)) / _MINUTO for nombre, (fin, inicio) in TRAMOS.items()}
+    inicio = _horas(viajes, "hora_inicio_cargue")
+    resultado["Viaje completo"] = (_horas(viajes, "hora_fin_descarga") - inicio) / _MINUTO
+
+    # Ciclo: se ordena por jornada, camión e inicio y se resta el inicio siguiente del mismo grupo
+    jornada = viajes["id_jornada"].to_numpy()
+    placa = pd.factorize(viajes["placa"])[0]
+    orden = np.lexsort((inicio, placa, jornada))
+    ciclo = np.full(len(viajes), np.nan)
+    if len(viajes) > 1:
+        mismo = (jornada[orden][1:] == jornada[orden][:-1]) & (placa[orden][1:] == placa[orden][:-1])
+        pasos = (inicio[orden][1:] - inicio[orden][:-1]) / _MINUTO
+        ciclo[orden[:-1]] = np.where(mismo, pasos, np.nan)
+    resultado["Ciclo camion"] = ciclo
+    return pd.DataFrame(resultado, index=viajes.index)
+
+
+def percentiles(dur):
+    """p50/p90/p99, promedio y cantidad de viajes de cada medida."""
+    tabla = dur[MEDIDAS].quantile(list(PERCENTILES.values())).T
+    tabla.columns = list(PERCENTILES)
+    tabla["promedio"] = dur[MEDIDAS].mean()
+    tabla["viajes"] = dur[MEDIDAS].count()
+    return tabla.round(1)
+
+
+def cuello_de_botella(tabla):
+    """Eslabón con la mayor mediana, su peso en el viaje y el más variable (p90 - p50)."""
+    eslabones = tabla.loc[list(TRAMOS)].dropna(subset=["p50"])
+    if eslabones.empty:
+        return None
+    mayor = eslabones["p50"].idxmax()
+    dispersion = eslabones["p90"] - eslabones["p50"]
+    return {
+        "eslabon": mayor,
+        "p50": float(eslabones.at[mayor, "p50"]),
+        "participacion": float(eslabones.at[mayor, "p50"] / eslabones["p50"].sum()),
+        "mas_variable": dispersion.idxmax(),
+        "dispersion": float(dispersion.max()),
+    }
+
+
+def rendimiento_por_hora(viajes):
+    """Viajes terminados por hora y jornada, y el promedio y pico de cada jornada."""
+    hora = viajes["hora_fin_descarga"].dt.floor("h")
+    por_hora = (
+        viajes.assign(hora=hora).dropna(subset=["hora"])
+        .groupby(["id_jornada", "hora"]).size().rename("viajes").reset_index()
+    )
+    agrupado = por_hora.groupby("id_jornada")
+    horas = (agrupado["hora"].max() - agrupado["hora"].min()) / np.timedelta64(1, "h") + 1
+    por_jornada = pd.DataFrame({
+        "viajes": agrupado["viajes"].sum(),
+        "horas": horas,
+        "viajes/hora": agrupado["viajes"].sum() / horas,
+        "pico/hora": agrupado["viajes"].max(),
+    }).round(2)
+    return por_hora, por_jornada
+
+
+def comparar_barcos(viajes, dur):
+    """Viajes, mediana de cada eslabón y p90 del viaje completo por barco."""
+    grupos = dur.groupby(viajes["barco"])
+    tabla = grupos[list(TRAMOS)].median()
+    tabla.insert(0, "viajes", grupos.size())
+    tabla["Viaje completo p90"] = grupos["Viaje completo"].quantile(0.9)
+    tabla["Ciclo camion p50"] = grupos["Ciclo camion"].median()
+    return tabla.round(1)
+
+
+def analizar(viajes):
+    """Todo el análisis de un conjunto de viajes finalizados (ver datos.viajes_finalizados)."""
+    dur = duraciones(viajes)
+    tabla = percentiles(dur)
+    por_hora, por_jornada = rendimiento_por_hora(viajes)
+    return {
+        "viajes": len(viajes),
+        "percentiles": tabla,
+        "cuello": cuello_de_botella(tabla),
+        "por_hora": por_hora,
+        "por_jornada": por_jornada,
+        "por_barco": comparar_barcos(viajes, dur),
+    }
@@ -0,0 +1,359 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+import db
+import migraciones
+import retencion
+from db import conexion
+
+# Banco de pruebas de carga: siembra temporadas sintéticas y recorre la app sin
+# navegador (AppTest) como lo haría el personal en el muelle.
+#
+#   python benchmark.py sembrar --descargas 60 --jornadas 3 --viajes 40
+#   python benchmark.py correr --sesiones 4 --viajes 3 --json base.json
+#   python benchmark.py limpiar
+#   python benchmark.py arranque             # prueba de arranque en frío (tests/test_arranque.py)
+#
+# Usa la base configurada en .env / DB_BACKEND; solo toca filas con clave BENCH-.
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "App.py")
+PREFIJO = "BENCH"
+
+# Minutos (mínimo, máximo) de cada tramo de un viaje sintético
+TRAMOS = [
+    ("hora_fin_cargue", 20, 40),
+    ("hora_llegada_planta", 15, 30),
+    ("hora_ingreso_planta", 5, 60),
+    ("hora_inicio_descarga", 2, 10),
+    ("hora_fin_descarga", 15, 30),
+]
+
+
+# ==== Datos sintéticos ====
+
+def sembrar(descargas=20, jornadas=3, viajes=40, temperaturas=30, semilla=1):
+    """Crea ``descargas`` con sus jornadas cerradas, viajes finalizados y lecturas."""
+    azar = random.Random(semilla)
+    placas = [f"BNK{n:03d}" for n in range(30)]
+    hoy = date.today()
+    totales = {"descargas": 0, "jornadas": 0, "viajes": 0, "temperaturas": 0}
+    for d in range(descargas):
+        barco = f"{PREFIJO}-B{d % 5:02d}"
+        fecha = hoy - timedelta(days=d)
+        lote = f"L{d}"
+        clave = f"{barco}-{fecha.strftime('%Y%m%d')}-{lote}"
+        with conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO descargas (clave, barco, lote, fecha) VALUES (%s, %s, %s, %s) ON CONFLICT (clave) DO NOTHING",
+                (clave, barco, lote, fecha),
+            )
+            for j in range(jornadas):
+                inicio = datetime.combine(fecha, datetime.min.time()) + timedelta(hours=6 + 8 * j)
+                cursor.execute("""
+                    INSERT INTO jornadas (clave_descarga, fecha, hora_inicio, hora_fin, ultimo_consecutivo)
+                    VALUES (%s, %s, %s, %s, %s) RETURNING id
+                """, (clave, fecha, inicio, inicio + timedelta(hours=8), viajes))
+                id_jornada = cursor.fetchone()[0]
+
+                filas = []
+                for v in range(viajes):
+                    horas = [inicio + timedelta(minutes=10 * v)]
+                    for _, minimo, maximo in TRAMOS:
+                        horas.append(horas[-1] + timedelta(minutes=azar.randint(minimo, maximo)))
+                    # hora_inicio_transito coincide con hora_fin_cargue
+                    filas.append((clave, id_jornada, f"V{v + 1:03d}", azar.choice(placas), "FINALIZADO",
+                                  horas[0], horas[1], horas[1], *horas[2:]))
+                if filas:
+                    db.insertar_filas(cursor, """
+                        INSERT INTO viajes (clave_descarga, id_jornada, consecutivo, placa, estado,
+                            hora_inicio_cargue, hora_fin_cargue, hora_inicio_transito, hora_llegada_planta,
+                            hora_ingreso_planta, hora_inicio_descarga, hora_fin_descarga)
+                        VALUES %s
+                    """, filas)
+
+                lecturas = [
+                    (inicio + timedelta(minutes=15 * t), f"B{azar.randint(1, 6)}", azar.choice(["YELLOWFIN", "SKIPJACK"]),
+                     azar.choice(["3-4", "4-5", "5-7.5"]), round(azar.uniform(-20, -5), 1), "Puerto", clave, id_jornada)
+                    for t in range(temperaturas)
+                ]
+                if lecturas:
+                    db.insertar_filas(cursor, """
+                        INSERT INTO temperaturas
+                        (hora_medicion, bodega, especie, talla, temperatura, lugar, clave_descarga, id_jornada)
+                        VALUES %s
+                    """, lecturas)
+                totales["jornadas"] += 1
+                totales["viajes"] += len(filas)
+                totales["temperaturas"] += len(lecturas)
+        totales["descargas"] += 1
+    return totales
+
+
+def limpiar():
+    """Borra todo lo sembrado o creado por el banco de pruebas."""
+    with conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT clave FROM descargas WHERE clave LIKE %s", (f"{PREFIJO}-%",))
+        claves = [fila[0] for fila in cursor.fetchall()]
+    # Incluye las descargas con jornada abierta que dejan las sesiones simuladas
+    return retencion.purgar(claves, pausa=0)
+
+
+# ==== Medición ====
+# Contadores del proceso; cada sesión simulada corre en su propio proceso. Con
+# DB_BACKEND=sqlite incluyen también lo que hace el sincronizador de ese proceso.
+
+MEDICION = {"consultas": 0, "bytes_bd": 0, "bytes_navegador": 0}
+
+
+def _tamano(filas):
+    # Aproximación del tráfico: tamaño en texto de los valores recibidos
+    return sum(len(str(v)) for fila in filas for v in fila if v is not None)
+
+
+def _contar(clase):
+    """Subclase de ``clase`` que cuenta sentencias y bytes leídos en MEDICION."""
+
+    class Medido(clase):
+        def execute(self, sql, params=None):
+            MEDICION["consultas"] += 1
+            return super().execute(sql, params)
+
+        def executemany(self, sql, filas):
+            MEDICION["consultas"] += 1
+            return super().executemany(sql, filas)
+
+        def _original(self, nombre):
+            # CursorSQLite no define los fetch*: los delega al cursor de sqlite3
+            metodo = getattr(clase, nombre, None)
+            return metodo.__get__(self) if metodo else getattr(self._cursor, nombre)
+
+        def fetchone(self):
+            fila = self._original("fetchone")()
+            if fila is not None:
+                MEDICION["bytes_bd"] += _tamano([fila])
+            return fila
+
+        def fetchmany(self, *args):
+            filas = self._original("fetchmany")(*args)
+            MEDICION["bytes_bd"] += _tamano(filas)
+            return filas
+
+        def fetchall(self):
+            filas = self._original("fetchall")()
+            MEDICION["bytes_bd"] += _tamano(filas)
+            return filas
+
+    return Medido
+
+
+def _instrumentar():
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    parametros = db._parametros
+    cursor_pg = _contar(db.CursorPostgres)
+    db._parametros = lambda: dict(parametros(), cursor_factory=cursor_pg)
+    db.CursorSQLite = _contar(db.CursorSQLite)
+
+    # Lo que se enviaría al navegador: tamaño de los mensajes de cada rerun
+    correr = LocalScriptRunner.run
+
+    def run(self, *args, **kwargs):
+        arbol = correr(self, *args, **kwargs)
+        MEDICION["bytes_navegador"] += sum(m.ByteSize() for m in self.forward_msgs())
+        return arbol
+
+    LocalScriptRunner.run = run
+
+
+# ==== Sesión simulada ====
+
+class Sesion:
+    """Una pestaña de la app manejada con AppTest; mide cada rerun."""
+
+    def __init__(self, numero, timeout=120):
+        from streamlit.testing.v1 import AppTest
+
+        self.numero = numero
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.registros = []
+
+    def paso(self, etiqueta, preparar=None):
+        if preparar:
+            preparar(self.at)
+        antes = dict(MEDICION)
+        inicio = time.perf_counter()
+        self.at.run()
+        ms = (time.perf_counter() - inicio) * 1000
+        if self.at.exception:
+            raise RuntimeError(f"{etiqueta}: {self.at.exception[0].message}")
+        self.registros.append({
+            "sesion": self.numero,
+            "etiqueta": etiqueta,
+            "ms": ms,
+            **{k: MEDICION[k] - antes[k] for k in MEDICION},
+        })
+
+    def ir(self, seccion):
+        self.paso(f"{seccion}: abrir", lambda at: at.radio(key="seccion").set_value(seccion))
+
+    def boton(self, prefijo):
+        return next(b for b in self.at.button if b.key and b.key.startswith(prefijo))
+
+    def elegir(self, etiqueta, indice, contiene):
+        def preparar(at):
+            caja = at.selectbox[indice]
+            caja.set_value(next(o for o in caja.options if contiene in str(o)))
+        self.paso(etiqueta, preparar)
+
+    def buscar_descarga(self, etiqueta, clave, marca):
+        # Los selectores de descarga buscan en el servidor: se escribe la marca y se elige
+        self.paso(f"{etiqueta} (buscar)", lambda at: at.text_input(key=f"{clave}_buscar").input(marca))
+        self.paso(etiqueta, lambda at: at.selectbox(key=clave).set_value(next(o for o in at.selectbox(key=clave).options if marca in o)))
+
+
+def recorrido(numero, viajes=3, formato="XLSX"):
+    """Un día de trabajo abreviado: descarga, jornada, viajes de punta a punta, consulta y exportación."""
+    s = Sesion(numero)
+    marca = f"{PREFIJO}-S{numero}P{os.getpid()}"
+    s.paso("inicio")
+
+    def nueva_descarga(at):
+        at.text_input(key="barco_input").input(marca)
+        at.text_input(key="lote_input").input("L1")
+        at.button(key="crear_descarga_btn").click()
+    s.paso("crear: descarga", nueva_descarga)
+
+    s.ir("jornadas")
+    s.buscar_descarga("jornadas: elegir descarga", "clave_descarga_jornada", marca)
+    s.paso("jornadas: iniciar", lambda at: at.button(key="iniciar_jornada_btn").click())
+
+    s.ir("viajes")
+    s.elegir("viajes: elegir jornada", 0, marca)
+    for v in range(viajes):
+        def crear(at, v=v):
+            next(t for t in at.text_input if t.label.startswith("Placa")).input(f"S{numero}V{v}P{os.getpid() % 10000}")
+            next(b for b in at.button if b.label == "Crear nuevo viaje").click()
+        s.paso("viajes: crear", crear)
+        for prefijo in ["fc_", "t_", "e_", "id_", "fd_"]:
+            s.paso("viajes: avanzar", lambda at, p=prefijo: s.boton(p).click())
+
+    s.ir("temperaturas")
+    s.buscar_descarga("temperaturas: elegir descarga", "clave_descarga_temperaturas", marca)
+
+    s.ir("resumen")
+    # El barco sembrado con más historia, si lo hay
+    barcos = s.at.selectbox[0].options
+    s.elegir("resumen: elegir barco", 0, f"{PREFIJO}-B00" if f"{PREFIJO}-B00" in barcos else marca)
+    s.paso("resumen: detalle", lambda at: at.toggle[0].set_value(True))
+
+    s.ir("exportar")
+
+    s.paso("exportar: buscar", lambda at: at.text_input(key="exportar_buscar").input(marca))
+
+    def exportar_una(at):
+        caja = at.multiselect[0]
+        caja.set_value([next(o for o in caja.options if marca in o)])
+        at.radio[1].set_value(formato)
+        at.button(key="generar_export_btn").click()
+    s.paso("exportar: una descarga", exportar_una)
+
+    def exportar_todo(at):
+        at.multiselect[0].set_value([])
+        at.button(key="generar_export_btn").click()
+    s.paso("exportar: todo", exportar_todo)
+    return s.registros
+
+
+def _trabajador(argumentos):
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    _instrumentar()
+    return recorrido(*argumentos)
+
+
+def correr(sesiones=1, viajes=3, formato="XLSX"):
+    """Lanza ``sesiones`` recorridos simultáneos, cada uno en su propio proceso."""
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(sesiones) as pool:
+        resultados = pool.map(_trabajador, [(n, viajes, formato) for n in range(1, sesiones + 1)])
+    return [registro for registros in resultados for registro in registros]
+
+
+def reporte(registros):
+    """Percentiles de latencia y promedios por rerun, por paso."""
+    df = pd.DataFrame(registros)
+    grupos = df.groupby("etiqueta", sort=False)
+    resumen = pd.DataFrame({
+        "reruns": grupos.size(),
+        "p50 ms": grupos["ms"].quantile(0.5),
+        "p95 ms": grupos["ms"].quantile(0.95),
+        "p99 ms": grupos["ms"].quantile(0.99),
+        "max ms": grupos["ms"].max(),
+        "consultas": grupos["consultas"].mean(),
+        "KB bd": grupos["bytes_bd"].mean() / 1024,
+        "KB navegador": grupos["bytes_navegador"].mean() / 1024,
+    })
+    return resumen.round(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banco de pruebas de carga de la bitácora")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_sembrar = sub.add_parser("sembrar", help="Crea datos sintéticos (clave BENCH-...)")
+    p_sembrar.add_argument("--descargas", type=int, default=20)
+    p_sembrar.add_argument("--jornadas", type=int, default=3, help="por descarga")
+    p_sembrar.add_argument("--viajes", type=int, default=40, help="por jornada")
+    p_sembrar.add_argument("--temperaturas", type=int, default=30, help="por jornada")
+    p_sembrar.add_argument("--semilla", type=int, default=1)
+    p_correr = sub.add_parser("correr", help="Recorre la app con N sesiones simultáneas")
+    p_correr.add_argument("--sesiones", type=int, default=1)
+    p_correr.add_argument("--viajes", type=int, default=3, help="viajes por sesión")
+    p_correr.add_argument("--formato", choices=["XLSX", "CSV", "Parquet"], default="XLSX")
+    p_correr.add_argument("--json", help="Guarda cada rerun medido en este archivo")
+    sub.add_parser("limpiar", help="Borra los datos BENCH-")
+    p_arranque = sub.add_parser("arranque", help="Corre la prueba de arranque en frío (tests/test_arranque.py)")
+    p_arranque.add_argument("--reruns", type=int)
+    p_arranque.add_argument("--primer-run", type=int, help="presupuesto en ms")
+    p_arranque.add_argument("--rerun", type=int, help="presupuesto en ms")
+    args = parser.parse_args()
+
+    if args.comando == "arranque":
+        # La prueba usa su propia base SQLite temporal; las opciones pisan las variables BENCH_*
+        for variable, valor in [("BENCH_ARRANQUE_RERUNS", args.reruns), ("BENCH_PRESUPUESTO_PRIMER_RUN_MS", args.primer_run),
+                                ("BENCH_PRESUPUESTO_RERUN_MS", args.rerun)]:
+            if valor is not None:
+                os.environ[variable] = str(valor)
+        prueba = os.path.join(os.path.dirname(APP), "tests", "test_arranque.py")
+        sys.exit(subprocess.run([sys.executable, "-m", "pytest", "-q", "-s", prueba]).returncode)
+
+    destino = db.RUTA_SQLITE if db.es_sqlite() else os.getenv("DB_HOST")
+    print(f"Base: {db.BACKEND} ({destino})")
+    migraciones.asegurar_esquema()
+    if args.comando == "sembrar":
+        inicio = time.perf_counter()
+        totales = sembrar(args.descargas, args.jornadas, args.viajes, args.temperaturas, args.semilla)
+        print(f"✅ Sembrado en {time.perf_counter() - inicio:.1f} s:", totales)
+    elif args.comando == "limpiar":
+        print("🧹 Filas borradas:", limpiar())
+    else:
+        inicio = time.perf_counter()
+        registros = correr(args.sesiones, args.viajes, args.formato)
+        print(f"{args.sesiones} sesiones, {len(registros)} reruns en {time.perf_counter() - inicio:.1f} s\n")
+        with pd.option_context("display.width", 200, "display.max_columns", 20):
+            print(reporte(registros))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(registros, f, indent=1)
+            print(f"\nMediciones guardadas en {args.json}")
@@ -0,0 +1,169 @@
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import update_wrapper
+
+import streamlit as st
+
+import instrumentacion
+
+# Dónde viven las lecturas en caché de datos.py:
+#   "memoria": st.cache_data, una copia por proceso (un solo worker, por defecto)
+#   "sqlite":  un archivo que comparten todos los workers de la máquina (ver servidor.py)
+#   "redis":   un servidor Redis en CACHE_REDIS_URL; requiere el paquete redis
+# Con varios workers la caché tiene que ser compartida: si no, una escritura solo
+# invalida la copia del worker donde se hizo y los demás siguen mostrando datos
+# viejos hasta que vence el TTL.
+BACKEND = os.getenv("CACHE_BACKEND", "memoria").lower()
+RUTA_SQLITE = os.getenv("CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "bitacora_cache.db"))
+URL_REDIS = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Prefijo de las llaves en Redis, por si el servidor lo comparten varias apps
+PREFIJO_REDIS = os.getenv("CACHE_REDIS_PREFIJO", "bitacora:cache:")
+
+log = logging.getLogger("bitacora.cache")
+
+
+class _Sqlite:
+    """Entradas en una tabla de un archivo SQLite local; una conexión por hilo."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._hilo = threading.local()
+        self._conexion().execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                funcion TEXT NOT NULL,
+                clave TEXT NOT NULL,
+                valor BLOB NOT NULL,
+                expira REAL NOT NULL,
+                PRIMARY KEY (funcion, clave)
+            ) WITHOUT ROWID
+        """)
+
+    def _conexion(self):
+        conn = getattr(self._hilo, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Es una caché: si se pierde en un corte de luz se vuelve a llenar
+            conn.execute("PRAGMA synchronous=OFF")
+            self._hilo.conn = conn
+        return conn
+
+    def leer(self, funcion, clave):
+        fila = self._conexion().execute(
+            "SELECT valor FROM cache WHERE funcion = ? AND clave = ? AND expira > ?",
+            (funcion, clave, time.time()),
+        ).fetchone()
+        return fila[0] if fila else None
+
+    def guardar(self, funcion, clave, valor, ttl):
+        conn = self._conexion()
+        ahora = time.time()
+        conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", (funcion, clave, valor, ahora + ttl))
+        # Son pocas entradas: barrer las vencidas en cada escritura mantiene el archivo chico
+        conn.execute("DELETE FROM cache WHERE expira <= ?", (ahora,))
+
+    def borrar(self, funcion, clave=None):
+        if clave is None:
+            self._conexion().execute("DELETE FROM cache WHERE funcion = ?", (funcion,))
+        else:
+            self._conexion().execute("DELETE FROM cache WHERE funcion = ? AND clave = ?", (funcion, clave))
+
+
+class _Redis:
+    """Entradas en Redis con su TTL; las vence el propio servidor."""
+
+    def __init__(self, url, prefijo):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+
+    def _llave(self, funcion, clave):
+        return f"{self.prefijo}{funcion}:{clave}"
+
+    def leer(self, funcion, clave):
+        return self.redis.get(self._llave(funcion, clave))
+
+    def guardar(self, funcion, clave, valor, ttl):
+        self.redis.set(self._llave(funcion, clave), valor, ex=ttl)
+
+    def borrar(self, funcion, clave=None):
+        if clave is not None:
+            self.redis.delete(self._llave(funcion, clave))
+            return
+        llaves = list(self.redis.scan_iter(match=self._llave(funcion, "*"), count=500))
+        if llaves:
+            self.redis.delete(*llaves)
+
+
+@st.cache_resource(show_spinner=False)
+def almacen():
+    # Uno por proceso; los datos viven afuera y los ven todos los workers
+    if BACKEND == "redis":
+        return _Redis(URL_REDIS, PREFIJO_REDIS)
+    if BACKEND == "sqlite":
+        return _Sqlite(RUTA_SQLITE)
+    raise ValueError(f"CACHE_BACKEND desconocido: {BACKEND}")
+
+
+class _Compartida:
+    """Envoltorio de una función cuyo resultado se guarda serializado en ``almacen()``."""
+
+    def __init__(self, funcion, ttl):
+        self.funcion = funcion
+        self.ttl = ttl
+        self.nombre = f"{funcion.__module__}.{funcion.__qualname__}"
+        self.firma = inspect.signature(funcion)
+        update_wrapper(self, funcion)
+
+    def _clave(self, args, kwargs):
+        # Mismos argumentos, misma clave, sin importar si se pasaron por posición o nombre
+        ligados = self.firma.bind(*args, **kwargs)
+        ligados.apply_defaults()
+        return hashlib.sha1(pickle.dumps(tuple(ligados.arguments.items()), protocol=4)).hexdigest()
+
+    def __call__(self, *args, **kwargs):
+        clave = self._clave(args, kwargs)
+        try:
+            guardado = almacen().leer(self.nombre, clave)
+        except Exception:
+            # Si la caché no responde se lee directo de la base
+            log.warning("No se pudo leer la caché de %s", self.nombre, exc_info=True)
+            guardado = None
+        if guardado is not None:
+            instrumentacion.contar("cache_aciertos")
+            return pickle.loads(guardado)
+        instrumentacion.contar("cache_fallos")
+        valor = self.funcion(*args, **kwargs)
+        try:
+            almacen().guardar(self.nombre, clave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), self.ttl)
+        except Exception:
+            log.warning("No se pudo guardar en la caché %s", self.nombre, exc_info=True)
+        return valor
+
+    def clear(self, *args, **kwargs):
+        clave = self._clave(args, kwargs) if args or kwargs else None
+        try:
+            almacen().borrar(self.nombre, clave)
+        except Exception:
+            log.exception("No se pudo invalidar la caché de %s", self.nombre)
+
+
+def datos(ttl):
+    """Como ``st.cache_data(ttl=ttl)``, pero en el backend de CACHE_BACKEND.
+
+    ``.clear()`` borra todas las entradas de la función y ``.clear(*args)`` solo
+    la de esos argumentos, en todos los workers a la vez.
+    """
+    def decorador(funcion):
+        if BACKEND == "memoria":
+            return st.cache_data(ttl=ttl, show_spinner=False)(funcion)
+        return _Compartida(funcion, ttl)
+    return decorador
@@ -0,0 +1,231 @@
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import cache
+import grillas
+import repositorio
+import temperaturas
+import trabajos
+from repositorio import ESLABONES_COLUMNAS
+
+# Segundos que vive una lectura en caché. Las escrituras de la app invalidan
+# sus entradas de inmediato; el TTL solo cubre cambios hechos por fuera de la app.
+TTL_CATALOGOS = int(os.getenv("CACHE_TTL_CATALOGOS", "600"))
+TTL_OPERACION = int(os.getenv("CACHE_TTL_OPERACION", "60"))
+
+# El tablero de viajes vuelve a pedir este margen por debajo de su marca, para no
+# perder filas cuya transacción hizo commit un poco después de tomar su updated_at.
+SOLAPE_TABLERO = timedelta(seconds=5)
+
+# Descargas que trae cada búsqueda de los selectores
+LIMITE_BUSQUEDA = int(os.getenv("DESCARGAS_BUSQUEDA_LIMITE", "50"))
+
+
+# ==== Lecturas en caché ====
+
+# Las consultas están en repositorio.py; aquí solo la caché de cada una (por proceso
+# o compartida entre workers, según CACHE_BACKEND: ver cache.py).
+
+@cache.datos(ttl=TTL_CATALOGOS)
+def buscar_descargas(texto="", limite=LIMITE_BUSQUEDA):
+    """Claves de las descargas cuya clave o barco contiene el texto, las más recientes primero."""
+    return repositorio.claves_descargas(texto, limite)
+
+
+@cache.datos(ttl=TTL_CATALOGOS)
+def listar_barcos():
+    return repositorio.listar_barcos()
+
+
+@cache.datos(ttl=TTL_OPERACION)
+def jornadas_por_descarga(clave_descarga):
+    """{id: hora de inicio} de las jornadas de la descarga."""
+    return repositorio.inicios_jornadas(clave_descarga)
+
+
+@cache.datos(ttl=TTL_OPERACION)
+def jornadas_abiertas():
+    return repositorio.jornadas_abiertas()
+
+
+@cache.datos(ttl=TTL_OPERACION)
+def viajes_activos(id_jornada):
+    return repositorio.viajes_activos(id_jornada)
+
+
+# Grillas paginadas (ver grillas.py): solo la página visible y el total filtrado
+@cache.datos(ttl=TTL_OPERACION)
+def pagina_grilla(grilla, clave_descarga, filtros, orden, descendente, marca):
+    return grillas.pagina(grilla, clave_descarga, filtros, orden, descendente, marca)
+
+
+@cache.datos(ttl=TTL_OPERACION)
+def total_grilla(grilla, clave_descarga, filtros):
+    return grillas.contar(grilla, clave_descarga, filtros)
+
+
+# ==== Resumen de operaciones (desde las métricas precalculadas) ====
+# Las duraciones de cada viaje y los totales por grupo los mantienen triggers
+# (ver migraciones.py); el resumen lee filas ya agregadas, no todos los viajes.
+
+ESLABONES = list(ESLABONES_COLUMNAS)
+
+
+@cache.datos(ttl=TTL_CATALOGOS)
+def opciones_resumen():
+    return repositorio.opciones_resumen()
+
+
+@cache.datos(ttl=TTL_CATALOGOS)
+def resumen_viajes_por_fecha(barco, fecha, lote):
+    """Viajes finalizados de un barco/fecha/lote con la duración de cada eslabón en minutos."""
+    return repositorio.resumen_viajes(barco, fecha, lote)
+
+
+@cache.datos(ttl=TTL_CATALOGOS)
+def resumen_operaciones(barco, fecha, lote):
+    """Viajes por placa y promedio de cada eslabón para un barco/fecha/lote."""
+    promedios = repositorio.resumen_promedios(barco, fecha, lote)
+    promedios = promedios.iloc[0].astype(float).to_frame(name="Promedio (min)")
+    return repositorio.resumen_por_placa(barco, fecha, lote), promedios
+
+
+# ==== Análisis de viajes (ver analitica.py) ====
+
+def _analizar(barcos, desde, hasta):
+    # Solo la pestaña de análisis lo usa (y con TRABAJOS_PROCESOS, solo el pool)
+    import analitica
+
+    horas = list(dict.fromkeys(col for par in analitica.TRAMOS.values() for col in par))
+    return analitica.analizar(repositorio.viajes_finalizados(horas, tuple(barcos), desde, hasta))
+
+
+@cache.datos(ttl=TTL_CATALOGOS)
+def analisis_viajes(barcos=(), desde=None, hasta=None):
+    """Percentiles, cuello de botella, rendimiento por hora y comparación por barco; en caché por filtro."""
+    # Lee y procesa todos los viajes del filtro: con TRABAJOS_PROCESOS va al pool
+    return trabajos.ejecutar(_analizar, tuple(barcos), desde, hasta)
+
+
+# ==== Monitoreo de temperaturas ====
+
+# Alertas pendientes que se listan por descarga (el conteo incluye todas)
+LIMITE_ALERTAS = int(os.getenv("ALERTAS_LIMITE", "500"))
+
+
+@cache.datos(ttl=TTL_OPERACION)
+def serie_temperaturas(clave_descarga, agrupar):
+    """(segundos por intervalo, serie reducida) de la descarga; el ancho sale del rango de horas."""
+    segundos = temperaturas.ancho_intervalo(*repositorio.rango_temperaturas(clave_descarga))
+    return segundos, repositorio.serie_temperaturas(clave_descarga, agrupar, segundos)
+
+
+@cache.datos(ttl=TTL_OPERACION)
+def alertas_temperatura(clave_descarga):
+    return repositorio.alertas_temperatura(clave_descarga, LIMITE_ALERTAS)
+
+
+@cache.datos(ttl=TTL_CATALOGOS)
+def umbrales_temperatura():
+    return repositorio.umbrales_temperatura()
+
+
+# ==== Tablero de viajes activos (incremental) ====
+
+def actualizar_tablero(id_jornada, tablero=None):
+    """Devuelve el tablero {"filas": {id: fila}, "marca": updated_at} de la jornada al día.
+
+    La primera vez parte de la lectura en caché de viajes activos; después solo trae
+    las filas con updated_at por encima de la marca y quita las que se finalizaron.
+    Los cambios optimistas en tablero["optimistas"] ({id: fila, o None si se quita})
+    se vuelven a aplicar encima hasta que su escritura termine.
+    """
+    if tablero is None:
+        df = viajes_activos(id_jornada)
+        return {
+            "filas": {int(fila["id"]): fila for fila in df.to_dict("records")},
+            "marca": df["updated_at"].max() if not df.empty else datetime(2000, 1, 1),
+        }
+    cambios = repositorio.viajes_modificados_desde(id_jornada, tablero["marca"] - SOLAPE_TABLERO)
+    for fila in cambios.to_dict("records"):
+        if fila["estado"] == "FINALIZADO":
+            tablero["filas"].pop(int(fila["id"]), None)
+        else:
+            tablero["filas"][int(fila["id"])] = fila
+    if not cambios.empty:
+        tablero["marca"] = max(tablero["marca"], cambios["updated_at"].max())
+    for id_viaje, fila in tablero.get("optimistas", {}).items():
+        if fila is None:
+            tablero["filas"].pop(id_viaje, None)
+        else:
+            tablero["filas"][id_viaje] = fila
+    return tablero
+
+
+def tablero_a_dataframe(tablero):
+    filas = [tablero["filas"][id_viaje] for id_viaje in sorted(tablero["filas"])]
+    return repositorio.tipar(pd.DataFrame(filas, columns=repositorio.COLUMNAS_TABLERO))
+
+
+# ==== Invalidación tras escrituras ====
+# Cada escritura borra solo las entradas que dependen de las filas que cambió.
+
+def invalidar_descargas():
+    buscar_descargas.clear()
+    listar_barcos.clear()
+
+
+def _invalidar_grillas():
+    # Las páginas en caché dependen de filtros y marcas; se limpian todas (son consultas chicas)
+    pagina_grilla.clear()
+    total_grilla.clear()
+
+
+def invalidar_jornadas(clave_descarga):
+    jornadas_por_descarga.clear(clave_descarga)
+    jornadas_abiertas.clear()
+    _invalidar_grillas()
+
+
+def invalidar_viajes(id_jornada, finalizado=False):
+    viajes_activos.clear(id_jornada)
+    _invalidar_grillas()
+    # El resumen solo incluye viajes finalizados; la jornada no basta para saber
+    # qué barco/fecha/lote cambió, así que se limpian todas sus entradas (son pocas).
+    if finalizado:
+        opciones_resumen.clear()
+        resumen_viajes_por_fecha.clear()
+        resumen_operaciones.clear()
+        analisis_viajes.clear()
+
+
+def invalidar_temperaturas(clave_descarga):
+    _invalidar_grillas()
+    for agrupar in temperaturas.SERIES:
+        serie_temperaturas.clear(clave_descarga, agrupar)
+    invalidar_alertas(clave_descarga)
+
+
+def invalidar_alertas(clave_descarga):
+    alertas_temperatura.clear(clave_descarga)
+
+
+def invalidar_umbrales():
+    umbrales_temperatura.clear()
+
+
+def invalidar_importacion():
+    # Una importación agrega descargas completas: cambia casi todo lo que está en caché
+    invalidar_descargas()
+    jornadas_por_descarga.clear()
+    jornadas_abiertas.clear()
+    viajes_activos.clear()
+    _invalidar_grillas()
+    opciones_resumen.clear()
+    resumen_viajes_por_fecha.clear()
+    resumen_operaciones.clear()
+    analisis_viajes.clear()
+    serie_temperaturas.clear()
+    alertas_temperatura.clear()
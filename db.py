@@ -0,0 +1,471 @@
+import csv
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.pool
+import streamlit as st
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+import instrumentacion
+
+# Cargar variables de entorno
+load_dotenv()
+
+# "postgres" (Supabase, por defecto) o "sqlite": base local en WAL con sincronización en segundo plano
+BACKEND = os.getenv("DB_BACKEND", "postgres").lower()
+RUTA_SQLITE = os.getenv("SQLITE_PATH", "bitacora_descarga.db")
+# Cada nodo local genera ids en su propio bloque para no chocar con otros nodos
+# ni con los SERIAL de Postgres al sincronizar
+NODO_ID = int(os.getenv("NODO_ID", "1"))
+RANGO_IDS_NODO = 100_000_000
+
+# Tamaño máximo del pool y segundos de inactividad antes de verificar la conexión
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "5"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "15"))
+PING_INACTIVIDAD = float(os.getenv("DB_POOL_PING_SEG", "30"))
+
+# Sentencias preparadas en el servidor (ver ejecutar_preparada). El pooler de Supabase
+# en modo transacción (puerto 6543) reparte cada transacción en un backend distinto,
+# donde la sentencia no existe, así que ahí quedan apagadas salvo que se pidan.
+PREPARAR = os.getenv("DB_PREPARAR", "0" if os.getenv("DB_PORT") == "6543" else "1") == "1"
+
+# Errores que indican que el socket se cayó y la conexión no sirve
+ERRORES_CONEXION = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+def _parametros():
+    return dict(
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        connect_timeout=10,
+        # Keepalives para detectar antes los cortes del enlace celular
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3,
+        connection_factory=ConexionPostgres,
+        cursor_factory=CursorPostgres,
+    )
+
+
+class ConexionPostgres(psycopg2.extensions.connection):
+    """Conexión que recuerda qué sentencias ya preparó en su sesión."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+
+
+class CursorPostgres(psycopg2.extensions.cursor):
+    """Cursor que registra cada sentencia en ``instrumentacion``."""
+
+    _evento = None
+
+    def execute(self, sql, params=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            # En cursores del servidor las filas se cuentan al leerlas
+            filas = self.rowcount if self.rowcount >= 0 and self.name is None else None
+            self._evento = instrumentacion.consulta(sql, (time.perf_counter() - inicio) * 1000, filas)
+
+    def fetchmany(self, *args):
+        filas = super().fetchmany(*args)
+        if self.name is not None:
+            instrumentacion.sumar_filas(self._evento, len(filas))
+        return filas
+
+
+def connect_db():
+    return psycopg2.connect(**_parametros())
+
+
+class PoolConexiones:
+    """Pool de conexiones compartido por todas las sesiones del proceso.
+
+    A diferencia de ``ThreadedConnectionPool``, espera (hasta ``timeout``) cuando
+    no hay conexiones libres en lugar de lanzar ``PoolError``, y verifica con un
+    ``SELECT 1`` las conexiones que llevan tiempo sin usarse antes de entregarlas.
+    """
+
+    def __init__(self, minconn=POOL_MIN, maxconn=POOL_MAX, timeout=POOL_TIMEOUT, ping=PING_INACTIVIDAD):
+        self._pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, **_parametros())
+        self._cupos = threading.BoundedSemaphore(maxconn)
+        self._ultimo_uso = {}
+        self._lock = threading.Lock()
+        self.timeout = timeout
+        self.ping = ping
+        self.maxconn = maxconn
+        self.aperturas = minconn
+        instrumentacion.contar("conexiones_abiertas", minconn)
+
+    def _sana(self, conn):
+        if conn.closed:
+            return False
+        inactiva = time.monotonic() - self._ultimo_uso.get(id(conn), 0)
+        if inactiva < self.ping:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except ERRORES_CONEXION:
+            return False
+
+    def tomar(self):
+        if not self._cupos.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError("No hay conexiones disponibles en el pool")
+        try:
+            # Un intento extra: si la conexión entregada está caída, se descarta y se abre otra
+            for _ in range(2):
+                with self._lock:
+                    nuevas = len(self._pool._pool) == 0
+                    conn = self._pool.getconn()
+                if nuevas:
+                    self.aperturas += 1
+                    instrumentacion.contar("conexiones_abiertas")
+                if self._sana(conn):
+                    return conn
+                self._descartar(conn)
+            raise psycopg2.OperationalError("No fue posible restablecer la conexión a la base de datos")
+        except BaseException:
+            self._cupos.release()
+            raise
+
+    def devolver(self, conn, cerrar=False):
+        try:
+            if cerrar or conn.closed:
+                self._descartar(conn)
+            else:
+                self._ultimo_uso[id(conn)] = time.monotonic()
+                with self._lock:
+                    self._pool.putconn(conn)
+        finally:
+            self._cupos.release()
+
+    def _descartar(self, conn):
+        self._ultimo_uso.pop(id(conn), None)
+        with self._lock:
+            self._pool.putconn(conn, close=True)
+
+    def cerrar(self):
+        with self._lock:
+            self._pool.closeall()
+
+
+@st.cache_resource(show_spinner=False)
+def obtener_pool():
+    return PoolConexiones()
+
+
+@contextmanager
+def conexion_postgres():
+    """Toma una conexión del pool; hace commit al salir y rollback si hay error."""
+    pool = obtener_pool()
+    inicio = time.perf_counter()
+    conn = pool.tomar()
+    instrumentacion.espera_conexion((time.perf_counter() - inicio) * 1000)
+    cerrar = False
+    try:
+        yield conn
+        conn.commit()
+    except ERRORES_CONEXION:
+        cerrar = True
+        raise
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.devolver(conn, cerrar=cerrar)
+
+
+# ==== Backend SQLite local ====
+
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(" "))
+sqlite3.register_adapter(date, lambda valor: valor.isoformat())
+sqlite3.register_converter("TIMESTAMP", lambda valor: datetime.fromisoformat(valor.decode()))
+sqlite3.register_converter("DATE", lambda valor: date.fromisoformat(valor.decode()[:10]))
+
+
+class CursorSQLite:
+    """Cursor de sqlite3 que acepta los parámetros ``%s`` que usa el resto de la app."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.itersize = 2000
+        self._evento = None
+
+    @staticmethod
+    def _traducir(sql):
+        return sql.replace("%s", "?").replace("%%", "%")
+
+    @staticmethod
+    def _valor(valor):
+        # sqlite3 no adapta los Timestamp de pandas ni los escalares de numpy
+        if isinstance(valor, datetime):
+            return valor.isoformat(" ")
+        if hasattr(valor, "item"):
+            return valor.item()
+        return valor
+
+    def _medir(self, sql, ejecutar):
+        inicio = time.perf_counter()
+        try:
+            return ejecutar()
+        finally:
+            filas = self._cursor.rowcount if self._cursor.rowcount >= 0 else None
+            self._evento = instrumentacion.consulta(sql, (time.perf_counter() - inicio) * 1000, filas)
+
+    def execute(self, sql, params=None):
+        if params is None:
+            return self._medir(sql, lambda: self._cursor.execute(sql))
+        return self._medir(sql, lambda: self._cursor.execute(self._traducir(sql), tuple(map(self._valor, params))))
+
+    def executemany(self, sql, filas):
+        filas = [tuple(map(self._valor, fila)) for fila in filas]
+        return self._medir(sql, lambda: self._cursor.executemany(self._traducir(sql), filas))
+
+    # En SQLite las filas de un SELECT solo se conocen al leerlas
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        instrumentacion.sumar_filas(self._evento, fila is not None)
+        return fila
+
+    def fetchmany(self, *args):
+        filas = self._cursor.fetchmany(*args)
+        instrumentacion.sumar_filas(self._evento, len(filas))
+        return filas
+
+    def fetchall(self):
+        filas = self._cursor.fetchall()
+        instrumentacion.sumar_filas(self._evento, len(filas))
+        return filas
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class ConexionSQLite:
+    def __init__(self, ruta):
+        self._conn = sqlite3.connect(
+            ruta, timeout=30, isolation_level=None, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            # sqlite3 ya reutiliza las sentencias compiladas; este es el tamaño de esa caché
+            cached_statements=256,
+        )
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self.closed = False
+
+    def cursor(self, name=None):
+        return CursorSQLite(self._conn.cursor())
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def close(self):
+        self._conn.close()
+        self.closed = True
+
+
+_locales = threading.local()
+
+
+@contextmanager
+def conexion_sqlite(ruta=None):
+    """Conexión local (una por hilo). BEGIN IMMEDIATE toma el candado de escritura al inicio
+    para que las transacciones que leen y luego escriben no choquen entre sí."""
+    ruta = ruta or RUTA_SQLITE
+    conexiones = getattr(_locales, "conexiones", None)
+    if conexiones is None:
+        conexiones = _locales.conexiones = {}
+    conn = conexiones.get(ruta)
+    if conn is None:
+        conn = conexiones[ruta] = ConexionSQLite(ruta)
+        instrumentacion.contar("conexiones_abiertas")
+    conn._conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def conexion():
+    """Conexión del backend configurado en DB_BACKEND."""
+    return conexion_sqlite() if BACKEND == "sqlite" else conexion_postgres()
+
+
+# ==== Diferencias de dialecto ====
+# Lo poco de SQL que no es común a Postgres y SQLite pasa por estas funciones.
+
+def es_sqlite():
+    return BACKEND == "sqlite"
+
+
+def minutos_entre(fin, inicio):
+    if es_sqlite():
+        return f"(julianday({fin}) - julianday({inicio})) * 1440"
+    return f"EXTRACT(EPOCH FROM {fin} - {inicio}) / 60"
+
+
+def segundos_epoch(columna):
+    """Segundos enteros desde 1970 de un TIMESTAMP, tomando la hora tal como está guardada."""
+    if es_sqlite():
+        return f"CAST(ROUND((julianday({columna}) - 2440587.5) * 86400) AS INTEGER)"
+    return f"CAST(EXTRACT(EPOCH FROM {columna}) AS BIGINT)"
+
+
+def redondear(expresion, decimales):
+    if es_sqlite():
+        return f"ROUND({expresion}, {decimales})"
+    return f"ROUND(({expresion})::numeric, {decimales})"
+
+
+def insertar_filas(cursor, sql, filas):
+    """Inserta todas las filas con una sola sentencia; ``sql`` termina en ``VALUES %s``."""
+    if isinstance(cursor, CursorSQLite):
+        marcadores = "(" + ", ".join(["%s"] * len(filas[0])) + ")"
+        cursor.executemany(sql.replace("VALUES %s", f"VALUES {marcadores}"), filas)
+    else:
+        execute_values(cursor, sql, filas, page_size=max(len(filas), 1))
+
+
+def copiar_filas(cursor, tabla, columnas, filas):
+    """Carga masiva: COPY FROM STDIN en Postgres, executemany en SQLite (en la transacción abierta)."""
+    if not filas:
+        return
+    if isinstance(cursor, CursorSQLite):
+        cursor.executemany(
+            f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(columnas))})", filas,
+        )
+        return
+    # Sin cadenas vacías (van como NULL), así que el CSV por defecto de COPY alcanza
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(filas)
+    buffer.seek(0)
+    sql = f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)"
+    inicio = time.perf_counter()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        instrumentacion.consulta(sql, (time.perf_counter() - inicio) * 1000, len(filas))
+
+
+def reservar_ids(cursor, tabla, cantidad):
+    """Aparta ``cantidad`` ids de la secuencia de ``tabla`` para insertarlos explícitamente."""
+    if cantidad == 0:
+        return []
+    if isinstance(cursor, CursorSQLite):
+        # La transacción local ya tiene el candado de escritura (BEGIN IMMEDIATE)
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", (tabla,))
+        fila = cursor.fetchone()
+        if fila is None:
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabla}")
+            ultimo = cursor.fetchone()[0]
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", (tabla, ultimo + cantidad))
+        else:
+            ultimo = fila[0]
+            cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", (ultimo + cantidad, tabla))
+        return list(range(ultimo + 1, ultimo + cantidad + 1))
+    cursor.execute(f"SELECT nextval(pg_get_serial_sequence('{tabla}', 'id')) FROM generate_series(1, %s)", (cantidad,))
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def ejecutar_preparada(cursor, nombre, sql, params=()):
+    """Ejecuta ``sql`` como la sentencia preparada ``nombre``: la primera vez en cada
+    conexión se hace PREPARE y luego solo EXECUTE, sin volver a analizar ni planificar.
+
+    ``sql`` debe tener siempre la misma forma (mismos marcadores) para el mismo nombre.
+    """
+    conn = getattr(cursor, "connection", None)
+    if not PREPARAR or not isinstance(conn, ConexionPostgres):
+        return cursor.execute(sql, params)
+    if nombre not in conn.preparadas:
+        # PREPARE no es transaccional: sobrevive a un rollback, así que basta con recordarla
+        numeros = iter(range(1, len(params) + 1))
+        cursor.execute(f"PREPARE {nombre} AS " + re.sub("%s", lambda _: f"${next(numeros)}", sql))
+        conn.preparadas.add(nombre)
+    marcadores = f" ({', '.join(['%s'] * len(params))})" if params else ""
+    return cursor.execute(f"EXECUTE {nombre}{marcadores}", params)
+
+
+def cursor_servidor(conn, nombre):
+    """Cursor que trae las filas por lotes sin cargar todo el resultado en memoria."""
+    if isinstance(conn, ConexionSQLite):
+        return conn.cursor()
+    return conn.cursor(name=nombre)
+
+
+ERRORES_UNICIDAD = (psycopg2.errors.UniqueViolation, sqlite3.IntegrityError)
+# Filas que la base rechaza por sus restricciones o tipos
+ERRORES_INTEGRIDAD = (psycopg2.IntegrityError, psycopg2.DataError, sqlite3.IntegrityError)
+
+# SQLite no reporta el nombre del índice único violado, sino sus columnas
+_INDICES_UNICOS_SQLITE = {
+    "viajes.id_jornada, viajes.cupo_cargue": "uq_viajes_cupo_cargue",
+    "viajes.id_jornada, viajes.placa": "uq_viajes_placa_activa",
+}
+
+
+def restriccion_violada(error):
+    if isinstance(error, sqlite3.IntegrityError):
+        columnas = str(error).removeprefix("UNIQUE constraint failed: ")
+        return _INDICES_UNICOS_SQLITE.get(columnas)
+    return error.diag.constraint_name
+
+
+# OIDs de Postgres a tipos genéricos
+_TIPOS_OID = {16: "bool", 20: "int", 21: "int", 23: "int", 700: "float", 701: "float", 1082: "date", 1114: "timestamp"}
+
+
+def tipos_columnas(conn, tabla, descripcion):
+    """Tipo genérico (int, float, bool, date, timestamp o text) de cada columna de un resultado."""
+    if isinstance(conn, ConexionSQLite):
+        cursor = conn.cursor()
+        cursor.execute(f"PRAGMA table_info({tabla})")
+        declarados = {fila[1]: fila[2].upper() for fila in cursor.fetchall()}
+        genericos = {"INTEGER": "int", "REAL": "float", "DATE": "date", "TIMESTAMP": "timestamp"}
+        return [genericos.get(declarados.get(col[0], ""), "text") for col in descripcion]
+    return [_TIPOS_OID.get(col[1], "text") for col in descripcion]
+
+
+if __name__ == "__main__":
+    # Prueba de conexión: python -m db
+    try:
+        with conexion():
+            print("✅ Conexión exitosa a " + ("la base local" if es_sqlite() else "Supabase"))
+    except Exception as e:
+        print("❌ Error de conexión:", e)
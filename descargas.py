@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from db import conexion
+
+
+def clave(barco, fecha, lote):
+    return f"{barco.upper()}-{fecha.strftime('%Y%m%d')}-{lote}"
+
+
+def crear(barco, lote, fecha, cursor=None):
+    """Registra la descarga (si la clave ya existe no hace nada) y devuelve su clave."""
+    if cursor is None:
+        with conexion() as conn:
+            return crear(barco, lote, fecha, conn.cursor())
+    clave_descarga = clave(barco, fecha, lote)
+    cursor.execute("""
+        INSERT INTO descargas (clave, barco, lote, fecha)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (clave) DO NOTHING
+    """, (clave_descarga, barco, lote, fecha))
+    return clave_descarga
+
+
+def iniciar_jornada(clave_descarga, hora=None):
+    """Abre una jornada para la descarga; devuelve False si ya tenía una abierta."""
+    hora = hora or datetime.now()
+    with conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM jornadas WHERE clave_descarga = %s AND hora_fin IS NULL", (clave_descarga,))
+        if cursor.fetchone()[0] > 0:
+            return False
+        cursor.execute("""
+            INSERT INTO jornadas (clave_descarga, fecha, hora_inicio)
+            VALUES (%s, %s, %s)
+        """, (clave_descarga, hora.date(), hora))
+    return True
+
+
+def finalizar_jornada(id_jornada, hora=None):
+    with conexion() as conn:
+        conn.cursor().execute("UPDATE jornadas SET hora_fin = %s WHERE id = %s", (hora or datetime.now(), int(id_jornada)))
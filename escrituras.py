@@ -0,0 +1,144 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import streamlit as st
+
+import instrumentacion
+from db import conexion
+
+# Con ESCRITURAS_ASYNC=1 los botones no esperan la ida y vuelta a la base: encolan
+# la escritura, la pantalla se actualiza de forma optimista y un hilo por proceso
+# junta los comandos que llegan en ráfaga y los aplica en una sola transacción.
+#
+# Durabilidad: un cambio está guardado cuando su Future termina sin error, es decir
+# después del COMMIT. Mientras tanto vive en la memoria del proceso: si el proceso
+# muere antes se pierde (al cerrar normalmente se espera a vaciar la cola). Para
+# trabajar sin conexión sin perder nada está el backend local (DB_BACKEND=sqlite).
+ACTIVAS = os.getenv("ESCRITURAS_ASYNC", "0") == "1"
+# Milisegundos que se espera tras el primer comando para juntar los que lleguen después
+VENTANA = float(os.getenv("ESCRITURAS_VENTANA_MS", "25")) / 1000
+# Comandos por transacción
+LOTE = int(os.getenv("ESCRITURAS_LOTE", "50"))
+# Segundos que se espera al cerrar el proceso para que la cola se vacíe
+ESPERA_CIERRE = float(os.getenv("ESCRITURAS_ESPERA_CIERRE_SEG", "10"))
+
+log = logging.getLogger("bitacora.escrituras")
+
+
+class Comando:
+    """Una escritura: ``funcion(*args, cursor=..., **kwargs)`` y lo que se hace tras el commit."""
+
+    def __init__(self, funcion, args, kwargs, despues=None):
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.despues = despues
+        self.futuro = Future()
+
+
+def _resolver(comando, resultado):
+    # Primero se invalidan las cachés, para que quien vea el Future terminado lea datos al día
+    if comando.despues is not None:
+        try:
+            comando.despues(resultado)
+        except Exception:
+            log.exception("Error después de guardar %s", comando.funcion.__name__)
+    comando.futuro.set_result(resultado)
+
+
+def _ejecutar(comando):
+    """Aplica el comando solo, en su propia transacción."""
+    try:
+        resultado = comando.funcion(*comando.args, **comando.kwargs)
+    except Exception as e:
+        comando.futuro.set_exception(e)
+        return
+    _resolver(comando, resultado)
+
+
+class Escritor(threading.Thread):
+    """Aplica en segundo plano los comandos encolados con ``enviar``."""
+
+    def __init__(self, ventana=VENTANA, lote=LOTE):
+        super().__init__(name="escritor", daemon=True)
+        self.cola = queue.Queue()
+        self.ventana = ventana
+        self.lote = lote
+
+    def _juntar(self):
+        lote = [self.cola.get()]
+        limite = time.monotonic() + self.ventana
+        while len(lote) < self.lote:
+            try:
+                lote.append(self.cola.get(timeout=max(limite - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return lote
+
+    def aplicar(self, lote):
+        """Todo el lote en una transacción. Si un comando falla se deshace todo y se
+        aplican de a uno, para que cada cual reciba su propio resultado o error."""
+        instrumentacion.contar("escrituras_lotes")
+        instrumentacion.contar("escrituras_comandos", len(lote))
+        with instrumentacion.tramo("escritura", "lote"):
+            try:
+                with conexion() as conn:
+                    cursor = conn.cursor()
+                    resultados = [c.funcion(*c.args, cursor=cursor, **c.kwargs) for c in lote]
+            except Exception as e:
+                if len(lote) == 1:
+                    lote[0].futuro.set_exception(e)
+                    return
+                for comando in lote:
+                    _ejecutar(comando)
+                return
+        for comando, resultado in zip(lote, resultados):
+            _resolver(comando, resultado)
+
+    def run(self):
+        while True:
+            lote = self._juntar()
+            try:
+                self.aplicar(lote)
+            finally:
+                for _ in lote:
+                    self.cola.task_done()
+
+    def pendientes(self):
+        return self.cola.unfinished_tasks
+
+    def vaciar(self, timeout=ESPERA_CIERRE):
+        """Espera a que se apliquen los comandos encolados; devuelve cuántos quedaron."""
+        limite = time.monotonic() + timeout
+        while self.pendientes() and time.monotonic() < limite:
+            time.sleep(0.05)
+        return self.pendientes()
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar():
+    # Un solo escritor por proceso; al salir se le da tiempo de vaciar la cola
+    escritor = Escritor()
+    escritor.start()
+    atexit.register(escritor.vaciar)
+    return escritor
+
+
+def enviar(funcion, *args, despues=None, **kwargs):
+    """Escribe con ``funcion`` y devuelve un Future con su resultado.
+
+    Con ESCRITURAS_ASYNC el comando va a la cola y el Future termina después del
+    commit; si no, se escribe aquí mismo y el Future vuelve ya terminado.
+    ``despues(resultado)`` corre tras el commit (invalidar cachés).
+    """
+    comando = Comando(funcion, args, kwargs, despues)
+    if ACTIVAS:
+        iniciar().cola.put(comando)
+    else:
+        _ejecutar(comando)
+    return comando.futuro
@@ -0,0 +1,180 @@
+import csv
+import io
+import os
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+import db
+import instrumentacion
+from db import conexion
+
+# Filas por lote leídas del cursor del servidor; la memoria no depende del tamaño de las tablas
+TAMANO_LOTE = int(os.getenv("EXPORT_LOTE", "5000"))
+# Segundos que una exportación espera su descarga en disco; las que nadie bajó se borran después
+CADUCIDAD = int(os.getenv("EXPORT_CADUCIDAD_SEG", "3600"))
+_PREFIJO_TEMPORAL = "bitacora_export_"
+
+FORMATOS = {
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("zip", "application/zip"),
+    "Parquet": ("zip", "application/zip"),
+}
+
+# (hoja/archivo, tabla, columna que la liga a la descarga, orden)
+TABLAS = [
+    ("Descargas", "descargas", "clave", "clave"),
+    ("Jornadas", "jornadas", "clave_descarga", "id"),
+    ("Viajes", "viajes", "clave_descarga", "id"),
+    ("Temperaturas", "temperaturas", "clave_descarga", "id"),
+]
+
+
+def _filtro(columna, claves, desde, hasta):
+    condiciones, params = [], []
+    if claves:
+        condiciones.append(f"clave IN ({', '.join(['%s'] * len(claves))})")
+        params.extend(claves)
+    if desde:
+        condiciones.append("fecha >= %s")
+        params.append(desde)
+    if hasta:
+        condiciones.append("fecha <= %s")
+        params.append(hasta)
+    if not condiciones:
+        return "", []
+    where = " AND ".join(condiciones)
+    if columna == "clave":
+        return f" WHERE {where}", params
+    return f" WHERE {columna} IN (SELECT clave FROM descargas WHERE {where})", params
+
+
+def _lotes(conn, tabla, columna, orden, claves, desde, hasta):
+    """Devuelve (columnas, tipos, iterador de lotes) leyendo con un cursor del lado del servidor."""
+    where, params = _filtro(columna, claves, desde, hasta)
+    cursor = db.cursor_servidor(conn, f"exportar_{tabla}")
+    cursor.itersize = TAMANO_LOTE
+    cursor.execute(f"SELECT * FROM {tabla}{where} ORDER BY {orden}", params)
+    primero = cursor.fetchmany(TAMANO_LOTE)
+    columnas = [d[0] for d in cursor.description]
+    tipos = db.tipos_columnas(conn, tabla, cursor.description)
+
+    def iterar():
+        lote = primero
+        while lote:
+            yield lote
+            lote = cursor.fetchmany(TAMANO_LOTE)
+        cursor.close()
+
+    return columnas, tipos, iterar()
+
+
+def _escribir_xlsx(conn, destino, filtros, progreso):
+    from openpyxl import Workbook
+
+    # Modo write_only: las filas van directo al archivo sin quedarse en memoria
+    libro = Workbook(write_only=True)
+    for i, (hoja, tabla, columna, orden) in enumerate(TABLAS):
+        columnas, _, lotes = _lotes(conn, tabla, columna, orden, *filtros)
+        ws = libro.create_sheet(hoja)
+        ws.append(columnas)
+        for lote in lotes:
+            for fila in lote:
+                ws.append(fila)
+        progreso(i + 1)
+    libro.save(destino)
+
+
+def _escribir_csv(conn, destino, filtros, progreso):
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, (hoja, tabla, columna, orden) in enumerate(TABLAS):
+            columnas, _, lotes = _lotes(conn, tabla, columna, orden, *filtros)
+            with zf.open(f"{hoja}.csv", "w") as binario, io.TextIOWrapper(binario, encoding="utf-8", newline="") as texto:
+                escritor = csv.writer(texto)
+                escritor.writerow(columnas)
+                for lote in lotes:
+                    escritor.writerows(lote)
+            progreso(i + 1)
+
+
+def _esquema_arrow(columnas, tipos):
+    import pyarrow as pa
+
+    por_tipo = {
+        "bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(),
+        "date": pa.date32(), "timestamp": pa.timestamp("us"), "text": pa.string(),
+    }
+    return pa.schema([(col, por_tipo[tipo]) for col, tipo in zip(columnas, tipos)])
+
+
+def _escribir_parquet(conn, destino, filtros, progreso):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED) as zf:
+        for i, (hoja, tabla, columna, orden) in enumerate(TABLAS):
+            columnas, tipos, lotes = _lotes(conn, tabla, columna, orden, *filtros)
+            esquema = _esquema_arrow(columnas, tipos)
+            with tempfile.TemporaryFile() as tmp:
+                with pq.ParquetWriter(tmp, esquema, compression="zstd") as escritor:
+                    for lote in lotes:
+                        datos_col = list(zip(*lote))
+                        escritor.write_table(pa.table(
+                            [pa.array(valores, type=campo.type) for valores, campo in zip(datos_col, esquema)],
+                            schema=esquema,
+                        ))
+                tmp.seek(0)
+                with zf.open(f"{hoja}.parquet", "w") as salida:
+                    while bloque := tmp.read(1024 * 1024):
+                        salida.write(bloque)
+            progreso(i + 1)
+
+
+ESCRITORES = {
+    "XLSX": _escribir_xlsx,
+    "CSV": _escribir_csv,
+    "Parquet": _escribir_parquet,
+}
+
+
+def escribir(formato, destino, claves=None, desde=None, hasta=None, progreso=None):
+    """Escribe la exportación filtrada en ``destino`` (ruta o archivo binario abierto)."""
+    progreso = progreso or (lambda _: None)
+    with instrumentacion.tramo("exportar", formato), conexion() as conn:
+        ESCRITORES[formato](conn, destino, (claves, desde, hasta), progreso)
+
+
+def exportar(formato, claves=None, desde=None, hasta=None, progreso=None):
+    """Arma la exportación filtrada en un archivo temporal y devuelve (ruta, nombre de archivo, mime).
+
+    Las filas se leen por lotes desde un cursor del servidor y se escriben directo
+    al archivo, así que ni él ni las tablas pasan por la memoria. Quien lo pide lo
+    borra con descartar() al terminar; si no, se borra al vencer CADUCIDAD.
+    """
+    _borrar_vencidas()
+    extension, mime = FORMATOS[formato]
+    descriptor, ruta = tempfile.mkstemp(prefix=_PREFIJO_TEMPORAL, suffix=f".{extension}")
+    try:
+        with os.fdopen(descriptor, "wb") as destino:
+            escribir(formato, destino, claves, desde, hasta, progreso)
+    except BaseException:
+        descartar(ruta)
+        raise
+    nombre = f"bitacora_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return ruta, nombre, mime
+
+
+def descartar(ruta):
+    """Borra el temporal de una exportación (ya descargada o reemplazada)."""
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def _borrar_vencidas():
+    limite = time.time() - CADUCIDAD
+    for entrada in os.scandir(tempfile.gettempdir()):
+        if entrada.name.startswith(_PREFIJO_TEMPORAL) and entrada.stat().st_mtime < limite:
+            descartar(entrada.path)
@@ -0,0 +1,126 @@
+import pandas as pd
+
+import repositorio
+from db import conexion
+
+# Grillas paginadas de las tablas que crecen con la descarga. Filtros y orden se
+# aplican en SQL y solo se trae la página visible, con paginación por llave
+# (keyset): la página siguiente continúa después de la última fila vista, así
+# que pedir la página 50 cuesta lo mismo que pedir la primera.
+
+FILAS_POR_PAGINA = 50
+
+# Por grilla: columnas que se muestran, orden permitido (columna -> etiqueta),
+# orden por defecto (columna, descendente) y filtros permitidos (columna -> tipo):
+#   "igual": valor exacto · "en": lista de valores · "contiene": texto, sin
+#   distinguir mayúsculas · "rango": tupla (desde, hasta), extremos opcionales
+# "tipos": columnas de orden cuya marca se compara con CAST (temperatura es REAL,
+# float4 en Postgres: sin el CAST la marca en doble precisión nunca es igual a la fila)
+GRILLAS = {
+    "jornadas": {
+        "columnas": ["id", "fecha", "hora_inicio", "hora_fin", "ultimo_consecutivo"],
+        "orden": {"id": "ID", "hora_inicio": "Hora de inicio"},
+        "por_defecto": ("id", True),
+        "filtros": {"fecha": "rango"},
+    },
+    "viajes": {
+        "columnas": [
+            "id", "id_jornada", "consecutivo", "placa", "estado", "hora_inicio_cargue", "hora_fin_cargue",
+            "hora_inicio_transito", "hora_llegada_planta", "hora_ingreso_planta", "hora_inicio_descarga",
+            "hora_fin_descarga",
+        ],
+        "orden": {"id": "ID", "hora_inicio_cargue": "Inicio de cargue", "placa": "Placa"},
+        "por_defecto": ("id", True),
+        "filtros": {"estado": "en", "placa": "contiene", "hora_inicio_cargue": "rango"},
+    },
+    "temperaturas": {
+        "columnas": ["id", "hora_medicion", "bodega", "especie", "talla", "temperatura", "lugar", "id_jornada"],
+        "orden": {"hora_medicion": "Hora de medición", "temperatura": "Temperatura", "bodega": "Bodega", "id": "ID"},
+        "por_defecto": ("hora_medicion", True),
+        "filtros": {"bodega": "contiene", "especie": "en", "lugar": "igual", "hora_medicion": "rango"},
+        "tipos": {"temperatura": "REAL"},
+    },
+}
+
+
+def _condiciones(grilla, clave_descarga, filtros):
+    condiciones, params = ["clave_descarga = %s"], [clave_descarga]
+    for columna, valor in (filtros or {}).items():
+        tipo = GRILLAS[grilla]["filtros"][columna]
+        if tipo == "rango":
+            desde, hasta = valor
+            if desde is not None:
+                condiciones.append(f"{columna} >= %s")
+                params.append(desde)
+            if hasta is not None:
+                condiciones.append(f"{columna} <= %s")
+                params.append(hasta)
+        elif valor in (None, "", [], ()):
+            continue
+        elif tipo == "en":
+            condiciones.append(f"{columna} IN ({', '.join(['%s'] * len(valor))})")
+            params.extend(valor)
+        elif tipo == "contiene":
+            condiciones.append(f"LOWER({columna}) LIKE %s")
+            params.append(f"%{str(valor).strip().lower()}%")
+        else:
+            condiciones.append(f"{columna} = %s")
+            params.append(valor)
+    return condiciones, params
+
+
+def _despues_de(columna, descendente, marca, tipo=None):
+    # Filas posteriores a la marca (valor, id) en el orden "columna, id" con los NULL al final
+    operador = "<" if descendente else ">"
+    valor, id_ = marca
+    if columna == "id":
+        return f"id {operador} %s", [id_]
+    if valor is None:
+        return f"({columna} IS NULL AND id {operador} %s)", [id_]
+    marcador = f"CAST(%s AS {tipo})" if tipo else "%s"
+    return (f"({columna} {operador} {marcador} OR ({columna} = {marcador} AND id {operador} %s) OR {columna} IS NULL)",
+            [valor, valor, id_])
+
+
+def pagina(grilla, clave_descarga, filtros=None, orden=None, descendente=None, marca=None, tamano=FILAS_POR_PAGINA):
+    """Una página de la grilla; devuelve (filas, marca de la página siguiente o None si es la última).
+
+    ``marca`` es la que devolvió la página anterior (None para la primera).
+    """
+    definicion = GRILLAS[grilla]
+    columna_defecto, descendente_defecto = definicion["por_defecto"]
+    orden = orden if orden in definicion["orden"] else columna_defecto
+    descendente = descendente_defecto if descendente is None else descendente
+    condiciones, params = _condiciones(grilla, clave_descarga, filtros)
+    if marca is not None:
+        condicion, valores = _despues_de(orden, descendente, marca, definicion.get("tipos", {}).get(orden))
+        condiciones.append(condicion)
+        params += valores
+
+    direccion = "DESC" if descendente else "ASC"
+    criterio = f"id {direccion}" if orden == "id" else f"{orden} {direccion} NULLS LAST, id {direccion}"
+    columnas = definicion["columnas"]
+    with conexion() as conn:
+        cursor = conn.cursor()
+        # Una fila de más para saber si hay página siguiente sin contar todo
+        cursor.execute(
+            f"SELECT {', '.join(columnas)} FROM {grilla} WHERE {' AND '.join(condiciones)} "
+            f"ORDER BY {criterio} LIMIT %s",
+            params + [tamano + 1],
+        )
+        filas = cursor.fetchall()
+
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        ultima = dict(zip(columnas, filas[-1]))
+        siguiente = (ultima[orden], ultima["id"])
+    return repositorio.tipar(pd.DataFrame(filas, columns=columnas)), siguiente
+
+
+def contar(grilla, clave_descarga, filtros=None):
+    condiciones, params = _condiciones(grilla, clave_descarga, filtros)
+    with conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {grilla} WHERE {' AND '.join(condiciones)}", params)
+        return cursor.fetchone()[0]
@@ -0,0 +1,461 @@
+import argparse
+import csv
+import io
+import os
+import re
+import time
+import zipfile
+from contextlib import ExitStack
+from datetime import date, datetime, time as hora_del_dia, timedelta
+
+import db
+import descargas
+import instrumentacion
+import migraciones
+import temperaturas
+import viajes
+from db import conexion
+
+# Carga de bitácoras históricas con el mismo formato que produce exportar.py: un
+# libro XLSX con las hojas Descargas, Jornadas, Viajes y Temperaturas, o un ZIP (o
+# carpeta) con un CSV por hoja. Las filas se leen por lotes, se validan y se cargan
+# con COPY (Postgres) o executemany (SQLite), todo en una sola transacción.
+#
+#   python importar.py bitacora_2019.xlsx
+#   python importar.py exportacion.zip --simular
+#
+# Los ids del archivo solo sirven para ligar las hojas entre sí: las jornadas
+# reciben ids nuevos de la secuencia y los viajes y lecturas los que asigne la base.
+# Una descarga cuya clave ya existe se omite junto con todo lo que cuelga de ella,
+# así que volver a importar el mismo archivo no duplica nada.
+
+# Filas por lote leídas del archivo y cargadas con un COPY
+TAMANO_LOTE = int(os.getenv("IMPORT_LOTE", "10000"))
+# Al llegar a esta cantidad de errores se deja de leer
+MAX_ERRORES = 50
+
+class ImportacionError(Exception):
+    """El archivo no se importó; ``errores`` lista los problemas encontrados."""
+
+    def __init__(self, errores):
+        super().__init__(f"{len(errores)} error(es) en el archivo; no se importó nada.")
+        self.errores = errores
+
+
+# ==== Conversión de valores ====
+# Los CSV traen texto y los XLSX tipos nativos; las planillas viejas suelen tener
+# fechas dd/mm/aaaa y coma decimal.
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip() or None
+
+
+def _entero(valor):
+    valor = _texto(valor)
+    return None if valor is None else int(float(valor.replace(",", ".")))
+
+
+def _real(valor):
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    valor = _texto(valor)
+    return None if valor is None else float(valor.replace(",", "."))
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    valor = _texto(valor)
+    if valor is None:
+        return None
+    try:
+        return date.fromisoformat(valor[:10])
+    except ValueError:
+        return datetime.strptime(valor, "%d/%m/%Y").date()
+
+
+def _hora(valor):
+    # Las exportaciones anteriores a las columnas tipadas traen solo la hora ("08:15:00",
+    # o una celda de hora en Excel): se devuelve un time y _Carga le pone la fecha
+    if isinstance(valor, (datetime, hora_del_dia)):
+        return valor
+    if isinstance(valor, date):
+        return datetime.combine(valor, hora_del_dia())
+    valor = _texto(valor)
+    if valor is None:
+        return None
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        pass
+    for formato in ("%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.strptime(valor, formato).time()
+        except ValueError:
+            continue
+    for formato in ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(valor, formato)
+        except ValueError:
+            continue
+    raise ValueError(valor)
+
+
+# (hoja, tabla, columnas aceptadas -> convertidor, columnas obligatorias); el resto se ignora
+HOJAS = [
+    ("Descargas", "descargas", {"clave": _texto, "barco": _texto, "lote": _texto, "fecha": _fecha},
+     ["barco"]),
+    ("Jornadas", "jornadas", {
+        "id": _entero, "clave_descarga": _texto, "fecha": _fecha, "hora_inicio": _hora, "hora_fin": _hora,
+        "ultimo_consecutivo": _entero,
+    }, ["id", "clave_descarga"]),
+    ("Viajes", "viajes", {
+        "clave_descarga": _texto, "id_jornada": _entero, "consecutivo": _texto, "placa": _texto, "estado": _texto,
+        **{col: _hora for col in migraciones.HORAS_VIAJE}, "updated_at": _hora, "cupo_cargue": _entero,
+    }, ["clave_descarga", "id_jornada", "estado"]),
+    ("Temperaturas", "temperaturas", {
+        "hora_medicion": _hora, "bodega": _texto, "especie": _texto, "talla": _texto, "temperatura": _real,
+        "lugar": _texto, "clave_descarga": _texto, "id_jornada": _entero,
+    }, ["clave_descarga", "temperatura"]),
+]
+
+
+# ==== Lectura del archivo ====
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    # Excel en español guarda los CSV separados por punto y coma
+    primera = texto.readline()
+    separador = ";" if primera.count(";") > primera.count(",") else ","
+    yield next(csv.reader([primera], delimiter=separador))
+    yield from csv.reader(texto, delimiter=separador)
+
+
+def _hojas(origen, pila):
+    """Devuelve {hoja: iterador de filas (la primera es el encabezado)} con las hojas que trae el archivo."""
+    nombre = str(getattr(origen, "name", origen)).lower()
+    if not hasattr(origen, "read") and os.path.isdir(origen):
+        return {
+            hoja: _filas_csv(pila.enter_context(open(os.path.join(origen, f"{hoja}.csv"), "rb")))
+            for hoja, *_ in HOJAS if os.path.exists(os.path.join(origen, f"{hoja}.csv"))
+        }
+    if nombre.endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+
+        # Modo read_only: las filas se leen del archivo a medida que se piden
+        libro = load_workbook(origen, read_only=True, data_only=True)
+        pila.callback(libro.close)
+        return {hoja: libro[hoja].iter_rows(values_only=True) for hoja, *_ in HOJAS if hoja in libro.sheetnames}
+    if nombre.endswith(".zip"):
+        zf = pila.enter_context(zipfile.ZipFile(origen))
+        miembros = {os.path.basename(n): n for n in zf.namelist()}
+        return {
+            hoja: _filas_csv(pila.enter_context(zf.open(miembros[f"{hoja}.csv"])))
+            for hoja, *_ in HOJAS if f"{hoja}.csv" in miembros
+        }
+    raise ValueError("Formato no soportado: use un libro .xlsx, un .zip de CSV o una carpeta con los CSV.")
+
+
+def _lotes(hoja, filas, convertidores, obligatorias, errores):
+    """Lee la hoja por lotes; cada lote es una lista de (número de fila, dict de valores convertidos)."""
+    encabezado = [_texto(col).lower() if _texto(col) else "" for col in next(filas, [])]
+    faltan = [col for col in obligatorias if col not in encabezado]
+    if faltan:
+        errores.append(f"{hoja}: faltan las columnas {', '.join(faltan)}.")
+        return
+    posiciones = [(i, col, convertidores[col]) for i, col in enumerate(encabezado) if col in convertidores]
+    lote = []
+    for numero, fila in enumerate(filas, start=2):
+        if not any(v not in (None, "") for v in fila):
+            continue
+        valores = dict.fromkeys(convertidores)
+        antes = len(errores)
+        for i, col, convertir in posiciones:
+            valor = fila[i] if i < len(fila) else None
+            try:
+                valores[col] = convertir(valor)
+            except (ValueError, TypeError):
+                errores.append(f"{hoja}, fila {numero}: {col} inválido ({valor}).")
+        faltantes = [col for col in obligatorias if valores[col] is None]
+        if faltantes:
+            errores.append(f"{hoja}, fila {numero}: falta {', '.join(faltantes)}.")
+        if len(errores) >= MAX_ERRORES:
+            return
+        if len(errores) == antes:
+            lote.append((numero, valores))
+        if len(lote) >= TAMANO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# ==== Carga ====
+
+class _Carga:
+    """Estado de una importación: correspondencia de claves e ids del archivo a la base."""
+
+    def __init__(self, cursor, errores):
+        self.cursor = cursor
+        self.errores = errores
+        self.claves = {}  # clave en el archivo -> clave en la base
+        self.omitidas = set()  # claves que ya existían
+        self.ids_jornadas = {}  # id en el archivo -> id nuevo
+        self.jornadas_omitidas = set()
+        self.consecutivos = {}  # id nuevo de jornada -> mayor número de consecutivo importado
+        self.fechas = {}  # clave -> fecha de la descarga
+        self.inicios = {}  # id nuevo de jornada -> (fecha, hora_inicio)
+        self.cargadas = dict.fromkeys(tabla for _, tabla, *_ in HOJAS)
+        self.omitidas_filas = 0
+        # En Postgres las métricas y alertas se calculan al final en bloque, no fila por fila
+        self.metricas_diferidas = migraciones.diferir_metricas(cursor)
+
+    def error(self, hoja, numero, mensaje):
+        self.errores.append(f"{hoja}, fila {numero}: {mensaje}")
+
+    def _con_fecha(self, hoja, numero, fila, columnas, fecha, inicio=None):
+        """Pone fecha a las horas sueltas de la fila, como la migración 2 con las horas en texto.
+
+        Las que quedan antes del inicio de la jornada son de un turno que cruzó la
+        medianoche y pasan al día siguiente. Devuelve False si faltaba la fecha.
+        """
+        for col in columnas:
+            hora = fila[col]
+            if not isinstance(hora, hora_del_dia):
+                continue
+            if fecha is None:
+                self.error(hoja, numero, f"{col} trae solo la hora ({hora}) y no hay fecha de jornada ni de descarga.")
+                return False
+            fila[col] = datetime.combine(fecha, hora)
+            if inicio is not None and hora < inicio.time():
+                fila[col] += timedelta(days=1)
+        return True
+
+    def _descarga(self, hoja, numero, clave):
+        """Clave en la base para una referencia del archivo; None si la fila se omite o es inválida."""
+        if clave in self.omitidas:
+            self.omitidas_filas += 1
+            return None
+        if clave not in self.claves:
+            self.error(hoja, numero, f"la descarga {clave} no está en la hoja Descargas.")
+            return None
+        return self.claves[clave]
+
+    def descargas(self, hoja, lote):
+        nuevas = {}
+        for numero, fila in lote:
+            if not fila["clave"] and not fila["fecha"]:
+                self.error(hoja, numero, "sin clave hace falta la fecha para armarla.")
+                continue
+            clave_archivo = fila["clave"] or descargas.clave(fila["barco"], fila["fecha"], fila["lote"])
+            if clave_archivo in self.claves or clave_archivo in self.omitidas or clave_archivo in nuevas:
+                self.error(hoja, numero, f"la clave {clave_archivo} está repetida.")
+                continue
+            nuevas[clave_archivo] = (clave_archivo, fila["barco"], fila["lote"], fila["fecha"])
+        if not nuevas:
+            return []
+        self.cursor.execute(
+            f"SELECT clave FROM descargas WHERE clave IN ({', '.join(['%s'] * len(nuevas))})", list(nuevas),
+        )
+        for (existente,) in self.cursor.fetchall():
+            self.omitidas.add(existente)
+            del nuevas[existente]
+        self.claves.update((clave, clave) for clave in nuevas)
+        self.fechas.update((clave, fila[3]) for clave, fila in nuevas.items())
+        return list(nuevas.values())
+
+    def jornadas(self, hoja, lote):
+        validas = []
+        for numero, fila in lote:
+            if fila["id"] in self.ids_jornadas or fila["id"] in self.jornadas_omitidas:
+                self.error(hoja, numero, f"el id {fila['id']} está repetido.")
+                continue
+            if fila["clave_descarga"] in self.omitidas:
+                self.jornadas_omitidas.add(fila["id"])
+            clave = self._descarga(hoja, numero, fila["clave_descarga"])
+            if clave is None:
+                continue
+            fecha = fila["fecha"] or self.fechas[clave]
+            if self._con_fecha(hoja, numero, fila, ["hora_inicio"], fecha) and self._con_fecha(
+                hoja, numero, fila, ["hora_fin"], fecha, fila["hora_inicio"],
+            ):
+                validas.append((fila, clave))
+        filas = []
+        for (fila, clave), id_nuevo in zip(validas, db.reservar_ids(self.cursor, "jornadas", len(validas))):
+            self.ids_jornadas[fila["id"]] = id_nuevo
+            self.consecutivos[id_nuevo] = fila["ultimo_consecutivo"] or 0
+            self.inicios[id_nuevo] = (fila["fecha"] or self.fechas[clave], fila["hora_inicio"])
+            filas.append((id_nuevo, clave, fila["fecha"], fila["hora_inicio"], fila["hora_fin"], fila["ultimo_consecutivo"] or 0))
+        return filas
+
+    def _jornada(self, hoja, numero, id_archivo):
+        if id_archivo in self.ids_jornadas:
+            return self.ids_jornadas[id_archivo]
+        if id_archivo not in self.jornadas_omitidas:
+            self.error(hoja, numero, f"la jornada {id_archivo} no está en la hoja Jornadas.")
+        return None
+
+    def viajes(self, hoja, lote):
+        filas = []
+        for numero, fila in lote:
+            if fila["estado"] not in viajes.ESTADOS:
+                self.error(hoja, numero, f"estado inválido ({fila['estado']}).")
+                continue
+            clave = self._descarga(hoja, numero, fila["clave_descarga"])
+            if clave is None:
+                continue
+            id_jornada = self._jornada(hoja, numero, fila["id_jornada"])
+            if id_jornada is None or not self._con_fecha(hoja, numero, fila, migraciones.HORAS_VIAJE, *self.inicios[id_jornada]):
+                continue
+            if fila["consecutivo"]:
+                numero_consecutivo = int(re.sub(r"\D", "", fila["consecutivo"]) or 0)
+                self.consecutivos[id_jornada] = max(self.consecutivos[id_jornada], numero_consecutivo)
+            filas.append((
+                clave, id_jornada, fila["consecutivo"], fila["placa"], fila["estado"],
+                *(fila[col] for col in migraciones.HORAS_VIAJE),
+                fila["updated_at"] or max((fila[col] for col in migraciones.HORAS_VIAJE if fila[col]), default=datetime.now()),
+                fila["cupo_cargue"] if fila["estado"] == "CARGUE" else None,
+            ))
+        return filas
+
+    def temperaturas(self, hoja, lote):
+        filas = []
+        for numero, fila in lote:
+            if not temperaturas.TEMPERATURA_MIN <= fila["temperatura"] <= temperaturas.TEMPERATURA_MAX:
+                self.error(hoja, numero, f"temperatura fuera de rango ({fila['temperatura']} °C).")
+                continue
+            # Las mismas listas que la app: umbrales y alertas se cruzan por especie
+            especie, talla = (fila[col] and fila[col].upper() for col in ("especie", "talla"))
+            if especie not in temperaturas.ESPECIES:
+                self.error(hoja, numero, f"especie inválida ({fila['especie']}).")
+                continue
+            if talla not in temperaturas.TALLAS:
+                self.error(hoja, numero, f"talla inválida ({fila['talla']}).")
+                continue
+            clave = self._descarga(hoja, numero, fila["clave_descarga"])
+            if clave is None:
+                continue
+            id_jornada = None
+            fecha, inicio = self.fechas[clave], None
+            if fila["id_jornada"] is not None:
+                id_jornada = self._jornada(hoja, numero, fila["id_jornada"])
+                if id_jornada is None:
+                    continue
+                fecha, inicio = self.inicios[id_jornada]
+            if not self._con_fecha(hoja, numero, fila, ["hora_medicion"], fecha, inicio):
+                continue
+            filas.append((
+                fila["hora_medicion"], fila["bodega"], especie, talla, fila["temperatura"],
+                fila["lugar"], clave, id_jornada,
+            ))
+        return filas
+
+    def cerrar(self):
+        if self.metricas_diferidas:
+            migraciones.recalcular_metricas_descargas(self.cursor, list(self.claves.values()))
+            migraciones.evaluar_alertas_descargas(self.cursor, list(self.claves.values()))
+        # Las jornadas que no traían contador siguen desde el mayor consecutivo importado
+        self.cursor.executemany(
+            "UPDATE jornadas SET ultimo_consecutivo = %s WHERE id = %s AND ultimo_consecutivo < %s",
+            [(n, id_jornada, n) for id_jornada, n in self.consecutivos.items() if n],
+        )
+
+
+# Columnas que se insertan en cada tabla; las filas las arma el método homónimo de _Carga
+COLUMNAS_DESTINO = {
+    "descargas": ["clave", "barco", "lote", "fecha"],
+    "jornadas": ["id", "clave_descarga", "fecha", "hora_inicio", "hora_fin", "ultimo_consecutivo"],
+    "viajes": ["clave_descarga", "id_jornada", "consecutivo", "placa", "estado", *migraciones.HORAS_VIAJE, "updated_at", "cupo_cargue"],
+    "temperaturas": ["hora_medicion", "bodega", "especie", "talla", "temperatura", "lugar", "clave_descarga", "id_jornada"],
+}
+
+
+def _cargar(hojas, simular, progreso, errores):
+    with instrumentacion.tramo("importar", "archivo"), conexion() as conn:
+        carga = _Carga(conn.cursor(), errores)
+        for hoja, tabla, convertidores, obligatorias in HOJAS:
+            if hoja not in hojas:
+                continue
+            leidas = cargadas = 0
+            for lote in _lotes(hoja, hojas[hoja], convertidores, obligatorias, errores):
+                filas = getattr(carga, tabla)(hoja, lote)
+                if len(errores) >= MAX_ERRORES:
+                    break
+                if not errores:
+                    db.copiar_filas(carga.cursor, tabla, COLUMNAS_DESTINO[tabla], filas)
+                leidas += len(lote)
+                cargadas += len(filas)
+                progreso(hoja, leidas)
+            carga.cargadas[tabla] = cargadas
+            if len(errores) >= MAX_ERRORES:
+                errores.append(f"Se detuvo la lectura tras {MAX_ERRORES} errores.")
+                break
+        if errores:
+            raise ImportacionError(errores)
+        carga.cerrar()
+        if simular:
+            conn.rollback()
+    return carga
+
+
+def importar(origen, simular=False, progreso=None):
+    """Importa el archivo (ruta, carpeta o archivo subido) y devuelve un resumen.
+
+    Todo va en una transacción: si alguna fila no pasa la validación o la base la
+    rechaza no se guarda nada y se lanza ImportacionError. Con ``simular`` se
+    valida y carga igual, pero al final se deshace. ``progreso(hoja, filas)`` se
+    llama tras cada lote.
+    """
+    progreso = progreso or (lambda hoja, filas: None)
+    errores = []
+    inicio = time.perf_counter()
+    with ExitStack() as pila:
+        hojas = _hojas(origen, pila)
+        if not hojas:
+            raise ImportacionError(["El archivo no trae ninguna de las hojas " + ", ".join(h for h, *_ in HOJAS) + "."])
+        try:
+            carga = _cargar(hojas, simular, progreso, errores)
+        except db.ERRORES_INTEGRIDAD as e:
+            raise ImportacionError([f"La base rechazó los datos: {e}"]) from e
+    return {
+        "filas": carga.cargadas,
+        "descargas_omitidas": sorted(carga.omitidas),
+        "filas_omitidas": carga.omitidas_filas,
+        "segundos": time.perf_counter() - inicio,
+        "simulado": simular,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa bitácoras históricas (XLSX, ZIP de CSV o carpeta)")
+    parser.add_argument("archivo")
+    parser.add_argument("--simular", action="store_true", help="Valida y carga, pero deshace al final")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+
+    def mostrar(hoja, filas):
+        segundos = time.perf_counter() - inicio
+        print(f"\r{hoja}: {filas:,} filas ({filas / segundos if segundos else 0:,.0f} filas/s en total)   ", end="", flush=True)
+
+    try:
+        resumen = importar(args.archivo, simular=args.simular, progreso=mostrar)
+    except ImportacionError as e:
+        print()
+        print("❌", e)
+        for error in e.errores:
+            print("  -", error)
+        raise SystemExit(1)
+    print()
+    print(("🧪 Simulación (no se guardó nada): " if resumen["simulado"] else "✅ Importado: ")
+          + ", ".join(f"{tabla} {n or 0:,}" for tabla, n in resumen["filas"].items())
+          + f" en {resumen['segundos']:.1f} s")
+    if resumen["descargas_omitidas"]:
+        print(f"ℹ️ {len(resumen['descargas_omitidas'])} descarga(s) ya existían y se omitieron "
+              f"con {resumen['filas_omitidas']:,} filas: {', '.join(resumen['descargas_omitidas'][:10])}")
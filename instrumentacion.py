@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+# Mediciones en memoria de consultas, secciones y reruns. Cuesta un par de
+# perf_counter y un append por consulta, así que queda activa en producción.
+ACTIVA = os.getenv("INSTRUMENTACION", "1") != "0"
+# Eventos que se conservan (los más viejos se descartan)
+CAPACIDAD = int(os.getenv("INSTRUMENTACION_EVENTOS", "5000"))
+# Si está activo, cada evento se escribe también como una línea JSON en el log
+LOG_JSON = os.getenv("INSTRUMENTACION_LOG_JSON", "0") == "1"
+# Puerto del endpoint /metrics en formato Prometheus; 0 = apagado
+PUERTO_PROMETHEUS = int(os.getenv("INSTRUMENTACION_PROMETHEUS_PUERTO", "0"))
+
+log = logging.getLogger("bitacora.instrumentacion")
+if LOG_JSON and not log.handlers:
+    _manejador = logging.StreamHandler()
+    _manejador.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_manejador)
+    log.setLevel(logging.INFO)
+
+_eventos = deque(maxlen=CAPACIDAD)
+# (tipo, nombre) -> [cantidad, ms totales, ms máximo, filas]
+_totales = {}
+_contadores = {}
+_lock = threading.Lock()
+_hilo = threading.local()
+
+
+def nombre_sql(sql):
+    """Forma normalizada de una sentencia para agruparla: sin saltos de línea y
+    con las listas de parámetros de largo variable colapsadas."""
+    if isinstance(sql, bytes):
+        # execute_values manda la sentencia ya armada, con los valores incrustados;
+        # se agrupa por lo que va antes de ellos
+        valores = re.search(rb"\sVALUES\s", sql, re.IGNORECASE)
+        sql = (sql[:valores.end()] + b"...") if valores else sql[:500]
+        sql = sql.decode(errors="replace")
+    texto = " ".join(sql.split())
+    texto = re.sub(r"%s(, %s)+", "%s, ...", texto)
+    return texto[:160]
+
+
+def _pila():
+    pila = getattr(_hilo, "pila", None)
+    if pila is None:
+        pila = _hilo.pila = []
+    return pila
+
+
+def _registrar(tipo, nombre, ms, filas=None, **extra):
+    evento = {"ts": time.time(), "tipo": tipo, "nombre": nombre, "ms": round(ms, 3), "filas": filas, **extra}
+    with _lock:
+        _eventos.append(evento)
+        total = _totales.setdefault((tipo, nombre), [0, 0.0, 0.0, 0])
+        total[0] += 1
+        total[1] += ms
+        total[2] = max(total[2], ms)
+        total[3] += filas or 0
+    if LOG_JSON:
+        log.info(json.dumps(evento, default=str))
+    return evento
+
+
+def consulta(sql, ms, filas=None):
+    """Registra una sentencia ejecutada; devuelve el evento para sumarle filas leídas después."""
+    if not ACTIVA:
+        return None
+    for acumulado in _pila():
+        acumulado["consultas"] += 1
+        acumulado["ms_bd"] += ms
+        acumulado["filas"] += filas or 0
+    return _registrar("consulta", nombre_sql(sql), ms, filas)
+
+
+def sumar_filas(evento, filas):
+    # Filas que se conocen al leer (cursores del servidor, SQLite)
+    if evento is None or not filas:
+        return
+    with _lock:
+        evento["filas"] = (evento["filas"] or 0) + filas
+        _totales[(evento["tipo"], evento["nombre"])][3] += filas
+    for acumulado in _pila():
+        acumulado["filas"] += filas
+
+
+def espera_conexion(ms):
+    """Tiempo que se esperó para obtener una conexión."""
+    if not ACTIVA:
+        return
+    for acumulado in _pila():
+        acumulado["ms_conexion"] += ms
+    contar("espera_conexion_ms", ms)
+
+
+def contar(nombre, cantidad=1):
+    with _lock:
+        _contadores[nombre] = _contadores.get(nombre, 0) + cantidad
+
+
+def _acumulador():
+    return {"consultas": 0, "ms_bd": 0.0, "ms_conexion": 0.0, "filas": 0, "inicio": time.perf_counter()}
+
+
+def _cerrar(tipo, nombre, acumulado):
+    ms = (time.perf_counter() - acumulado.pop("inicio")) * 1000
+    filas = acumulado.pop("filas")
+    return _registrar(tipo, nombre, ms, filas, **{k: round(v, 3) for k, v in acumulado.items()})
+
+
+@contextmanager
+def tramo(tipo, nombre):
+    """Mide un bloque (una sección, un fragmento, una exportación) con las consultas que hizo."""
+    if not ACTIVA:
+        yield
+        return
+    acumulado = _acumulador()
+    pila = _pila()
+    pila.append(acumulado)
+    try:
+        yield
+    finally:
+        pila.remove(acumulado)
+        _cerrar(tipo, nombre, acumulado)
+
+
+def medido(tipo, nombre):
+    """Decorador equivalente a ``with tramo(tipo, nombre)``."""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with tramo(tipo, nombre):
+                return funcion(*args, **kwargs)
+        return envuelta
+    return decorador
+
+
+def inicio_rerun():
+    # Un rerun interrumpido (st.rerun, st.stop) deja su acumulador; se descarta
+    if ACTIVA:
+        _hilo.pila = [_acumulador()]
+
+
+def fin_rerun(nombre):
+    pila = _pila()
+    if ACTIVA and pila:
+        _cerrar("rerun", nombre, pila.pop(0))
+        pila.clear()
+
+
+# ==== Consulta de lo medido ====
+
+def eventos(tipo=None):
+    with _lock:
+        return [dict(e) for e in _eventos if tipo is None or e["tipo"] == tipo]
+
+
+def totales(tipo=None):
+    with _lock:
+        filas = [
+            {"tipo": t, "nombre": n, "cantidad": c, "ms_total": round(ms, 1),
+             "ms_promedio": round(ms / c, 2), "ms_max": round(maximo, 2), "filas": f}
+            for (t, n), (c, ms, maximo, f) in _totales.items()
+            if tipo is None or t == tipo
+        ]
+    return sorted(filas, key=lambda fila: fila["ms_total"], reverse=True)
+
+
+def contadores():
+    with _lock:
+        return dict(_contadores)
+
+
+def reiniciar():
+    with _lock:
+        _eventos.clear()
+        _totales.clear()
+
+
+def _etiqueta(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def prometheus():
+    """Totales acumulados en el formato de texto de Prometheus."""
+    lineas = []
+    metricas = [
+        ("bitacora_eventos_total", "counter", "Eventos medidos", 0),
+        ("bitacora_eventos_segundos_total", "counter", "Tiempo acumulado", 1),
+        ("bitacora_eventos_segundos_max", "gauge", "Evento más lento", 2),
+        ("bitacora_filas_total", "counter", "Filas devueltas o afectadas", 3),
+    ]
+    with _lock:
+        totales_ = list(_totales.items())
+        contadores_ = dict(_contadores)
+    for metrica, tipo_metrica, ayuda, indice in metricas:
+        lineas += [f"# HELP {metrica} {ayuda}", f"# TYPE {metrica} {tipo_metrica}"]
+        for (tipo, nombre), valores in totales_:
+            valor = valores[indice] / 1000 if indice in (1, 2) else valores[indice]
+            lineas.append(f'{metrica}{{tipo="{tipo}",nombre="{_etiqueta(nombre)}"}} {valor}')
+    for nombre, valor in contadores_.items():
+        metrica = f"bitacora_{nombre}_total"
+        lineas += [f"# TYPE {metrica} counter", f"{metrica} {valor}"]
+    return "\n".join(lineas) + "\n"
+
+
+class _Metricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@st.cache_resource(show_spinner=False)
+def servir_prometheus(puerto=PUERTO_PROMETHEUS):
+    # Un servidor por proceso, en un hilo aparte
+    servidor = ThreadingHTTPServer(("0.0.0.0", puerto), _Metricas)
+    threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+    return servidor
@@ -0,0 +1,844 @@
+import sys
+from datetime import date, datetime, time, timedelta
+
+import streamlit as st
+
+import db
+import setup_db
+from db import conexion_postgres, conexion_sqlite
+
+# Cada migración es (versión, nombre, sentencias). Se aplican en orden, una por
+# transacción, y la versión queda registrada en schema_migraciones.
+# Nunca se edita una migración ya publicada: los cambios van en una nueva.
+
+HORAS_VIAJE = [
+    "hora_inicio_cargue", "hora_fin_cargue", "hora_inicio_transito", "hora_llegada_planta",
+    "hora_ingreso_planta", "hora_inicio_descarga", "hora_fin_descarga",
+]
+
+
+def _hora_en_jornada(col, alias):
+    # Fecha de la jornada + hora; si la hora es anterior al inicio de la jornada,
+    # el turno cruzó la medianoche y corresponde al día siguiente.
+    hora = f"NULLIF({alias}.{col}, '')::time"
+    return (
+        f"j.fecha + {hora} + CASE WHEN {hora} < j.hora_inicio::time "
+        f"THEN INTERVAL '1 day' ELSE INTERVAL '0' END"
+    )
+
+
+def _hora_sin_jornada(col, alias):
+    # Sin jornada: el texto tal cual si trae fecha, si no la fecha de la descarga + hora
+    return (
+        rf"CASE WHEN {alias}.{col} ~ '^\d{{4}}-\d{{2}}-\d{{2}}[ T]\d' THEN {alias}.{col}::timestamp "
+        f"ELSE (SELECT d.fecha FROM descargas d WHERE d.clave = {alias}.clave_descarga) + NULLIF({alias}.{col}, '')::time END"
+    )
+
+
+def _convertir_a_timestamp(tabla, alias, columnas):
+    """Agrega columnas TIMESTAMP, las llena desde el texto y reemplaza las originales.
+
+    Si queda alguna hora con texto que no se pudo convertir, la migración se
+    aborta antes de borrar las columnas de texto.
+    """
+    sentencias = [f"ALTER TABLE {tabla} " + ", ".join(f"ADD COLUMN {col}_ts TIMESTAMP" for col in columnas)]
+    sentencias.append(
+        f"UPDATE {tabla} {alias} SET "
+        + ", ".join(f"{col}_ts = {_hora_en_jornada(col, alias)}" for col in columnas)
+        + f" FROM jornadas j WHERE j.id = {alias}.id_jornada"
+    )
+    # Filas con id_jornada nulo o de una jornada que ya no existe
+    sentencias.append(
+        f"UPDATE {tabla} {alias} SET "
+        + ", ".join(f"{col}_ts = {_hora_sin_jornada(col, alias)}" for col in columnas)
+        + f" WHERE NOT EXISTS (SELECT 1 FROM jornadas j WHERE j.id = {alias}.id_jornada)"
+    )
+    sin_convertir = " OR ".join(f"(NULLIF({col}, '') IS NOT NULL AND {col}_ts IS NULL)" for col in columnas)
+    sentencias.append(f"""
+        DO $$
+        DECLARE ids TEXT;
+        BEGIN
+            SELECT string_agg(id::text, ', ' ORDER BY id) INTO ids FROM {tabla} WHERE {sin_convertir};
+            IF ids IS NOT NULL THEN
+                RAISE EXCEPTION '{tabla}: horas sin jornada ni descarga para convertirlas (ids %); corríjalas y vuelva a migrar', ids;
+            END IF;
+        END $$
+    """)
+    sentencias.append(f"ALTER TABLE {tabla} " + ", ".join(f"DROP COLUMN {col}" for col in columnas))
+    sentencias += [f"ALTER TABLE {tabla} RENAME COLUMN {col}_ts TO {col}" for col in columnas]
+    return sentencias
+
+
+# ==== Métricas de viajes ====
+# viaje_metricas guarda la duración de cada eslabón de un viaje finalizado y
+# metricas_rollup los totales por descarga, jornada, día y placa (estos dos
+# últimos dentro de su descarga). Los mantienen triggers sobre viajes, así que
+# cualquier camino de escritura (app, sincronización, importación) los deja al día.
+
+# (columna, hora de fin, hora de inicio) de cada eslabón
+ESLABONES_METRICAS = [
+    ("duracion_cargue", "hora_fin_cargue", "hora_inicio_cargue"),
+    ("transito", "hora_llegada_planta", "hora_inicio_transito"),
+    ("espera_planta", "hora_ingreso_planta", "hora_llegada_planta"),
+    ("inicio_descarga", "hora_inicio_descarga", "hora_ingreso_planta"),
+    ("duracion_descarga", "hora_fin_descarga", "hora_inicio_descarga"),
+]
+NIVELES_ROLLUP = ["descarga", "jornada", "dia", "placa"]
+# Columnas de viajes que, si cambian en un viaje finalizado, obligan a recalcular
+_COLUMNAS_METRICAS = ["estado", "clave_descarga", "id_jornada", "consecutivo", "placa"] + HORAS_VIAJE
+
+
+def _minutos_pg(fin, inicio):
+    return f"EXTRACT(EPOCH FROM {fin} - {inicio}) / 60"
+
+
+def _minutos_sqlite(fin, inicio):
+    return f"(julianday({fin}) - julianday({inicio})) * 1440"
+
+
+def _sql_metricas(minutos, real):
+    """Sentencias de métricas para un dialecto: tablas, altas/bajas por viaje y recálculo completo."""
+    columnas = [col for col, _, _ in ESLABONES_METRICAS]
+    agregados = ["viajes"] + [f"{prefijo}_{col}" for col in columnas for prefijo in ("suma", "n")]
+    tablas = [
+        f"""
+        CREATE TABLE IF NOT EXISTS viaje_metricas (
+            id_viaje INTEGER PRIMARY KEY, clave_descarga TEXT, id_jornada INTEGER, fecha DATE,
+            consecutivo TEXT, placa TEXT, {", ".join(f"{col} {real}" for col in columnas)}, finalizado_en TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_viaje_metricas_grupo ON viaje_metricas (clave_descarga, fecha)",
+        f"""
+        CREATE TABLE IF NOT EXISTS metricas_rollup (
+            grupo TEXT PRIMARY KEY, nivel TEXT NOT NULL, clave_descarga TEXT, id_jornada INTEGER,
+            fecha DATE, placa TEXT, viajes INTEGER NOT NULL,
+            {", ".join(f"suma_{col} {real} NOT NULL, n_{col} INTEGER NOT NULL" for col in columnas)}
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_metricas_rollup_descarga ON metricas_rollup (clave_descarga, nivel, fecha)",
+    ]
+
+    def metricas_de(fila):
+        return (
+            f"{fila}.id, {fila}.clave_descarga, {fila}.id_jornada, "
+            f"(SELECT j.fecha FROM jornadas j WHERE j.id = {fila}.id_jornada), {fila}.consecutivo, {fila}.placa, "
+            + ", ".join(minutos(f"{fila}.{fin}", f"{fila}.{inicio}") for _, fin, inicio in ESLABONES_METRICAS)
+            + f", {fila}.hora_fin_descarga"
+        )
+
+    insertar_metricas = (
+        "INSERT INTO viaje_metricas (id_viaje, clave_descarga, id_jornada, fecha, consecutivo, placa, "
+        + ", ".join(columnas) + ", finalizado_en) SELECT "
+    )
+
+    def texto(expresion):
+        return f"COALESCE(CAST({expresion} AS TEXT), '')"
+
+    grupo = (
+        f"CASE n.nivel WHEN 'descarga' THEN 'descarga|' || {texto('m.clave_descarga')} "
+        f"WHEN 'jornada' THEN 'jornada|' || {texto('m.id_jornada')} "
+        f"WHEN 'dia' THEN 'dia|' || {texto('m.clave_descarga')} || '|' || {texto('m.fecha')} "
+        f"ELSE 'placa|' || {texto('m.clave_descarga')} || '|' || {texto('m.fecha')} || '|' || {texto('m.placa')} END"
+    )
+    niveles = " UNION ALL ".join(f"SELECT '{nivel}' AS nivel" for nivel in NIVELES_ROLLUP)
+
+    def aportes(signo):
+        # Lo que aporta cada fila de viaje_metricas a sus cuatro grupos
+        return (
+            f"SELECT {grupo} AS grupo, n.nivel AS nivel, m.clave_descarga AS clave_descarga, "
+            "CASE WHEN n.nivel = 'jornada' THEN m.id_jornada END AS id_jornada, "
+            "CASE WHEN n.nivel <> 'descarga' THEN m.fecha END AS fecha, "
+            f"CASE WHEN n.nivel = 'placa' THEN m.placa END AS placa, {signo} AS viajes, "
+            + ", ".join(
+                f"{signo} * COALESCE(m.{col}, 0) AS suma_{col}, "
+                f"{signo} * CASE WHEN m.{col} IS NULL THEN 0 ELSE 1 END AS n_{col}"
+                for col in columnas
+            )
+            + f" FROM viaje_metricas m CROSS JOIN ({niveles}) n"
+        )
+
+    lista_rollup = "grupo, nivel, clave_descarga, id_jornada, fecha, placa, " + ", ".join(agregados)
+
+    def sumar(fila, signo):
+        return (
+            f"INSERT INTO metricas_rollup ({lista_rollup}) {aportes(signo)} WHERE m.id_viaje = {fila}.id "
+            "ON CONFLICT (grupo) DO UPDATE SET "
+            + ", ".join(f"{col} = metricas_rollup.{col} + excluded.{col}" for col in agregados)
+        )
+
+    return {
+        "tablas": tablas,
+        # Alta de un viaje finalizado (fila = NEW)
+        "agregar": lambda fila: [
+            insertar_metricas + metricas_de(fila) + f" WHERE {fila}.estado = 'FINALIZADO'",
+            sumar(fila, 1),
+        ],
+        # Baja de lo que aportaba un viaje (fila = OLD)
+        "quitar": lambda fila: [
+            sumar(fila, -1),
+            f"DELETE FROM metricas_rollup WHERE clave_descarga = {fila}.clave_descarga AND viajes <= 0",
+            f"DELETE FROM viaje_metricas WHERE id_viaje = {fila}.id",
+        ],
+        # Recalcula todo desde viajes (backfill o reparación)
+        "recalcular": [
+            "DELETE FROM metricas_rollup",
+            "DELETE FROM viaje_metricas",
+            insertar_metricas + metricas_de("v") + " FROM viajes v WHERE v.estado = 'FINALIZADO'",
+            f"INSERT INTO metricas_rollup ({lista_rollup}) "
+            f"SELECT grupo, nivel, clave_descarga, id_jornada, fecha, placa, "
+            + ", ".join(f"SUM({col})" for col in agregados)
+            + f" FROM ({aportes(1)}) t GROUP BY grupo, nivel, clave_descarga, id_jornada, fecha, placa",
+        ],
+        # Lo mismo solo para algunas descargas; todos los grupos caen dentro de una descarga
+        "recalcular_descargas": lambda en: [
+            f"DELETE FROM metricas_rollup WHERE clave_descarga {en}",
+            f"DELETE FROM viaje_metricas WHERE clave_descarga {en}",
+            insertar_metricas + metricas_de("v") + f" FROM viajes v WHERE v.estado = 'FINALIZADO' AND v.clave_descarga {en}",
+            f"INSERT INTO metricas_rollup ({lista_rollup}) "
+            f"SELECT grupo, nivel, clave_descarga, id_jornada, fecha, placa, "
+            + ", ".join(f"SUM({col})" for col in agregados)
+            + f" FROM ({aportes(1)} WHERE m.clave_descarga {en}) t GROUP BY grupo, nivel, clave_descarga, id_jornada, fecha, placa",
+        ],
+    }
+
+
+_METRICAS_PG = _sql_metricas(_minutos_pg, "DOUBLE PRECISION")
+_METRICAS_SQLITE = _sql_metricas(_minutos_sqlite, "REAL")
+_CAMBIO_METRICAS_PG = " OR ".join(f"OLD.{col} IS DISTINCT FROM NEW.{col}" for col in _COLUMNAS_METRICAS)
+_CAMBIO_METRICAS_SQLITE = " OR ".join(f"OLD.{col} IS NOT NEW.{col}" for col in _COLUMNAS_METRICAS)
+
+# Con esta variable en 'on' (SET LOCAL, solo esa transacción) el trigger no hace
+# nada y quien escribe recalcula las métricas en bloque (ver diferir_metricas)
+_METRICAS_DIFERIDAS = "bitacora.metricas_diferidas"
+
+
+def _funcion_metricas_pg(diferible=False):
+    guarda = f"IF current_setting('{_METRICAS_DIFERIDAS}', true) = 'on' THEN RETURN NULL; END IF;" if diferible else ""
+    return f"""
+        CREATE OR REPLACE FUNCTION metricas_viaje() RETURNS trigger AS $$
+        BEGIN
+            {guarda}
+            IF TG_OP <> 'INSERT' AND OLD.estado = 'FINALIZADO' THEN
+                {"; ".join(_METRICAS_PG["quitar"]("OLD"))};
+            END IF;
+            IF TG_OP <> 'DELETE' AND NEW.estado = 'FINALIZADO' THEN
+                {"; ".join(_METRICAS_PG["agregar"]("NEW"))};
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+
+
+# ==== Alertas de cadena de frío ====
+# Cada lectura nueva se compara, al insertarla, con el umbral de su especie; si se
+# sale queda una fila en alertas_temperatura. No se recorre el historial: cambiar
+# un umbral vale para las lecturas que vengan (o al reevaluar una descarga).
+
+# Umbrales con que arranca la tabla (°C, máximo por especie); QA los ajusta en la app
+_UMBRALES_INICIALES = {"YELLOWFIN": -9.0, "BIGEYE": -9.0, "SKIPJACK": -9.0, "ALBACORA": -9.0}
+_COLUMNAS_ALERTA = (
+    "id_temperatura, clave_descarga, id_jornada, hora_medicion, bodega, especie, lugar, temperatura, limite, tipo"
+)
+
+
+def _sql_alertas(ahora):
+    """Sentencias de alertas para un dialecto (``ahora``: expresión de la hora actual)."""
+    def fuera_de_umbral(fila, desde):
+        # Lecturas de ``fila`` que se salen del umbral de su especie; ``desde`` trae la
+        # tabla de umbrales con alias u (y la de lecturas si ``fila`` no es NEW)
+        return (
+            f"INSERT INTO alertas_temperatura ({_COLUMNAS_ALERTA}) "
+            f"SELECT {fila}.id, {fila}.clave_descarga, {fila}.id_jornada, {fila}.hora_medicion, {fila}.bodega, "
+            f"{fila}.especie, {fila}.lugar, {fila}.temperatura, "
+            f"CASE WHEN {fila}.temperatura > u.temperatura_max THEN u.temperatura_max ELSE u.temperatura_min END, "
+            f"CASE WHEN {fila}.temperatura > u.temperatura_max THEN 'ALTA' ELSE 'BAJA' END "
+            f"FROM {desde} AND ({fila}.temperatura > u.temperatura_max OR {fila}.temperatura < u.temperatura_min)"
+        )
+
+    iniciales = ", ".join(f"('{especie}', {maximo})" for especie, maximo in _UMBRALES_INICIALES.items())
+    return {
+        "tablas": [
+            """
+            CREATE TABLE IF NOT EXISTS umbrales_temperatura (
+                especie TEXT PRIMARY KEY, temperatura_max REAL NOT NULL, temperatura_min REAL
+            )
+            """,
+            f"INSERT INTO umbrales_temperatura (especie, temperatura_max) VALUES {iniciales} ON CONFLICT (especie) DO NOTHING",
+            f"""
+            CREATE TABLE IF NOT EXISTS alertas_temperatura (
+                id_temperatura INTEGER PRIMARY KEY, clave_descarga TEXT, id_jornada INTEGER,
+                hora_medicion TIMESTAMP, bodega TEXT, especie TEXT, lugar TEXT, temperatura REAL,
+                limite REAL, tipo TEXT NOT NULL, creada_en TIMESTAMP NOT NULL DEFAULT {ahora}, revisada_en TIMESTAMP
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_alertas_temperatura_descarga ON alertas_temperatura (clave_descarga, revisada_en)",
+        ],
+        # Alta de una lectura (fila = NEW)
+        "alertar": lambda fila: [
+            fuera_de_umbral(fila, f"umbrales_temperatura u WHERE u.especie = {fila}.especie"),
+        ],
+        # Baja de la alerta de una lectura (fila = OLD)
+        "quitar": lambda fila: [f"DELETE FROM alertas_temperatura WHERE id_temperatura = {fila}.id"],
+        # Reevalúa algunas descargas con los umbrales actuales; las alertas ya revisadas
+        # se conservan mientras su lectura exista
+        "evaluar_descargas": lambda en: [
+            f"DELETE FROM alertas_temperatura WHERE clave_descarga {en} AND (revisada_en IS NULL OR NOT EXISTS "
+            "(SELECT 1 FROM temperaturas t WHERE t.id = alertas_temperatura.id_temperatura))",
+            fuera_de_umbral("t", f"temperaturas t JOIN umbrales_temperatura u ON u.especie = t.especie "
+                                 f"WHERE t.clave_descarga {en}") + " ON CONFLICT (id_temperatura) DO NOTHING",
+        ],
+    }
+
+
+_ALERTAS_PG = _sql_alertas("now()")
+_ALERTAS_SQLITE = _sql_alertas("(strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))")
+
+# Se apaga con la misma variable que las métricas (ver diferir_metricas)
+_FUNCION_ALERTAS_PG = f"""
+    CREATE OR REPLACE FUNCTION alertar_temperatura() RETURNS trigger AS $$
+    BEGIN
+        IF current_setting('{_METRICAS_DIFERIDAS}', true) = 'on' THEN RETURN NULL; END IF;
+        IF TG_OP <> 'INSERT' THEN
+            {"; ".join(_ALERTAS_PG["quitar"]("OLD"))};
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            {"; ".join(_ALERTAS_PG["alertar"]("NEW"))};
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """
+
+
+MIGRACIONES = [
+    (1, "esquema_inicial", [
+        "CREATE TABLE IF NOT EXISTS descargas (clave TEXT PRIMARY KEY, barco TEXT, lote TEXT, fecha TEXT)",
+        """
+        CREATE TABLE IF NOT EXISTS jornadas (
+            id SERIAL PRIMARY KEY,
+            clave_descarga TEXT,
+            fecha TEXT,
+            hora_inicio TEXT,
+            hora_fin TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS viajes (
+            id SERIAL PRIMARY KEY, clave_descarga TEXT, id_jornada INTEGER, consecutivo TEXT,
+            placa TEXT, estado TEXT,
+            hora_inicio_cargue TEXT, hora_fin_cargue TEXT, hora_inicio_transito TEXT,
+            hora_llegada_planta TEXT, hora_ingreso_planta TEXT, hora_inicio_descarga TEXT, hora_fin_descarga TEXT)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS temperaturas (
+            id SERIAL PRIMARY KEY,
+            hora_medicion TEXT,
+            bodega TEXT,
+            especie TEXT,
+            talla TEXT,
+            temperatura REAL,
+            lugar TEXT,
+            clave_descarga TEXT,
+            id_jornada INTEGER
+        )
+        """,
+    ]),
+    (2, "fechas_y_horas_tipadas", [
+        "ALTER TABLE descargas ALTER COLUMN fecha TYPE DATE USING NULLIF(fecha, '')::date",
+        "ALTER TABLE jornadas ALTER COLUMN fecha TYPE DATE USING NULLIF(fecha, '')::date",
+        # hora_fin primero: su conversión necesita hora_inicio todavía como texto
+        """
+        ALTER TABLE jornadas ALTER COLUMN hora_fin TYPE TIMESTAMP USING
+            fecha + NULLIF(hora_fin, '')::time
+            + CASE WHEN NULLIF(hora_fin, '')::time < NULLIF(hora_inicio, '')::time
+                   THEN INTERVAL '1 day' ELSE INTERVAL '0' END
+        """,
+        "ALTER TABLE jornadas ALTER COLUMN hora_inicio TYPE TIMESTAMP USING fecha + NULLIF(hora_inicio, '')::time",
+        *_convertir_a_timestamp("viajes", "v", HORAS_VIAJE),
+        *_convertir_a_timestamp("temperaturas", "t", ["hora_medicion"]),
+    ]),
+    (3, "indices_consultas_frecuentes", [
+        "CREATE INDEX IF NOT EXISTS idx_jornadas_descarga ON jornadas (clave_descarga, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_jornadas_abiertas ON jornadas (clave_descarga) WHERE hora_fin IS NULL",
+        "CREATE INDEX IF NOT EXISTS idx_viajes_jornada_estado ON viajes (id_jornada, estado) INCLUDE (placa)",
+        "CREATE INDEX IF NOT EXISTS idx_viajes_estado_descarga ON viajes (estado, clave_descarga)",
+        "CREATE INDEX IF NOT EXISTS idx_temperaturas_descarga ON temperaturas (clave_descarga, hora_medicion)",
+        "CREATE INDEX IF NOT EXISTS idx_descargas_barco ON descargas (barco, fecha, lote)",
+    ]),
+    (4, "marca_de_cambios_viajes", [
+        # updated_at/version los mantiene un trigger; el tablero en vivo consulta por encima de su marca
+        """
+        ALTER TABLE viajes
+            ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+            ADD COLUMN version INTEGER NOT NULL DEFAULT 1
+        """,
+        """
+        CREATE OR REPLACE FUNCTION tocar_viaje() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := clock_timestamp();
+            NEW.version := OLD.version + 1;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "CREATE TRIGGER viajes_tocar BEFORE UPDATE ON viajes FOR EACH ROW EXECUTE FUNCTION tocar_viaje()",
+        "CREATE INDEX IF NOT EXISTS idx_viajes_jornada_cambios ON viajes (id_jornada, updated_at)",
+    ]),
+    (5, "reglas_de_viajes", [
+        # Contador de consecutivos por jornada, inicializado con el mayor ya usado
+        "ALTER TABLE jornadas ADD COLUMN ultimo_consecutivo INTEGER NOT NULL DEFAULT 0",
+        r"""
+        UPDATE jornadas j SET ultimo_consecutivo = c.maximo
+        FROM (
+            SELECT id_jornada, MAX(NULLIF(regexp_replace(consecutivo, '\D', '', 'g'), '')::int) AS maximo
+            FROM viajes GROUP BY id_jornada
+        ) c
+        WHERE c.id_jornada = j.id AND c.maximo IS NOT NULL
+        """,
+        # La misma placa activa dos veces en una jornada (antes no se impedía) haría
+        # fallar uq_viajes_placa_activa: se aborta con los ids para que se corrijan
+        """
+        DO $$
+        DECLARE ids TEXT;
+        BEGIN
+            SELECT string_agg(d.ids, '; ') INTO ids FROM (
+                SELECT string_agg(id::text, ', ' ORDER BY id) AS ids
+                FROM viajes WHERE estado <> 'FINALIZADO' AND placa IS NOT NULL
+                GROUP BY id_jornada, placa HAVING COUNT(*) > 1
+            ) d;
+            IF ids IS NOT NULL THEN
+                RAISE EXCEPTION 'viajes: la misma placa está activa más de una vez en su jornada (ids %); finalice o corrija esos viajes y vuelva a migrar', ids;
+            END IF;
+        END $$
+        """,
+        # Cupo 1 o 2 para cada viaje en CARGUE; el índice único impide un tercero
+        "ALTER TABLE viajes ADD COLUMN cupo_cargue SMALLINT CHECK (cupo_cargue BETWEEN 1 AND 2)",
+        """
+        UPDATE viajes v SET cupo_cargue = c.cupo
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY id_jornada ORDER BY id) AS cupo
+            FROM viajes WHERE estado = 'CARGUE'
+        ) c
+        WHERE c.id = v.id AND c.cupo <= 2
+        """,
+        "ALTER TABLE viajes ADD CONSTRAINT ck_viajes_cupo_en_cargue CHECK (cupo_cargue IS NULL OR estado = 'CARGUE')",
+        "CREATE UNIQUE INDEX uq_viajes_cupo_cargue ON viajes (id_jornada, cupo_cargue) WHERE cupo_cargue IS NOT NULL",
+        "CREATE UNIQUE INDEX uq_viajes_placa_activa ON viajes (id_jornada, placa) WHERE estado <> 'FINALIZADO'",
+        """
+        ALTER TABLE viajes ADD CONSTRAINT ck_viajes_estado CHECK (
+            estado IN ('CARGUE', 'TRANSITO', 'EN ESPERA', 'DESCARGA', 'EN DESCARGA', 'FINALIZADO')
+        ) NOT VALID
+        """,
+    ]),
+    (6, "sincronizacion_idempotente", [
+        # Claves de las operaciones ya aplicadas desde nodos locales (ver sincronizacion.py)
+        """
+        CREATE TABLE IF NOT EXISTS sync_aplicados (
+            clave_idempotencia TEXT PRIMARY KEY,
+            nodo INTEGER NOT NULL,
+            aplicado_en TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """,
+    ]),
+    (7, "metricas_de_viajes", _METRICAS_PG["tablas"] + [
+        _funcion_metricas_pg(),
+        "CREATE TRIGGER viajes_metricas_insert AFTER INSERT ON viajes FOR EACH ROW "
+        "WHEN (NEW.estado = 'FINALIZADO') EXECUTE FUNCTION metricas_viaje()",
+        "CREATE TRIGGER viajes_metricas_update AFTER UPDATE ON viajes FOR EACH ROW "
+        f"WHEN ((OLD.estado = 'FINALIZADO' OR NEW.estado = 'FINALIZADO') AND ({_CAMBIO_METRICAS_PG})) "
+        "EXECUTE FUNCTION metricas_viaje()",
+        "CREATE TRIGGER viajes_metricas_delete AFTER DELETE ON viajes FOR EACH ROW "
+        "WHEN (OLD.estado = 'FINALIZADO') EXECUTE FUNCTION metricas_viaje()",
+    ] + _METRICAS_PG["recalcular"]),
+    (8, "indices_grillas", [
+        # Paginación por llave de las grillas (ver grillas.py) en su orden por defecto
+        "CREATE INDEX IF NOT EXISTS idx_temperaturas_grilla ON temperaturas (clave_descarga, hora_medicion DESC NULLS LAST, id DESC)",
+        "DROP INDEX IF EXISTS idx_temperaturas_descarga",
+        "CREATE INDEX IF NOT EXISTS idx_viajes_descarga ON viajes (clave_descarga, id)",
+    ]),
+    (9, "metricas_diferibles", [
+        # Las cargas masivas actualizaban la misma fila de metricas_rollup una vez por
+        # viaje dentro de una transacción, con costo cuadrático (ver diferir_metricas)
+        _funcion_metricas_pg(diferible=True),
+    ]),
+    (10, "alertas_temperatura", _ALERTAS_PG["tablas"] + [
+        _FUNCION_ALERTAS_PG,
+        "CREATE TRIGGER temperaturas_alertas_insert AFTER INSERT ON temperaturas FOR EACH ROW "
+        "EXECUTE FUNCTION alertar_temperatura()",
+        "CREATE TRIGGER temperaturas_alertas_update AFTER UPDATE OF temperatura, especie ON temperaturas FOR EACH ROW "
+        "WHEN (OLD.temperatura IS DISTINCT FROM NEW.temperatura OR OLD.especie IS DISTINCT FROM NEW.especie) "
+        "EXECUTE FUNCTION alertar_temperatura()",
+        "CREATE TRIGGER temperaturas_alertas_delete AFTER DELETE ON temperaturas FOR EACH ROW "
+        "EXECUTE FUNCTION alertar_temperatura()",
+    ]),
+]
+
+# Número arbitrario para el advisory lock que serializa migraciones concurrentes
+_LOCK_MIGRACIONES = 4207
+
+
+def version_actual(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migraciones (
+            version INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            aplicada_en TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migraciones")
+    return cursor.fetchone()[0]
+
+
+def aplicar_pendientes(verbose=False):
+    """Aplica las migraciones que faltan y devuelve la versión final del esquema."""
+    aplicadas = 0
+    for version, nombre, sentencias in MIGRACIONES:
+        with conexion_postgres() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_MIGRACIONES,))
+            if version_actual(cursor) >= version:
+                continue
+            for sentencia in sentencias:
+                cursor.execute(sentencia)
+            cursor.execute("INSERT INTO schema_migraciones (version, nombre) VALUES (%s, %s)", (version, nombre))
+        aplicadas += 1
+        if verbose:
+            print(f"✅ Migración {version:03d} {nombre} aplicada")
+    if verbose and not aplicadas:
+        print("ℹ️ El esquema ya está al día.")
+    return MIGRACIONES[-1][0]
+
+
+# ==== Migraciones de la base local SQLite ====
+# Mismo esquema final que Postgres; la versión se guarda en PRAGMA user_version.
+
+TABLAS = ["descargas", "jornadas", "viajes", "temperaturas"]
+
+
+def _a_fecha(valor):
+    if valor in (None, ""):
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def _a_entero(valor):
+    # Algunas filas antiguas guardaron el id como int64 de numpy (8 bytes little-endian)
+    if isinstance(valor, bytes):
+        return int.from_bytes(valor, "little")
+    return None if valor is None else int(valor)
+
+
+def _en_jornada(valor, jornada):
+    """Hora en texto -> timestamp sobre la fecha de la jornada, pasando al día siguiente
+    si es anterior al inicio (turno que cruzó la medianoche)."""
+    if valor in (None, ""):
+        return None
+    if isinstance(valor, datetime):
+        return valor
+    texto = str(valor)
+    if len(texto) > 8:
+        return datetime.fromisoformat(texto)
+    hora = time.fromisoformat(texto)
+    fecha = jornada["fecha"] if jornada and jornada["fecha"] else date.today()
+    resultado = datetime.combine(fecha, hora)
+    if jornada and jornada["hora_inicio"] and hora < jornada["hora_inicio"].time():
+        resultado += timedelta(days=1)
+    return resultado
+
+
+def _insertar(cursor, tabla, filas):
+    if filas:
+        columnas = list(filas[0])
+        cursor.executemany(
+            f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(columnas))})",
+            [tuple(fila[col] for col in columnas) for fila in filas],
+        )
+
+
+def _sqlite_esquema_tipado(cursor):
+    # Reconstruye las tablas con el esquema tipado, convirtiendo las filas que ya existan
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existentes = {fila[0] for fila in cursor.fetchall()}
+    legado = {}
+    for tabla in TABLAS:
+        if tabla in existentes:
+            cursor.execute(f"SELECT * FROM {tabla}")
+            columnas = [d[0] for d in cursor.description]
+            legado[tabla] = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+            cursor.execute(f"DROP TABLE {tabla}")
+    for sentencia in setup_db.ESQUEMA:
+        cursor.execute(sentencia)
+
+    descargas = [dict(fila, fecha=_a_fecha(fila["fecha"])) for fila in legado.get("descargas", [])]
+    fechas_descarga = {fila["clave"]: fila["fecha"] for fila in descargas}
+    sin_fecha = []
+
+    def base_horas(fila, tabla, columnas):
+        # La jornada de la fila; sin ella (id nulo o borrada), la fecha de su descarga
+        if fila["id_jornada"] in jornadas:
+            return jornadas[fila["id_jornada"]]
+        fecha = fechas_descarga.get(fila["clave_descarga"])
+        if fecha is None and any(fila[col] not in (None, "") and len(str(fila[col])) <= 8 for col in columnas):
+            sin_fecha.append(f"{tabla} {fila['id']}")
+        return {"fecha": fecha, "hora_inicio": None}
+
+    jornadas = {}
+    for fila in legado.get("jornadas", []):
+        fecha = _a_fecha(fila["fecha"])
+        inicio = _en_jornada(fila["hora_inicio"], {"fecha": fecha, "hora_inicio": None})
+        jornadas[fila["id"]] = {
+            "id": fila["id"], "clave_descarga": fila["clave_descarga"], "fecha": fecha,
+            "hora_inicio": inicio, "hora_fin": _en_jornada(fila["hora_fin"], {"fecha": fecha, "hora_inicio": inicio}),
+            "ultimo_consecutivo": 0,
+        }
+    # Como la migración 5 de Postgres: una placa activa dos veces en la misma
+    # jornada no cabe en uq_viajes_placa_activa y se aborta con los ids
+    activos = {}
+    for fila in legado.get("viajes", []):
+        if fila["estado"] != "FINALIZADO" and fila["placa"] is not None:
+            activos.setdefault((_a_entero(fila["id_jornada"]), fila["placa"]), []).append(str(fila["id"]))
+    repetidos = [", ".join(ids) for ids in activos.values() if len(ids) > 1]
+    if repetidos:
+        raise ValueError(
+            f"La misma placa está activa más de una vez en su jornada (viajes {'; '.join(repetidos)}); "
+            "finalice o corrija esos viajes y vuelva a migrar"
+        )
+    viajes, cupos = [], {}
+    for fila in legado.get("viajes", []):
+        fila = dict(fila, id_jornada=_a_entero(fila["id_jornada"]))
+        jornada = jornadas.get(fila["id_jornada"])
+        base = base_horas(fila, "viajes", HORAS_VIAJE)
+        for col in HORAS_VIAJE:
+            fila[col] = _en_jornada(fila[col], base)
+        cupo = None
+        if fila["estado"] == "CARGUE":
+            cupo = cupos[fila["id_jornada"]] = cupos.get(fila["id_jornada"], 0) + 1
+        fila["cupo_cargue"] = cupo if cupo and cupo <= 2 else None
+        fila.pop("updated_at", None)
+        fila.pop("version", None)
+        viajes.append(fila)
+        if jornada and fila["consecutivo"]:
+            numero = int("".join(c for c in fila["consecutivo"] if c.isdigit()) or 0)
+            jornada["ultimo_consecutivo"] = max(jornada["ultimo_consecutivo"], numero)
+    temperaturas = []
+    for fila in legado.get("temperaturas", []):
+        fila = dict(fila, id_jornada=_a_entero(fila["id_jornada"]))
+        fila["hora_medicion"] = _en_jornada(fila["hora_medicion"], base_horas(fila, "temperaturas", ["hora_medicion"]))
+        temperaturas.append(fila)
+    if sin_fecha:
+        # Se aborta antes de insertar: la transacción deshace el DROP de las tablas viejas
+        raise ValueError(f"Horas sin jornada ni descarga para convertirlas ({', '.join(sin_fecha)}); corríjalas y vuelva a migrar")
+
+    _insertar(cursor, "descargas", descargas)
+    _insertar(cursor, "jornadas", list(jornadas.values()))
+    _insertar(cursor, "viajes", viajes)
+    _insertar(cursor, "temperaturas", temperaturas)
+
+
+def _sqlite_outbox(cursor):
+    # Cada cambio local deja, en la misma transacción, una copia de la fila en el outbox
+    # que sincronizacion.py envía a Postgres
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            clave_idempotencia TEXT NOT NULL UNIQUE DEFAULT (lower(hex(randomblob(16)))),
+            tabla TEXT NOT NULL,
+            operacion TEXT NOT NULL,
+            fila TEXT NOT NULL,
+            creado_en TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+            intentos INTEGER NOT NULL DEFAULT 0,
+            ultimo_error TEXT,
+            estado TEXT NOT NULL DEFAULT 'PENDIENTE'
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_pendientes ON outbox (estado, id)")
+    for tabla in TABLAS:
+        for evento in _OUTBOX_EVENTOS:
+            _trigger_outbox(cursor, tabla, evento)
+        # Los ids nuevos de este nodo arrancan en su propio bloque
+        inicio = db.NODO_ID * db.RANGO_IDS_NODO
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", (tabla,))
+        fila = cursor.fetchone()
+        if fila is None:
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", (tabla, inicio))
+        elif fila[0] < inicio:
+            cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", (inicio, tabla))
+
+
+# evento: (fila que se copia, operación)
+_OUTBOX_EVENTOS = {"INSERT": ("NEW", "UPSERT"), "UPDATE": ("NEW", "UPSERT"), "DELETE": ("OLD", "DELETE")}
+
+
+def _trigger_outbox(cursor, tabla, evento, condicion=None):
+    registro, operacion = _OUTBOX_EVENTOS[evento]
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    json_fila = "json_object(" + ", ".join(f"'{fila[1]}', {registro}.{fila[1]}" for fila in cursor.fetchall()) + ")"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS outbox_{tabla}_{evento.lower()} AFTER {evento} ON {tabla}
+        {f"WHEN {condicion}" if condicion else ""}
+        BEGIN
+            INSERT INTO outbox (tabla, operacion, fila) VALUES ('{tabla}', '{operacion}', {json_fila});
+        END
+    """)
+
+
+def _sqlite_outbox_viajes(cursor):
+    # Cada UPDATE de la app sobre viajes dispara viajes_tocar (setup_db.py), que hace
+    # un segundo UPDATE con la versión nueva. Solo ese va al outbox: una entrada por
+    # cambio, con updated_at y version finales.
+    cursor.execute("DROP TRIGGER IF EXISTS outbox_viajes_update")
+    _trigger_outbox(cursor, "viajes", "UPDATE", "NEW.version <> OLD.version")
+
+
+def _sqlite_metricas(cursor):
+    for sentencia in _METRICAS_SQLITE["tablas"]:
+        cursor.execute(sentencia)
+    cuerpos = {
+        "insert": ("NEW.estado = 'FINALIZADO'", _METRICAS_SQLITE["agregar"]("NEW")),
+        "update": (
+            f"(OLD.estado = 'FINALIZADO' OR NEW.estado = 'FINALIZADO') AND ({_CAMBIO_METRICAS_SQLITE})",
+            _METRICAS_SQLITE["quitar"]("OLD") + _METRICAS_SQLITE["agregar"]("NEW"),
+        ),
+        "delete": ("OLD.estado = 'FINALIZADO'", _METRICAS_SQLITE["quitar"]("OLD")),
+    }
+    for evento, (condicion, sentencias) in cuerpos.items():
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS viajes_metricas_{evento} AFTER {evento.upper()} ON viajes
+            WHEN {condicion}
+            BEGIN
+                {"; ".join(sentencias)};
+            END
+        """)
+    for sentencia in _METRICAS_SQLITE["recalcular"]:
+        cursor.execute(sentencia)
+
+
+def _sqlite_indices_grillas(cursor):
+    # En SQLite los NULL van primero en orden ascendente, así que DESC ya los deja al final
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_temperaturas_grilla ON temperaturas (clave_descarga, hora_medicion DESC, id DESC)")
+    cursor.execute("DROP INDEX IF EXISTS idx_temperaturas_descarga")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_viajes_descarga ON viajes (clave_descarga, id)")
+
+
+def _sqlite_alertas(cursor):
+    # Tablas solo locales, como las métricas: Postgres genera sus propias alertas al
+    # recibir las lecturas sincronizadas
+    for sentencia in _ALERTAS_SQLITE["tablas"]:
+        cursor.execute(sentencia)
+    cuerpos = {
+        "insert": ("INSERT", _ALERTAS_SQLITE["alertar"]("NEW")),
+        "update": (
+            "UPDATE OF temperatura, especie",
+            _ALERTAS_SQLITE["quitar"]("OLD") + _ALERTAS_SQLITE["alertar"]("NEW"),
+        ),
+        "delete": ("DELETE", _ALERTAS_SQLITE["quitar"]("OLD")),
+    }
+    for evento, (disparador, sentencias) in cuerpos.items():
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS temperaturas_alertas_{evento} AFTER {disparador} ON temperaturas
+            BEGIN
+                {"; ".join(sentencias)};
+            END
+        """)
+
+
+MIGRACIONES_SQLITE = [
+    (1, "esquema_tipado", _sqlite_esquema_tipado),
+    (2, "outbox_sincronizacion", _sqlite_outbox),
+    (3, "metricas_de_viajes", _sqlite_metricas),
+    (4, "indices_grillas", _sqlite_indices_grillas),
+    (5, "alertas_temperatura", _sqlite_alertas),
+    (6, "outbox_viajes_una_vez", _sqlite_outbox_viajes),
+]
+
+
+def aplicar_pendientes_sqlite(ruta=None, verbose=False):
+    aplicadas = 0
+    for version, nombre, migrar in MIGRACIONES_SQLITE:
+        with conexion_sqlite(ruta) as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] >= version:
+                continue
+            migrar(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+        aplicadas += 1
+        if verbose:
+            print(f"✅ Migración local {version:03d} {nombre} aplicada")
+    if verbose and not aplicadas:
+        print("ℹ️ El esquema local ya está al día.")
+    return MIGRACIONES_SQLITE[-1][0]
+
+
+def recalcular_metricas():
+    """Reconstruye viaje_metricas y metricas_rollup desde los viajes del backend configurado."""
+    sentencias = (_METRICAS_SQLITE if db.es_sqlite() else _METRICAS_PG)["recalcular"]
+    with db.conexion() as conn:
+        cursor = conn.cursor()
+        for sentencia in sentencias:
+            cursor.execute(sentencia)
+        cursor.execute("SELECT COUNT(*) FROM viaje_metricas")
+        return cursor.fetchone()[0]
+
+
+def diferir_metricas(cursor):
+    """Apaga los triggers de métricas y de alertas hasta el fin de la transacción; devuelve False si no aplica.
+
+    Para cargas y borrados masivos: al terminar se llama a recalcular_metricas_descargas
+    y evaluar_alertas_descargas con las descargas tocadas. En SQLite los triggers son
+    baratos y siguen activos.
+    """
+    if db.es_sqlite():
+        return False
+    cursor.execute(f"SET LOCAL {_METRICAS_DIFERIDAS} = 'on'")
+    return True
+
+
+def recalcular_metricas_descargas(cursor, claves):
+    if not claves:
+        return
+    en = f"IN ({', '.join(['%s'] * len(claves))})"
+    sentencias = (_METRICAS_SQLITE if db.es_sqlite() else _METRICAS_PG)["recalcular_descargas"](en)
+    for sentencia in sentencias:
+        # Cada sentencia filtra por las claves una sola vez
+        cursor.execute(sentencia, list(claves))
+
+
+def evaluar_alertas_descargas(cursor, claves):
+    """Vuelve a comparar todas las lecturas de esas descargas con los umbrales actuales."""
+    if not claves:
+        return
+    en = f"IN ({', '.join(['%s'] * len(claves))})"
+    for sentencia in (_ALERTAS_SQLITE if db.es_sqlite() else _ALERTAS_PG)["evaluar_descargas"](en):
+        cursor.execute(sentencia, list(claves))
+
+
+@st.cache_resource(show_spinner=False)
+def asegurar_esquema():
+    # Una vez por proceso: deja el esquema en la última versión antes de servir.
+    # Con el backend local no se toca Postgres aquí; lo hace el sincronizador al conectar.
+    if db.es_sqlite():
+        return aplicar_pendientes_sqlite()
+    return aplicar_pendientes()
+
+
+if __name__ == "__main__":
+    if "--sqlite" in sys.argv:
+        aplicar_pendientes_sqlite(verbose=True)
+    elif "--recalcular-metricas" in sys.argv:
+        print(f"✅ Métricas recalculadas para {recalcular_metricas()} viajes finalizados")
+    elif "--estado" in sys.argv:
+        with conexion_postgres() as conn:
+            print("Versión actual del esquema:", version_actual(conn.cursor()))
+        print("Última versión disponible:", MIGRACIONES[-1][0])
+    else:
+        try:
+            aplicar_pendientes(verbose=True)
+        except Exception as e:
+            print("❌ Error al aplicar migraciones:", e)
+            sys.exit(1)
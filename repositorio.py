@@ -0,0 +1,256 @@
+import pandas as pd
+
+import db
+import temperaturas
+import viajes
+from db import conexion
+
+# Lecturas de la app, una función por caso de uso. Cada una pide solo las columnas
+# que usa, corre como sentencia preparada (db.ejecutar_preparada) y devuelve tipos
+# compactos: categorías para los textos de pocos valores y datetime64 para las horas.
+# La caché y su invalidación están en datos.py.
+
+# Columna -> valores conocidos, en su orden natural
+CATEGORIAS = {
+    "estado": viajes.ESTADOS,
+    "especie": temperaturas.ESPECIES,
+    "talla": temperaturas.TALLAS,
+    "lugar": temperaturas.LUGARES,
+}
+
+COLUMNAS_TABLERO = ["id", "consecutivo", "placa", "estado", "updated_at"] + [
+    col for _, columnas in viajes.TRANSICIONES.values() for col in columnas
+]
+
+
+def tipar(df):
+    """Convierte en su lugar las columnas conocidas a tipos compactos y devuelve el DataFrame."""
+    for columna in df.columns:
+        if columna in CATEGORIAS:
+            conocidas = CATEGORIAS[columna]
+            # Los valores fuera de la lista (datos viejos) se conservan como categorías extra
+            extra = sorted(set(df[columna].dropna()) - set(conocidas))
+            df[columna] = pd.Categorical(df[columna], categories=list(conocidas) + extra)
+        elif columna.startswith("hora_") or columna == "updated_at":
+            df[columna] = pd.to_datetime(df[columna])
+        elif columna == "temperatura":
+            df[columna] = df[columna].astype("float32")
+    return df
+
+
+def _leer(nombre, sql, params=()):
+    with conexion() as conn:
+        cursor = conn.cursor()
+        db.ejecutar_preparada(cursor, nombre, sql, params)
+        columnas = [d[0] for d in cursor.description]
+        return tipar(pd.DataFrame.from_records(cursor.fetchall(), columns=columnas))
+
+
+def _columna(nombre, sql, params=()):
+    with conexion() as conn:
+        cursor = conn.cursor()
+        db.ejecutar_preparada(cursor, nombre, sql, params)
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+# ==== Catálogos ====
+
+def claves_descargas(texto, limite):
+    """Claves de las descargas cuya clave o barco contiene el texto, las más recientes primero."""
+    patron = f"%{texto.strip().lower()}%"
+    return _columna("rep_claves_descargas", """
+        SELECT clave FROM descargas
+        WHERE LOWER(clave) LIKE %s OR LOWER(barco) LIKE %s
+        ORDER BY fecha DESC, clave LIMIT %s
+    """, (patron, patron, limite))
+
+
+def listar_barcos():
+    return _columna("rep_barcos", "SELECT DISTINCT barco FROM descargas WHERE barco IS NOT NULL ORDER BY barco")
+
+
+def inicios_jornadas(clave_descarga):
+    """{id: hora de inicio} de las jornadas de la descarga, las más recientes primero."""
+    with conexion() as conn:
+        cursor = conn.cursor()
+        db.ejecutar_preparada(
+            cursor, "rep_inicios_jornadas",
+            "SELECT id, hora_inicio FROM jornadas WHERE clave_descarga = %s ORDER BY id DESC", (clave_descarga,),
+        )
+        return dict(cursor.fetchall())
+
+
+def jornadas_abiertas():
+    """Jornadas sin hora de fin con el barco, lote y fecha de su descarga."""
+    return _leer("rep_jornadas_abiertas", """
+        SELECT j.id, j.clave_descarga, d.barco AS barco_descarga, d.lote AS lote_descarga, d.fecha AS fecha_descarga
+        FROM jornadas j JOIN descargas d ON d.clave = j.clave_descarga
+        WHERE j.hora_fin IS NULL
+    """)
+
+
+# ==== Tablero de viajes ====
+
+def viajes_activos(id_jornada):
+    return _leer(
+        "rep_viajes_activos",
+        f"SELECT {', '.join(COLUMNAS_TABLERO)} FROM viajes WHERE id_jornada = %s AND estado <> 'FINALIZADO' ORDER BY id",
+        (id_jornada,),
+    )
+
+
+def viajes_modificados_desde(id_jornada, desde):
+    return _leer(
+        "rep_viajes_modificados",
+        f"SELECT {', '.join(COLUMNAS_TABLERO)} FROM viajes WHERE id_jornada = %s AND updated_at > %s ORDER BY updated_at",
+        (id_jornada, desde),
+    )
+
+
+# ==== Resumen (desde las métricas precalculadas) ====
+
+# Nombre en pantalla -> columna de viaje_metricas
+ESLABONES_COLUMNAS = {
+    "Duracion Cargue": "duracion_cargue",
+    "Transito": "transito",
+    "Espera Planta": "espera_planta",
+    "Inicio Descarga": "inicio_descarga",
+    "Duracion Descarga": "duracion_descarga",
+}
+
+_FILTRO_RESUMEN = " AND d.barco = %s AND r.fecha = %s AND d.lote = %s"
+
+
+def opciones_resumen():
+    return _leer("rep_opciones_resumen", """
+        SELECT DISTINCT d.barco, r.fecha, d.lote
+        FROM metricas_rollup r JOIN descargas d ON d.clave = r.clave_descarga
+        WHERE r.nivel = 'dia'
+    """)
+
+
+def resumen_viajes(barco, fecha, lote):
+    """Viajes finalizados de un barco/fecha/lote con la duración de cada eslabón en minutos."""
+    duraciones = ", ".join(f'r.{col} AS "{nombre}"' for nombre, col in ESLABONES_COLUMNAS.items())
+    return _leer(
+        "rep_resumen_viajes",
+        f"SELECT r.id_viaje AS id, r.consecutivo, r.placa, {duraciones} "
+        "FROM viaje_metricas r JOIN descargas d ON d.clave = r.clave_descarga WHERE 1 = 1"
+        + _FILTRO_RESUMEN + " ORDER BY r.consecutivo",
+        (barco, fecha, lote),
+    )
+
+
+def resumen_por_placa(barco, fecha, lote):
+    return _leer(
+        "rep_resumen_por_placa",
+        'SELECT r.placa, SUM(r.viajes) AS "# Viajes" '
+        "FROM metricas_rollup r JOIN descargas d ON d.clave = r.clave_descarga WHERE r.nivel = 'placa'"
+        + _FILTRO_RESUMEN + " GROUP BY r.placa ORDER BY r.placa",
+        (barco, fecha, lote),
+    )
+
+
+def resumen_promedios(barco, fecha, lote):
+    promedios = ", ".join(
+        db.redondear(f"SUM(r.suma_{col}) / NULLIF(SUM(r.n_{col}), 0)", 1) + f' AS "{nombre}"'
+        for nombre, col in ESLABONES_COLUMNAS.items()
+    )
+    return _leer(
+        "rep_resumen_promedios",
+        f"SELECT {promedios} "
+        "FROM metricas_rollup r JOIN descargas d ON d.clave = r.clave_descarga WHERE r.nivel = 'dia'"
+        + _FILTRO_RESUMEN,
+        (barco, fecha, lote),
+    )
+
+
+# ==== Análisis ====
+
+def viajes_finalizados(horas, barcos=(), desde=None, hasta=None):
+    """Horas de los viajes finalizados con su barco, filtrados por barco y fecha de jornada.
+
+    La lista de barcos cambia el número de marcadores, así que esta no se prepara.
+    """
+    condiciones, params = ["v.estado = 'FINALIZADO'"], []
+    if barcos:
+        condiciones.append(f"d.barco IN ({', '.join(['%s'] * len(barcos))})")
+        params.extend(barcos)
+    if desde:
+        condiciones.append("j.fecha >= %s")
+        params.append(desde)
+    if hasta:
+        condiciones.append("j.fecha <= %s")
+        params.append(hasta)
+    with conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT v.id, v.id_jornada, v.placa, d.barco, j.fecha, {', '.join(f'v.{col}' for col in horas)} "
+            "FROM viajes v JOIN jornadas j ON j.id = v.id_jornada JOIN descargas d ON d.clave = v.clave_descarga "
+            f"WHERE {' AND '.join(condiciones)}",
+            params,
+        )
+        columnas = [d[0] for d in cursor.description]
+        return tipar(pd.DataFrame.from_records(cursor.fetchall(), columns=columnas))
+
+
+# ==== Monitoreo de temperaturas ====
+
+def rango_temperaturas(clave_descarga):
+    """Primera y última hora de medición de la descarga (None si no hay lecturas)."""
+    with conexion() as conn:
+        cursor = conn.cursor()
+        db.ejecutar_preparada(
+            cursor, "rep_rango_temperaturas",
+            "SELECT MIN(hora_medicion), MAX(hora_medicion) FROM temperaturas WHERE clave_descarga = %s",
+            (clave_descarga,),
+        )
+        return tuple(pd.to_datetime(valor) if valor is not None else None for valor in cursor.fetchone())
+
+
+def serie_temperaturas(clave_descarga, agrupar, segundos):
+    """Lecturas de la descarga agrupadas en intervalos de ``segundos`` por serie (bodega o especie) y lugar.
+
+    Cada fila trae la hora de inicio del intervalo, mínima, promedio, máxima y
+    cantidad de lecturas: el gráfico recibe a lo sumo un punto por intervalo,
+    sin importar cuántas lecturas haya.
+    """
+    if agrupar not in temperaturas.SERIES:
+        raise ValueError(f"Serie desconocida: {agrupar}")
+    serie = _leer(
+        f"rep_serie_temperaturas_{agrupar}",
+        f"SELECT {db.segundos_epoch('hora_medicion')} / %s AS intervalo, {agrupar} AS serie, lugar, "
+        "MIN(temperatura) AS minima, AVG(temperatura) AS promedio, MAX(temperatura) AS maxima, COUNT(*) AS lecturas "
+        "FROM temperaturas WHERE clave_descarga = %s AND hora_medicion IS NOT NULL AND temperatura IS NOT NULL "
+        f"GROUP BY 1, {agrupar}, lugar ORDER BY 2, 3, 1",
+        (int(segundos), clave_descarga),
+    )
+    serie.insert(0, "hora", pd.to_datetime(serie.pop("intervalo").astype("int64") * int(segundos), unit="s"))
+    return serie
+
+
+def alertas_temperatura(clave_descarga, limite):
+    """Alertas pendientes de la descarga, las más recientes primero, y cuántas hay en total y sin revisar."""
+    pendientes = _leer(
+        "rep_alertas_pendientes",
+        "SELECT hora_medicion, bodega, especie, lugar, temperatura, limite, tipo, id_temperatura "
+        "FROM alertas_temperatura WHERE clave_descarga = %s AND revisada_en IS NULL "
+        "ORDER BY hora_medicion DESC LIMIT %s",
+        (clave_descarga, limite),
+    )
+    with conexion() as conn:
+        cursor = conn.cursor()
+        db.ejecutar_preparada(
+            cursor, "rep_alertas_conteo",
+            "SELECT COUNT(*), COUNT(*) - COUNT(revisada_en) FROM alertas_temperatura WHERE clave_descarga = %s",
+            (clave_descarga,),
+        )
+        total, sin_revisar = cursor.fetchone()
+    return pendientes, total, sin_revisar
+
+
+def umbrales_temperatura():
+    return _leer(
+        "rep_umbrales_temperatura",
+        "SELECT especie, temperatura_max, temperatura_min FROM umbrales_temperatura ORDER BY especie",
+    )
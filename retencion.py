@@ -0,0 +1,177 @@
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+import exportar
+import migraciones
+from db import conexion
+
+# Limpieza de temporadas pasadas y datos de prueba. Elige descargas completas por
+# clave, por patrón de barco o por antigüedad y borra sus filas por lotes cortos,
+# cada uno en su propia transacción, así que nunca retiene candados mientras el
+# personal trabaja. Opcionalmente guarda antes todo lo que va a borrar en Parquet.
+#
+#   python retencion.py --barco "%TEST%" --simular
+#   python retencion.py --dias 365 --archivo temporada_2024.zip
+#   python retencion.py --clave ATUN-20240105-L1 --clave ATUN-20240107-L2
+#
+# Las descargas con una jornada abierta nunca se borran.
+
+# Filas por DELETE; cada lote es una transacción corta
+LOTE = int(os.getenv("RETENCION_LOTE", "5000"))
+# Pausa entre lotes para dejar pasar a las escrituras de la app
+PAUSA = float(os.getenv("RETENCION_PAUSA_MS", "50")) / 1000
+
+# Tablas que cuelgan de la descarga, en el orden en que se borran
+TABLAS = ["temperaturas", "viajes", "jornadas"]
+
+
+def _en(claves):
+    return f"IN ({', '.join(['%s'] * len(claves))})"
+
+
+def seleccionar(claves=(), barco=None, antes_de=None):
+    """Descargas que cumplen todos los criterios dados; devuelve (a borrar, con jornada abierta).
+
+    ``barco`` es un patrón LIKE sin distinguir mayúsculas (``%TEST%``) y
+    ``antes_de`` una fecha de descarga límite (excluida). Sin criterios no
+    selecciona nada.
+    """
+    condiciones, params = [], []
+    if claves:
+        condiciones.append(f"d.clave {_en(claves)}")
+        params.extend(claves)
+    if barco:
+        condiciones.append("LOWER(d.barco) LIKE %s")
+        params.append(barco.lower())
+    if antes_de:
+        condiciones.append("d.fecha < %s")
+        params.append(antes_de)
+    if not condiciones:
+        return [], []
+    # descargas es chica: filtrarla entera es barato. Las tablas grandes se recorren
+    # después por clave_descarga exacta, con sus índices.
+    with conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT d.clave, d.barco, d.fecha,
+                   EXISTS (SELECT 1 FROM jornadas j WHERE j.clave_descarga = d.clave AND j.hora_fin IS NULL)
+            FROM descargas d WHERE {' AND '.join(condiciones)}
+            ORDER BY d.fecha, d.clave
+        """, params)
+        filas = cursor.fetchall()
+    seleccion = [{"clave": c, "barco": b, "fecha": f} for c, b, f, abierta in filas if not abierta]
+    abiertas = [{"clave": c, "barco": b, "fecha": f} for c, b, f, abierta in filas if abierta]
+    return seleccion, abiertas
+
+
+def contar(claves):
+    """Filas de cada tabla por descarga: {clave: {tabla: n}}."""
+    conteo = {clave: dict.fromkeys(TABLAS, 0) for clave in claves}
+    if not claves:
+        return conteo
+    with conexion() as conn:
+        cursor = conn.cursor()
+        for tabla in TABLAS:
+            cursor.execute(
+                f"SELECT clave_descarga, COUNT(*) FROM {tabla} WHERE clave_descarga {_en(claves)} GROUP BY clave_descarga",
+                list(claves),
+            )
+            for clave, n in cursor.fetchall():
+                conteo[clave][tabla] = n
+    return conteo
+
+
+def archivar(claves, ruta, progreso=None):
+    """Guarda las cuatro tablas de esas descargas en un ZIP de Parquet (zstd) en ``ruta``."""
+    exportar.escribir("Parquet", ruta, claves=list(claves), progreso=progreso)
+    return ruta
+
+
+def _borrar_lote(tabla, clave, lote):
+    with conexion() as conn:
+        cursor = conn.cursor()
+        if tabla == "viajes":
+            # Las métricas de la descarga se rehacen al final, no viaje por viaje
+            migraciones.diferir_metricas(cursor)
+        cursor.execute(
+            f"DELETE FROM {tabla} WHERE id IN (SELECT id FROM {tabla} WHERE clave_descarga = %s LIMIT %s)",
+            (clave, lote),
+        )
+        return cursor.rowcount
+
+
+def purgar(claves, lote=LOTE, pausa=PAUSA, progreso=None):
+    """Borra las descargas con todo lo que cuelga de ellas; devuelve las filas borradas por tabla.
+
+    Si se corta a mitad de camino, volver a correrlo con las mismas claves termina
+    el trabajo: la fila de la descarga y sus métricas se borran al final.
+    """
+    progreso = progreso or (lambda clave, tabla, filas: None)
+    borradas = dict.fromkeys(TABLAS + ["descargas"], 0)
+    for clave in claves:
+        for tabla in TABLAS:
+            while n := _borrar_lote(tabla, clave, lote):
+                borradas[tabla] += n
+                progreso(clave, tabla, borradas[tabla])
+                if pausa:
+                    time.sleep(pausa)
+        with conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM descargas WHERE clave = %s", (clave,))
+            borradas["descargas"] += cursor.rowcount
+            migraciones.recalcular_metricas_descargas(cursor, [clave])
+    return borradas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Borra por lotes descargas completas (temporadas pasadas o pruebas)")
+    parser.add_argument("--clave", action="append", default=[], help="Clave exacta; se puede repetir")
+    parser.add_argument("--barco", help="Patrón LIKE del barco, sin distinguir mayúsculas (p. ej. %%TEST%%)")
+    parser.add_argument("--antes-de", type=date.fromisoformat, help="Descargas con fecha anterior a esta (AAAA-MM-DD)")
+    parser.add_argument("--dias", type=int, help="Descargas con más de estos días de antigüedad")
+    parser.add_argument("--archivo", help="Antes de borrar guarda todo en este ZIP de Parquet")
+    parser.add_argument("--simular", action="store_true", help="Solo muestra lo que se borraría")
+    parser.add_argument("--lote", type=int, default=LOTE)
+    args = parser.parse_args()
+
+    antes_de = args.antes_de
+    if args.dias is not None:
+        limite = date.today() - timedelta(days=args.dias)
+        antes_de = min(antes_de, limite) if antes_de else limite
+    if not (args.clave or args.barco or antes_de):
+        parser.error("indique al menos un criterio: --clave, --barco, --antes-de o --dias")
+
+    seleccion, abiertas = seleccionar(args.clave, args.barco, antes_de)
+    for descarga in abiertas:
+        print(f"⏭️ {descarga['clave']}: tiene una jornada abierta, no se toca")
+    if not seleccion:
+        print("ℹ️ Ninguna descarga cumple los criterios.")
+        raise SystemExit(0)
+
+    claves = [d["clave"] for d in seleccion]
+    conteo = contar(claves)
+    print(f"{'Descarga':<36} {'Fecha':<10} " + " ".join(f"{tabla:>12}" for tabla in TABLAS))
+    for descarga in seleccion:
+        print(f"{descarga['clave']:<36} {str(descarga['fecha']):<10} "
+              + " ".join(f"{conteo[descarga['clave']][tabla]:>12,}" for tabla in TABLAS))
+    print(f"{'Total (' + str(len(claves)) + ' descargas)':<47} "
+          + " ".join(f"{sum(c[tabla] for c in conteo.values()):>12,}" for tabla in TABLAS))
+    if args.simular:
+        print("🧪 Simulación: no se borró nada.")
+        raise SystemExit(0)
+
+    if args.archivo:
+        inicio = time.perf_counter()
+        archivar(claves, args.archivo)
+        print(f"📦 Archivado en {args.archivo} ({os.path.getsize(args.archivo) / 1e6:.1f} MB, "
+              f"{time.perf_counter() - inicio:.1f} s)")
+
+    inicio = time.perf_counter()
+    borradas = purgar(
+        claves, lote=args.lote,
+        progreso=lambda clave, tabla, filas: print(f"\r🧹 {clave} {tabla}: {filas:,}          ", end="", flush=True),
+    )
+    print()
+    print(f"✅ Filas borradas en {time.perf_counter() - inicio:.1f} s: {borradas}")
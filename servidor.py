@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import os
+import re
+import secrets
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+# Despliegue con varios procesos. Levanta varios workers de Streamlit en puertos
+# locales y un proxy delante que reparte los navegadores entre ellos:
+#
+#   python servidor.py                       # un worker por núcleo, proxy en :8501
+#   python servidor.py --workers 4 --puerto 8080
+#   python servidor.py -- --server.enableXsrfProtection false   # opciones para streamlit
+#
+# Cada sesión de Streamlit vive en la memoria de un worker (session_state, la cola
+# de escrituras, los archivos subidos), así que el proxy manda siempre al mismo
+# worker a cada navegador con una cookie. Los nuevos van al worker con menos
+# sesiones abiertas. Si un worker se cae, el proxy lo reinicia y mientras tanto
+# manda a sus navegadores a otro (pierden el estado de la pantalla, no los datos).
+#
+# A los workers se les activa por defecto la caché compartida (CACHE_BACKEND=sqlite,
+# ver cache.py) y un pool de procesos para exportaciones y análisis
+# (TRABAJOS_PROCESOS, ver trabajos.py). Con la base local (DB_BACKEND=sqlite) solo
+# el primero corre el sincronizador. Con INSTRUMENTACION_PROMETHEUS_PUERTO cada
+# worker publica /metrics en ese puerto + su número.
+
+# Workers de Streamlit; 0 = uno por núcleo
+WORKERS = int(os.getenv("SERVIDOR_WORKERS", "0"))
+# Puerto del proxy, el que abre el navegador
+PUERTO = int(os.getenv("SERVIDOR_PUERTO", "8501"))
+# Primer puerto de los workers (escuchan solo en 127.0.0.1)
+PUERTO_WORKERS = int(os.getenv("SERVIDOR_PUERTO_WORKERS", "8601"))
+# Procesos del pool de trabajo pesado en cada worker
+PROCESOS = int(os.getenv("TRABAJOS_PROCESOS", "1"))
+# Segundos sin recibir la cabecera de un pedido antes de cortar la conexión
+ESPERA_CABECERA = 60
+# Segundos mínimos entre dos arranques del mismo worker
+REINICIO_MIN = 5
+
+COOKIE = "bitacora_worker"
+CABECERAS_CONEXION = {"connection", "keep-alive", "proxy-connection"}
+RESPUESTA_502 = (b"HTTP/1.1 502 Bad Gateway\r\nContent-Type: text/plain; charset=utf-8\r\n"
+                 b"Connection: close\r\n\r\nNingun worker disponible, reintente en unos segundos.\n")
+
+
+# ==== Proxy ====
+
+def _valor(lineas, nombre):
+    for linea in lineas:
+        clave, _, valor = linea.partition(":")
+        if clave.strip().lower() == nombre:
+            return valor.strip()
+    return ""
+
+
+def _sin_conexion(lineas):
+    # Sin keep-alive: cada conexión lleva un solo pedido y se elige worker por pedido
+    return [l for l in lineas if l.partition(":")[0].strip().lower() not in CABECERAS_CONEXION] + ["Connection: close"]
+
+
+async def _copiar(origen, destino):
+    try:
+        while datos := await origen.read(65536):
+            destino.write(datos)
+            await destino.drain()
+    except (ConnectionError, OSError):
+        pass
+
+
+class Balanceador:
+    """Proxy HTTP y WebSocket que manda cada navegador siempre al mismo worker."""
+
+    def __init__(self, puertos):
+        self.puertos = puertos
+        # WebSockets abiertos por worker (una sesión de Streamlit cada uno)
+        self.sesiones = [0] * len(puertos)
+
+    async def _conectar(self, preferido):
+        # El de la cookie primero; si no responde (se está reiniciando), el menos cargado
+        otros = sorted((i for i in range(len(self.puertos)) if i != preferido), key=self.sesiones.__getitem__)
+        for i in ([preferido] if preferido is not None else []) + otros:
+            try:
+                return i, await asyncio.open_connection("127.0.0.1", self.puertos[i])
+            except OSError:
+                continue
+        return None, (None, None)
+
+    async def atender(self, cliente_r, cliente_w):
+        try:
+            cabecera = await asyncio.wait_for(cliente_r.readuntil(b"\r\n\r\n"), ESPERA_CABECERA)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            cliente_w.close()
+            return
+        primera, *lineas = cabecera.decode("latin-1").split("\r\n")[:-2]
+        websocket = _valor(lineas, "upgrade").lower() == "websocket"
+        marca = re.search(rf"(?:^|;)\s*{COOKIE}=(\d+)", _valor(lineas, "cookie"))
+        pedido = int(marca.group(1)) if marca and int(marca.group(1)) < len(self.puertos) else None
+
+        i, (worker_r, worker_w) = await self._conectar(pedido)
+        if i is None:
+            cliente_w.write(RESPUESTA_502)
+            cliente_w.close()
+            return
+        if not websocket:
+            lineas = _sin_conexion(lineas)
+        worker_w.write("\r\n".join([primera] + lineas + ["", ""]).encode("latin-1"))
+
+        subida = asyncio.create_task(_copiar(cliente_r, worker_w))
+        if websocket:
+            self.sesiones[i] += 1
+        try:
+            respuesta = await worker_r.readuntil(b"\r\n\r\n")
+            estado, *lineas = respuesta.decode("latin-1").split("\r\n")[:-2]
+            if not websocket:
+                lineas = _sin_conexion(lineas)
+            if i != pedido:
+                lineas.append(f"Set-Cookie: {COOKIE}={i}; Path=/; HttpOnly; SameSite=Lax")
+            cliente_w.write("\r\n".join([estado] + lineas + ["", ""]).encode("latin-1"))
+            bajada = asyncio.create_task(_copiar(worker_r, cliente_w))
+            # Un pedido HTTP termina con la respuesta; un WebSocket cuando cierra cualquiera de los dos
+            await asyncio.wait([bajada] if not websocket else [bajada, subida], return_when=asyncio.FIRST_COMPLETED)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            if websocket:
+                self.sesiones[i] -= 1
+            subida.cancel()
+            worker_w.close()
+            cliente_w.close()
+
+    async def servir(self, sock):
+        servidor = await asyncio.start_server(self.atender, sock=sock)
+        async with servidor:
+            await servidor.serve_forever()
+
+
+# ==== Workers ====
+
+class Worker:
+    """Un proceso ``streamlit run App.py`` en un puerto local."""
+
+    def __init__(self, numero, puerto, entorno, opciones):
+        self.numero = numero
+        self.puerto = puerto
+        self.entorno = entorno
+        self.opciones = opciones
+        self.proceso = None
+        self.inicio = 0
+
+    def iniciar(self):
+        self.inicio = time.monotonic()
+        self.proceso = subprocess.Popen([
+            sys.executable, "-m", "streamlit", "run", "App.py",
+            "--server.port", str(self.puerto), "--server.address", "127.0.0.1",
+            "--server.headless", "true", *self.opciones,
+        ], env=self.entorno)
+
+    def detener(self):
+        if self.proceso and self.proceso.poll() is None:
+            self.proceso.terminate()
+
+
+def entornos(workers, procesos, secreto):
+    """Variables de entorno de cada worker."""
+    base = dict(os.environ)
+    base.setdefault("CACHE_BACKEND", "sqlite")
+    base["TRABAJOS_PROCESOS"] = str(procesos)
+    # Mismo secreto en todos: las cookies de Streamlit (XSRF) valen en cualquier worker
+    base.setdefault("STREAMLIT_SERVER_COOKIE_SECRET", secreto)
+    prometheus = int(base.get("INSTRUMENTACION_PROMETHEUS_PUERTO", "0"))
+    resultado = []
+    for numero in range(workers):
+        entorno = dict(base, SERVIDOR_WORKER=str(numero))
+        if numero > 0:
+            entorno["SYNC_ACTIVO"] = "0"
+        if prometheus:
+            entorno["INSTRUMENTACION_PROMETHEUS_PUERTO"] = str(prometheus + numero)
+        resultado.append(entorno)
+    return resultado
+
+
+def vigilar(workers, detenido):
+    # Reinicia los workers que terminan solos, no más de una vez cada REINICIO_MIN segundos
+    while not detenido.wait(1):
+        for worker in workers:
+            if worker.proceso.poll() is not None and time.monotonic() - worker.inicio > REINICIO_MIN:
+                print(f"⚠️ Worker {worker.numero} terminó (código {worker.proceso.returncode}); reiniciando")
+                worker.iniciar()
+
+
+def _terminar(*_):
+    raise KeyboardInterrupt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varios workers de Streamlit detrás de un proxy con sesiones fijas")
+    parser.add_argument("--workers", type=int, default=WORKERS or os.cpu_count() or 1)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--procesos", type=int, default=PROCESOS, help="Procesos del pool de trabajo pesado por worker")
+    parser.add_argument("opciones", nargs="*", help="Opciones para streamlit run, después de --")
+    args = parser.parse_args()
+
+    if os.getenv("CACHE_BACKEND", "sqlite").lower() == "memoria" and args.workers > 1:
+        print("⚠️ CACHE_BACKEND=memoria: cada worker verá los cambios de los demás recién al vencer el TTL")
+
+    # Las migraciones una sola vez, antes de que arranquen los workers
+    import db
+    import migraciones
+
+    try:
+        migraciones.aplicar_pendientes_sqlite() if db.es_sqlite() else migraciones.aplicar_pendientes()
+    except Exception as e:
+        print("❌ Error al aplicar migraciones:", e)
+        sys.exit(1)
+
+    # El puerto del proxy se toma antes de levantar nada: si está ocupado se corta aquí
+    sock = socket.create_server((args.host, args.puerto))
+    secreto = secrets.token_hex(16)
+    workers = [
+        Worker(numero, PUERTO_WORKERS + numero, entorno, args.opciones)
+        for numero, entorno in enumerate(entornos(args.workers, args.procesos, secreto))
+    ]
+    for worker in workers:
+        worker.iniciar()
+    detenido = threading.Event()
+    threading.Thread(target=vigilar, args=(workers, detenido), name="vigilante", daemon=True).start()
+    signal.signal(signal.SIGTERM, _terminar)
+
+    print(f"🚢 {len(workers)} workers ({PUERTO_WORKERS}-{PUERTO_WORKERS + len(workers) - 1}) "
+          f"detrás de http://{args.host}:{args.puerto}")
+    try:
+        asyncio.run(Balanceador([w.puerto for w in workers]).servir(sock))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        detenido.set()
+        for worker in workers:
+            worker.detener()
+        # Se les da tiempo de vaciar su cola de escrituras (ver escrituras.py)
+        limite = time.monotonic() + 15
+        for worker in workers:
+            try:
+                worker.proceso.wait(max(limite - time.monotonic(), 0.1))
+            except subprocess.TimeoutExpired:
+                worker.proceso.kill()
@@ -1,62 +1,87 @@
+import sys
 
-import sqlite3
+# Esquema de la base local SQLite; equivale al de Postgres tras las migraciones.
+# Las horas y fechas se guardan como texto ISO y db.py las convierte a datetime/date.
+ESQUEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS descargas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        clave TEXT UNIQUE,
+        barco TEXT,
+        lote TEXT,
+        fecha DATE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS jornadas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        clave_descarga TEXT,
+        fecha DATE,
+        hora_inicio TIMESTAMP,
+        hora_fin TIMESTAMP,
+        ultimo_consecutivo INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS viajes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        clave_descarga TEXT,
+        id_jornada INTEGER,
+        consecutivo TEXT,
+        placa TEXT,
+        estado TEXT CHECK (estado IN ('CARGUE', 'TRANSITO', 'EN ESPERA', 'DESCARGA', 'EN DESCARGA', 'FINALIZADO')),
+        hora_inicio_cargue TIMESTAMP,
+        hora_fin_cargue TIMESTAMP,
+        hora_inicio_transito TIMESTAMP,
+        hora_llegada_planta TIMESTAMP,
+        hora_ingreso_planta TIMESTAMP,
+        hora_inicio_descarga TIMESTAMP,
+        hora_fin_descarga TIMESTAMP,
+        updated_at TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+        version INTEGER NOT NULL DEFAULT 1,
+        cupo_cargue INTEGER CHECK (cupo_cargue BETWEEN 1 AND 2),
+        CHECK (cupo_cargue IS NULL OR estado = 'CARGUE')
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS temperaturas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        hora_medicion TIMESTAMP,
+        bodega TEXT,
+        especie TEXT,
+        talla TEXT,
+        temperatura REAL,
+        lugar TEXT,
+        clave_descarga TEXT,
+        id_jornada INTEGER
+    )
+    ''',
+    # Índices para las consultas frecuentes de la app
+    "CREATE INDEX IF NOT EXISTS idx_jornadas_descarga ON jornadas (clave_descarga, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_jornadas_abiertas ON jornadas (clave_descarga) WHERE hora_fin IS NULL",
+    "CREATE INDEX IF NOT EXISTS idx_viajes_jornada_estado ON viajes (id_jornada, estado, placa)",
+    "CREATE INDEX IF NOT EXISTS idx_viajes_estado_descarga ON viajes (estado, clave_descarga)",
+    "CREATE INDEX IF NOT EXISTS idx_viajes_jornada_cambios ON viajes (id_jornada, updated_at)",
+    "CREATE INDEX IF NOT EXISTS idx_temperaturas_descarga ON temperaturas (clave_descarga, hora_medicion)",
+    "CREATE INDEX IF NOT EXISTS idx_descargas_barco ON descargas (barco, fecha, lote)",
+    # Reglas de viajes (ver viajes.py)
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_viajes_cupo_cargue ON viajes (id_jornada, cupo_cargue) WHERE cupo_cargue IS NOT NULL",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_viajes_placa_activa ON viajes (id_jornada, placa) WHERE estado <> 'FINALIZADO'",
+    # Marca de cambios del tablero de viajes
+    '''
+    CREATE TRIGGER IF NOT EXISTS viajes_tocar AFTER UPDATE ON viajes
+    WHEN NEW.version = OLD.version
+    BEGIN
+        UPDATE viajes SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'), version = OLD.version + 1
+        WHERE id = NEW.id;
+    END
+    ''',
+]
 
-conn = sqlite3.connect("bitacora_descarga.db")
-cursor = conn.cursor()
 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS descargas (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    clave TEXT UNIQUE,
-    barco TEXT,
-    lote TEXT,
-    fecha TEXT
-)
-''')
+if __name__ == "__main__":
+    from migraciones import aplicar_pendientes_sqlite
 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS jornadas (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    clave_descarga TEXT,
-    fecha TEXT,
-    hora_inicio TEXT,
-    hora_fin TEXT
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS viajes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    clave_descarga TEXT,
-    id_jornada INTEGER,
-    consecutivo TEXT,
-    placa TEXT,
-    estado TEXT,
-    hora_inicio_cargue TEXT,
-    hora_fin_cargue TEXT,
-    hora_inicio_transito TEXT,
-    hora_llegada_planta TEXT,
-    hora_ingreso_planta TEXT,
-    hora_inicio_descarga TEXT,
-    hora_fin_descarga TEXT
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS temperaturas (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    hora_medicion TEXT,
-    bodega TEXT,
-    especie TEXT,
-    talla TEXT,
-    temperatura REAL,
-    lugar TEXT,
-    clave_descarga TEXT,
-    id_jornada INTEGER
-)
-''')
-
-conn.commit()
-conn.close()
-
-print("Base de datos 'bitacora_descarga.db' creada correctamente.")
+    ruta = sys.argv[1] if len(sys.argv) > 1 else "bitacora_descarga.db"
+    aplicar_pendientes_sqlite(ruta, verbose=True)
+    print(f"Base de datos '{ruta}' creada correctamente.")
@@ -0,0 +1,227 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from itertools import groupby
+
+import psycopg2
+import psycopg2.pool
+import streamlit as st
+from psycopg2.extras import execute_values
+
+import db
+import migraciones
+from db import conexion_postgres, conexion_sqlite
+
+# Entradas del outbox por transacción en Postgres
+LOTE = int(os.getenv("SYNC_LOTE", "500"))
+# Segundos entre revisiones cuando el outbox está vacío
+INTERVALO = float(os.getenv("SYNC_INTERVALO_SEG", "2"))
+# Tope de espera entre reintentos cuando Postgres no responde
+ESPERA_MAX = float(os.getenv("SYNC_ESPERA_MAX_SEG", "60"))
+# Una entrada que falla estas veces queda FALLIDO y deja de bloquear la cola
+MAX_INTENTOS = int(os.getenv("SYNC_MAX_INTENTOS", "10"))
+# Si este proceso corre el sincronizador. Con varios workers sobre la misma base
+# local basta uno (servidor.py lo deja solo en el primero)
+ACTIVO = os.getenv("SYNC_ACTIVO", "1") == "1"
+
+# Columna que identifica cada fila en Postgres
+CLAVES = {"descargas": "clave", "jornadas": "id", "viajes": "id", "temperaturas": "id"}
+
+ERRORES_RED = db.ERRORES_CONEXION + (psycopg2.pool.PoolError,)
+
+
+class Sincronizador(threading.Thread):
+    """Envía a Postgres, en segundo plano, los cambios que los triggers dejan en el outbox local.
+
+    Cada entrada tiene una clave de idempotencia que se registra en
+    ``sync_aplicados`` en la misma transacción que el cambio, así que reenviar un
+    lote después de un corte no duplica nada. Las entradas enviadas se borran
+    del outbox.
+    """
+
+    def __init__(self, ruta=None, lote=LOTE, intervalo=INTERVALO):
+        super().__init__(name="sincronizador", daemon=True)
+        self.ruta = ruta
+        self.lote = lote
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+        self._columnas_pg = None
+        self.enviadas = 0
+        self.fallidas = 0
+        self.ultimo_error = None
+        self.ultima_sync = None
+
+    # ---- outbox local ----
+
+    def _leer(self, limite):
+        with conexion_sqlite(self.ruta) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, clave_idempotencia, tabla, operacion, fila, intentos
+                FROM outbox WHERE estado = 'PENDIENTE' ORDER BY id LIMIT %s
+            """, (limite,))
+            return cursor.fetchall()
+
+    def _borrar(self, ids):
+        with conexion_sqlite(self.ruta) as conn:
+            conn.cursor().execute(f"DELETE FROM outbox WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+    def _registrar_fallo(self, entrada, error):
+        id_outbox, _, _, _, _, intentos = entrada
+        estado = "FALLIDO" if intentos + 1 >= MAX_INTENTOS else "PENDIENTE"
+        with conexion_sqlite(self.ruta) as conn:
+            conn.cursor().execute(
+                "UPDATE outbox SET intentos = intentos + 1, ultimo_error = %s, estado = %s WHERE id = %s",
+                (str(error)[:500], estado, id_outbox),
+            )
+        if estado == "FALLIDO":
+            self.fallidas += 1
+
+    def pendientes(self):
+        with conexion_sqlite(self.ruta) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT estado, COUNT(*) FROM outbox GROUP BY estado")
+            return dict(cursor.fetchall())
+
+    # ---- Postgres ----
+
+    def _preparar(self):
+        # Primera conexión: esquema al día y columnas de cada tabla
+        if self._columnas_pg is not None:
+            return
+        migraciones.aplicar_pendientes()
+        with conexion_postgres() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT table_name, column_name FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = ANY(%s)
+            """, (list(CLAVES),))
+            columnas = {}
+            for tabla, columna in cursor.fetchall():
+                columnas.setdefault(tabla, set()).add(columna)
+        self._columnas_pg = columnas
+
+    def _aplicar(self, entradas):
+        """Aplica las entradas en una sola transacción; devuelve cuántas eran nuevas."""
+        with conexion_postgres() as conn:
+            cursor = conn.cursor()
+            claves = [e[1] for e in entradas]
+            cursor.execute("SELECT clave_idempotencia FROM sync_aplicados WHERE clave_idempotencia = ANY(%s)", (claves,))
+            aplicadas = {fila[0] for fila in cursor.fetchall()}
+            nuevas = [e for e in entradas if e[1] not in aplicadas]
+            if not nuevas:
+                return 0
+
+            # Solo cuenta el último estado de cada fila; se mantiene el orden de ese último cambio
+            ultimos = {}
+            for _, _, tabla, operacion, fila, _ in nuevas:
+                fila = json.loads(fila)
+                llave = (tabla, fila[CLAVES[tabla]])
+                ultimos.pop(llave, None)
+                ultimos[llave] = (operacion, {k: v for k, v in fila.items() if k in self._columnas_pg[tabla]})
+
+            cambios = [(tabla, operacion, fila) for (tabla, _), (operacion, fila) in ultimos.items()]
+            # Los cambios consecutivos de la misma forma van en una sola sentencia
+            for (tabla, operacion, columnas), grupo in groupby(cambios, key=lambda c: (c[0], c[1], tuple(c[2]))):
+                filas = [c[2] for c in grupo]
+                clave = CLAVES[tabla]
+                if operacion == "DELETE":
+                    cursor.execute(f"DELETE FROM {tabla} WHERE {clave} = ANY(%s)", ([f[clave] for f in filas],))
+                    continue
+                actualizar = ", ".join(f"{col} = EXCLUDED.{col}" for col in columnas if col != clave)
+                conflicto = f"DO UPDATE SET {actualizar}" if actualizar else "DO NOTHING"
+                execute_values(
+                    cursor,
+                    f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES %s ON CONFLICT ({clave}) {conflicto}",
+                    [tuple(f[col] for col in columnas) for f in filas],
+                    page_size=len(filas),
+                )
+            execute_values(
+                cursor,
+                "INSERT INTO sync_aplicados (clave_idempotencia, nodo) VALUES %s ON CONFLICT DO NOTHING",
+                [(e[1], db.NODO_ID) for e in nuevas],
+                page_size=len(nuevas),
+            )
+            return len(nuevas)
+
+    # ---- ciclo ----
+
+    def sincronizar_lote(self):
+        """Envía un lote del outbox; devuelve cuántas entradas salieron de la cola."""
+        entradas = self._leer(self.lote)
+        if not entradas:
+            return 0
+        self._preparar()
+        try:
+            self.enviadas += self._aplicar(entradas)
+            self._borrar([e[0] for e in entradas])
+            self.ultimo_error = None
+            procesadas = len(entradas)
+        except ERRORES_RED:
+            raise
+        except psycopg2.Error:
+            # Se reenvían de a una para aislar la que falla sin frenar a las demás
+            procesadas = 0
+            for entrada in entradas:
+                try:
+                    self.enviadas += self._aplicar([entrada])
+                    self._borrar([entrada[0]])
+                    procesadas += 1
+                except ERRORES_RED:
+                    raise
+                except psycopg2.Error as e:
+                    self.ultimo_error = str(e)
+                    self._registrar_fallo(entrada, e)
+        self.ultima_sync = datetime.now()
+        return procesadas
+
+    def vaciar(self):
+        """Sincroniza mientras salgan lotes completos; devuelve las entradas procesadas.
+
+        Si alguna entrada falló se corta aquí, para reintentarla en el próximo ciclo.
+        """
+        total = 0
+        while (n := self.sincronizar_lote()) > 0:
+            total += n
+            if n < self.lote:
+                break
+        return total
+
+    def run(self):
+        espera = self.intervalo
+        while not self._detener.is_set():
+            try:
+                self.vaciar()
+                espera = self.intervalo
+            except ERRORES_RED as e:
+                # Sin red: los cambios siguen en el outbox; se reintenta cada vez más espaciado
+                self.ultimo_error = str(e)
+                espera = min(espera * 2, ESPERA_MAX)
+            self._detener.wait(espera)
+
+    def detener(self):
+        self._detener.set()
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar():
+    # Un solo sincronizador por proceso
+    sincronizador = Sincronizador()
+    sincronizador.start()
+    return sincronizador
+
+
+if __name__ == "__main__":
+    if "--una-vez" in sys.argv:
+        sincronizador = Sincronizador()
+        inicio = time.perf_counter()
+        total = sincronizador.vaciar()
+        segundos = time.perf_counter() - inicio
+        print(f"✅ {total} entradas procesadas ({sincronizador.enviadas} aplicadas) en {segundos:.2f} s "
+              f"({total / segundos if segundos else 0:.0f} entradas/s)")
+        print("Outbox:", sincronizador.pendientes() or "vacío")
+    else:
+        print("Uso: python sincronizacion.py --una-vez")
@@ -0,0 +1,179 @@
+import os
+from datetime import date, datetime, time, timedelta
+
+import pandas as pd
+
+import db
+import migraciones
+from db import conexion
+
+# Listas para seleccionar especie y talla
+ESPECIES = ["YELLOWFIN", "BIGEYE", "SKIPJACK", "ALBACORA"]
+TALLAS = ["2-3", "3-4", "4-5", "5-7.5", "7.5-10", "10-16", "16-20",
+          "20-30", "30-40", "40-60", "60-80", "80-100", ">100", "RC", "RR"]
+LUGARES = ["Puerto", "Planta"]
+
+# Rango aceptado para una lectura (°C); fuera de esto casi siempre es un error de digitación
+TEMPERATURA_MIN = -60.0
+TEMPERATURA_MAX = 40.0
+
+COLUMNAS_LOTE = ["hora", "especie", "talla", "temperatura"]
+
+# Columnas por las que se separan las series del monitoreo
+SERIES = ["bodega", "especie"]
+# Puntos por serie que dibuja el gráfico; la base agrupa las lecturas en intervalos
+# de tiempo (mínima, promedio y máxima de cada uno) para no pasar de esto
+PUNTOS_GRAFICO = int(os.getenv("TEMPERATURAS_PUNTOS_GRAFICO", "400"))
+# Anchos de intervalo posibles, en segundos
+INTERVALOS = [60, 300, 600, 900, 1800, 3600, 2 * 3600, 4 * 3600, 6 * 3600, 12 * 3600, 24 * 3600]
+
+
+def lote_vacio():
+    return pd.DataFrame({
+        "hora": pd.Series(dtype="object"),
+        "especie": pd.Series(dtype="object"),
+        "talla": pd.Series(dtype="object"),
+        "temperatura": pd.Series(dtype="float"),
+    })
+
+
+def validar_lote(df, bodega, lugar, hora_por_defecto, inicio_jornada=None):
+    """Convierte las filas del editor en registros listos para insertar.
+
+    Las horas toman la fecha de la jornada (``inicio_jornada``, o hoy si no se da);
+    las anteriores a su hora de inicio son de un turno que cruzó la medianoche y
+    pasan al día siguiente. Devuelve (registros, errores). Las filas totalmente
+    vacías se ignoran; si hay algún error no se debe guardar nada.
+    """
+    dia = inicio_jornada.date() if inicio_jornada else date.today()
+    errores = []
+    if not bodega or not str(bodega).strip():
+        errores.append("Debe indicar la bodega.")
+    if lugar not in LUGARES:
+        errores.append(f"Lugar inválido: {lugar}")
+
+    registros = []
+    for n, fila in enumerate(df.itertuples(index=False), start=1):
+        if all(pd.isna(getattr(fila, col)) for col in COLUMNAS_LOTE):
+            continue
+        if fila.especie not in ESPECIES:
+            errores.append(f"Fila {n}: especie inválida ({fila.especie}).")
+        if fila.talla not in TALLAS:
+            errores.append(f"Fila {n}: talla inválida ({fila.talla}).")
+        if pd.isna(fila.temperatura):
+            errores.append(f"Fila {n}: falta la temperatura.")
+        elif not TEMPERATURA_MIN <= float(fila.temperatura) <= TEMPERATURA_MAX:
+            errores.append(f"Fila {n}: temperatura fuera de rango ({fila.temperatura} °C).")
+        # El editor puede devolver la hora como texto (columna sin tipo al empezar vacía)
+        try:
+            hora = hora_por_defecto if pd.isna(fila.hora) else (
+                fila.hora if isinstance(fila.hora, time) else pd.to_datetime(fila.hora).time()
+            )
+        except (ValueError, TypeError):
+            errores.append(f"Fila {n}: hora inválida ({fila.hora}).")
+            continue
+        momento = datetime.combine(dia, hora)
+        if inicio_jornada and hora < inicio_jornada.time():
+            momento += timedelta(days=1)
+        registros.append((
+            momento, str(bodega).strip(), fila.especie, fila.talla,
+            None if pd.isna(fila.temperatura) else float(fila.temperatura), lugar,
+        ))
+    if not registros and not errores:
+        errores.append("No hay lecturas para guardar.")
+    return registros, errores
+
+
+def guardar_lote(registros, clave_descarga, id_jornada, cursor=None):
+    """Inserta todas las lecturas en un solo INSERT multi-fila dentro de una transacción."""
+    if cursor is None:
+        with conexion() as conn:
+            return guardar_lote(registros, clave_descarga, id_jornada, conn.cursor())
+    db.insertar_filas(cursor, """
+        INSERT INTO temperaturas
+        (hora_medicion, bodega, especie, talla, temperatura, lugar, clave_descarga, id_jornada)
+        VALUES %s
+    """, [r + (clave_descarga, int(id_jornada)) for r in registros])
+    return len(registros)
+
+
+# ==== Monitoreo y alertas ====
+
+def ancho_intervalo(desde, hasta, puntos=PUNTOS_GRAFICO):
+    """Segundos del intervalo más fino de INTERVALOS con el que el rango cabe en ``puntos``."""
+    if desde is None or hasta is None:
+        return INTERVALOS[0]
+    segundos = (hasta - desde).total_seconds()
+    return next((ancho for ancho in INTERVALOS if segundos / ancho <= puntos), INTERVALOS[-1])
+
+
+def comparar_lugares(serie):
+    """Lecturas, promedio, mínima y máxima de cada serie en Puerto y en Planta, y la diferencia de promedios.
+
+    ``serie`` es la salida de repositorio.serie_temperaturas; el promedio se
+    pondera por las lecturas de cada intervalo.
+    """
+    serie = serie.assign(suma=serie["promedio"] * serie["lecturas"])
+    grupos = serie.groupby(["serie", "lugar"], observed=True)
+    tabla = pd.DataFrame({
+        "lecturas": grupos["lecturas"].sum(),
+        "promedio": grupos["suma"].sum() / grupos["lecturas"].sum(),
+        "mínima": grupos["minima"].min(),
+        "máxima": grupos["maxima"].max(),
+    }).unstack("lugar")
+    tabla.columns = [f"{valor} {lugar}" for valor, lugar in tabla.columns]
+    if {"promedio Puerto", "promedio Planta"} <= set(tabla.columns):
+        tabla["Δ promedio (Planta − Puerto)"] = tabla["promedio Planta"] - tabla["promedio Puerto"]
+    return tabla.round(1)
+
+
+def revisar_alertas(clave_descarga, cursor=None):
+    """Marca como revisadas las alertas pendientes de la descarga; devuelve cuántas."""
+    if cursor is None:
+        with conexion() as conn:
+            return revisar_alertas(clave_descarga, conn.cursor())
+    cursor.execute(
+        "UPDATE alertas_temperatura SET revisada_en = %s WHERE clave_descarga = %s AND revisada_en IS NULL",
+        (datetime.now(), clave_descarga),
+    )
+    return cursor.rowcount
+
+
+def validar_umbrales(df):
+    """Convierte las filas del editor de umbrales en (especie, máxima, mínima); devuelve (filas, errores)."""
+    filas, errores, vistas = [], [], set()
+    for n, fila in enumerate(df.itertuples(index=False), start=1):
+        if pd.isna(fila.especie) and pd.isna(fila.temperatura_max) and pd.isna(fila.temperatura_min):
+            continue
+        if fila.especie not in ESPECIES:
+            errores.append(f"Fila {n}: especie inválida ({fila.especie}).")
+        elif fila.especie in vistas:
+            errores.append(f"Fila {n}: {fila.especie} ya tiene umbral.")
+        vistas.add(fila.especie)
+        maximo = None if pd.isna(fila.temperatura_max) else float(fila.temperatura_max)
+        minimo = None if pd.isna(fila.temperatura_min) else float(fila.temperatura_min)
+        if maximo is None:
+            errores.append(f"Fila {n}: falta la temperatura máxima.")
+        elif minimo is not None and minimo >= maximo:
+            errores.append(f"Fila {n}: la mínima debe ser menor que la máxima.")
+        filas.append((fila.especie, maximo, minimo))
+    return filas, errores
+
+
+def guardar_umbrales(umbrales, cursor=None):
+    """Reemplaza los umbrales por especie con las filas (especie, máxima, mínima o None)."""
+    if cursor is None:
+        with conexion() as conn:
+            return guardar_umbrales(umbrales, conn.cursor())
+    cursor.execute("DELETE FROM umbrales_temperatura")
+    if umbrales:
+        db.insertar_filas(cursor, "INSERT INTO umbrales_temperatura (especie, temperatura_max, temperatura_min) VALUES %s", umbrales)
+    return len(umbrales)
+
+
+def reevaluar_alertas(clave_descarga, cursor=None):
+    """Compara todas las lecturas de la descarga con los umbrales actuales (solo a pedido)."""
+    if cursor is None:
+        with conexion() as conn:
+            return reevaluar_alertas(clave_descarga, conn.cursor())
+    migraciones.evaluar_alertas_descargas(cursor, [clave_descarga])
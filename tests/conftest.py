@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+# Las pruebas corren contra una base SQLite temporal; db lee el backend al importarse,
+# así que esto va antes de cualquier import del proyecto
+_DIRECTORIO = tempfile.mkdtemp(prefix="bitacora_pruebas_")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_DIRECTORIO, "bitacora.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def base_sqlite():
+    """Ruta de la base temporal, con el esquema local al día."""
+    import migraciones
+
+    migraciones.aplicar_pendientes_sqlite()
+    return os.environ["SQLITE_PATH"]
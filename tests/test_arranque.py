@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Presupuesto del arranque en frío de la pantalla inicial, en ms, medido en un
+# proceso nuevo: el primer run (importaciones de la app, esquema y dibujo) y un
+# rerun de esa misma pantalla. Dependen de la máquina; se ajustan por entorno.
+PRESUPUESTO_PRIMER_RUN = int(os.getenv("BENCH_PRESUPUESTO_PRIMER_RUN_MS", "1000"))
+PRESUPUESTO_RERUN = int(os.getenv("BENCH_PRESUPUESTO_RERUN_MS", "100"))
+RERUNS = int(os.getenv("BENCH_ARRANQUE_RERUNS", "5"))
+# Módulos que la pantalla inicial no debe importar (se cargan al abrir su sección, ver vistas/)
+DIFERIDOS = ["pandas", "numpy", "openpyxl", "pyarrow", "datos", "analitica", "exportar", "importar"]
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "App.py")
+
+
+def medir(reruns):
+    """Primer run de la pantalla inicial, p50 de sus reruns y primera visita a cada sección.
+
+    Tiene sentido solo en un proceso que todavía no importó nada de la app.
+    """
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    resultado = {"streamlit_ms": (time.perf_counter() - inicio) * 1000}
+    at = AppTest.from_file(APP, default_timeout=120)
+    inicio = time.perf_counter()
+    at.run()
+    resultado["primer_run_ms"] = (time.perf_counter() - inicio) * 1000
+    resultado["diferidos_cargados"] = [m for m in DIFERIDOS if m in sys.modules]
+    tiempos = []
+    for _ in range(reruns):
+        inicio = time.perf_counter()
+        at.run()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    resultado["rerun_ms"] = sorted(tiempos)[len(tiempos) // 2]
+    resultado["secciones_ms"] = {}
+    import vistas
+
+    for clave in list(vistas.SECCIONES)[1:]:
+        inicio = time.perf_counter()
+        at.radio(key="seccion").set_value(clave).run()
+        resultado["secciones_ms"][clave] = (time.perf_counter() - inicio) * 1000
+    resultado["error"] = at.exception[0].message if at.exception else None
+    return resultado
+
+
+def test_arranque_en_frio(base_sqlite):
+    # El proceso de pytest ya importó pandas y la base: se mide en uno nuevo
+    proceso = subprocess.run(
+        [sys.executable, __file__, str(RERUNS)], cwd=os.path.dirname(APP), capture_output=True, text=True,
+    )
+    assert proceso.returncode == 0, proceso.stderr
+    # La app también escribe en stdout; el resultado es la última línea
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    print(f"\nimport streamlit {resultado['streamlit_ms']:.0f} ms (no cuenta para el presupuesto)")
+    print(f"primer run {resultado['primer_run_ms']:.0f} ms (presupuesto {PRESUPUESTO_PRIMER_RUN})")
+    print(f"rerun p50 {resultado['rerun_ms']:.0f} ms (presupuesto {PRESUPUESTO_RERUN})")
+    print("primera visita:", ", ".join(f"{clave} {ms:.0f} ms" for clave, ms in resultado["secciones_ms"].items()))
+
+    assert resultado["error"] is None
+    assert resultado["diferidos_cargados"] == []
+    assert resultado["primer_run_ms"] <= PRESUPUESTO_PRIMER_RUN
+    assert resultado["rerun_ms"] <= PRESUPUESTO_RERUN
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(APP))
+    print(json.dumps(medir(int(sys.argv[1]))))
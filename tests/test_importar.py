@@ -0,0 +1,124 @@
+from datetime import date, datetime, time
+
+import pytest
+from openpyxl import Workbook
+
+import db
+import exportar
+import importar
+
+CLAVE = "LEGADO-20190304-1"
+
+# Hojas como las exportaba la versión anterior (SELECT * de las tablas con horas en texto):
+# jornada nocturna que cruza la medianoche y un viaje con celdas de hora de Excel
+HOJAS_LEGADO = {
+    "Descargas": [
+        ["id", "clave", "barco", "lote", "fecha"],
+        [1, CLAVE, "LEGADO", "1", "2019-03-04"],
+    ],
+    "Jornadas": [
+        ["id", "clave_descarga", "fecha", "hora_inicio", "hora_fin"],
+        [7, CLAVE, "2019-03-04", "20:00:00", "04:30:00"],
+    ],
+    "Viajes": [
+        ["id", "clave_descarga", "id_jornada", "consecutivo", "placa", "estado", *importar.migraciones.HORAS_VIAJE],
+        [1, CLAVE, 7, "V-001", "ABC123", "FINALIZADO",
+         "21:10:00", "21:40:00", "21:40:00", "22:05", "22:15:00", "23:50:00", "00:20:00"],
+        [2, CLAVE, 7, "V-002", "XYZ789", "TRANSITO",
+         time(1, 5), time(1, 35), time(1, 35), None, None, None, None],
+    ],
+    "Temperaturas": [
+        ["id", "hora_medicion", "bodega", "especie", "talla", "temperatura", "lugar", "clave_descarga", "id_jornada"],
+        [1, "02:00:00", "B1", "SKIPJACK", "3-4", -18.5, "Planta", CLAVE, 7],
+        [2, "09:30:00", "B2", "YELLOWFIN", "5-7.5", -17.0, "Puerto", CLAVE, None],
+    ],
+}
+
+
+def _libro(ruta, hojas):
+    libro = Workbook()
+    libro.remove(libro.active)
+    for hoja, filas in hojas.items():
+        ws = libro.create_sheet(hoja)
+        for fila in filas:
+            ws.append(fila)
+    libro.save(ruta)
+
+
+def _guardado():
+    with db.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT hora_inicio, hora_fin FROM jornadas WHERE clave_descarga = %s", (CLAVE,))
+        jornadas = cursor.fetchall()
+        cursor.execute(
+            f"SELECT consecutivo, {', '.join(importar.migraciones.HORAS_VIAJE)} FROM viajes "
+            "WHERE clave_descarga = %s ORDER BY consecutivo", (CLAVE,),
+        )
+        viajes = cursor.fetchall()
+        cursor.execute(
+            "SELECT bodega, hora_medicion FROM temperaturas WHERE clave_descarga = %s ORDER BY bodega", (CLAVE,),
+        )
+        return jornadas, viajes, cursor.fetchall()
+
+
+def _borrar():
+    with db.conexion() as conn:
+        cursor = conn.cursor()
+        for tabla in ("temperaturas", "viajes", "jornadas"):
+            cursor.execute(f"DELETE FROM {tabla} WHERE clave_descarga = %s", (CLAVE,))
+        cursor.execute("DELETE FROM descargas WHERE clave = %s", (CLAVE,))
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("08:15:00", time(8, 15)),
+    ("8:15", time(8, 15)),
+    (time(8, 15), time(8, 15)),
+    ("2019-03-04 08:15:00", datetime(2019, 3, 4, 8, 15)),
+    ("04/03/2019 08:15", datetime(2019, 3, 4, 8, 15)),
+])
+def test_hora_acepta_horas_sueltas(valor, esperado):
+    assert importar._hora(valor) == esperado
+
+
+def test_ida_y_vuelta_de_hoja_legada(base_sqlite, tmp_path):
+    legado = tmp_path / "legado.xlsx"
+    _libro(legado, HOJAS_LEGADO)
+    resumen = importar.importar(str(legado))
+    assert resumen["filas"] == {"descargas": 1, "jornadas": 1, "viajes": 2, "temperaturas": 2}
+
+    jornadas, viajes, lecturas = _guardado()
+    dia, siguiente = date(2019, 3, 4), date(2019, 3, 5)
+    assert jornadas == [(datetime.combine(dia, time(20)), datetime.combine(siguiente, time(4, 30)))]
+    # Antes del inicio de la jornada (20:00) es del día siguiente
+    assert viajes[0][1] == datetime.combine(dia, time(21, 10))
+    assert viajes[0][4] == datetime.combine(dia, time(22, 5))
+    assert viajes[0][7] == datetime.combine(siguiente, time(0, 20))
+    assert viajes[1][1:4] == (datetime.combine(siguiente, time(1, 5)),) + (datetime.combine(siguiente, time(1, 35)),) * 2
+    assert viajes[1][4] is None
+    # Con jornada se corre como las demás; sin jornada, la fecha de la descarga
+    assert lecturas == [("B1", datetime.combine(siguiente, time(2))), ("B2", datetime.combine(dia, time(9, 30)))]
+
+    # La exportación actual se vuelve a importar igual
+    exportado = tmp_path / "exportado.xlsx"
+    exportar.escribir("XLSX", str(exportado), claves=[CLAVE])
+    _borrar()
+    importar.importar(str(exportado))
+    assert _guardado() == (jornadas, viajes, lecturas)
+    _borrar()
+
+
+def test_hora_suelta_sin_fecha_es_error(base_sqlite, tmp_path):
+    hojas = {
+        "Descargas": [["clave", "barco", "lote", "fecha"], [CLAVE, "LEGADO", "1", None]],
+        "Temperaturas": [
+            ["hora_medicion", "especie", "talla", "temperatura", "clave_descarga"],
+            ["02:00:00", "SKIPJACK", "3-4", -18.5, CLAVE],
+        ],
+    }
+    archivo = tmp_path / "sin_fecha.xlsx"
+    _libro(archivo, hojas)
+    with pytest.raises(importar.ImportacionError) as error:
+        importar.importar(str(archivo))
+    assert error.value.errores == [
+        "Temperaturas, fila 2: hora_medicion trae solo la hora (02:00:00) y no hay fecha de jornada ni de descarga."
+    ]
@@ -0,0 +1,36 @@
+from datetime import datetime, time
+
+import pandas as pd
+
+import temperaturas
+
+INICIO = datetime(2024, 2, 10, 20, 0)
+
+
+def _lote(*horas):
+    return pd.DataFrame({
+        "hora": pd.Series(horas, dtype="object"),
+        "especie": ["SKIPJACK"] * len(horas),
+        "talla": ["3-4"] * len(horas),
+        "temperatura": [-18.0] * len(horas),
+    })
+
+
+def test_horas_como_texto_o_time_toman_la_fecha_de_la_jornada():
+    registros, errores = temperaturas.validar_lote(
+        _lote("21:30", time(22, 15), "01:05:00", None), "B1", "Puerto", time(23, 0), INICIO,
+    )
+    assert errores == []
+    assert [r[0] for r in registros] == [
+        datetime(2024, 2, 10, 21, 30),
+        datetime(2024, 2, 10, 22, 15),
+        # Antes del inicio de la jornada: el turno cruzó la medianoche
+        datetime(2024, 2, 11, 1, 5),
+        datetime(2024, 2, 10, 23, 0),
+    ]
+
+
+def test_hora_ilegible_es_error_de_la_fila():
+    registros, errores = temperaturas.validar_lote(_lote("21:30", "mañana"), "B1", "Puerto", time(23, 0), INICIO)
+    assert errores == ["Fila 2: hora inválida (mañana)."]
+    assert len(registros) == 1
@@ -0,0 +1,35 @@
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import streamlit as st
+
+# Procesos para el trabajo pesado de CPU (exportaciones, análisis). Mientras uno de
+# ellos arma un Excel, el proceso de Streamlit sigue atendiendo los clics de las
+# demás sesiones en vez de pelear con él por el GIL. 0 = todo en el proceso actual.
+PROCESOS = int(os.getenv("TRABAJOS_PROCESOS", "0"))
+
+
+@st.cache_resource(show_spinner=False)
+def pool():
+    # "spawn": el proceso de Streamlit tiene hilos (escritor, sincronizador, pool de
+    # conexiones) que un fork copiaría en cualquier estado
+    ejecutor = ProcessPoolExecutor(PROCESOS, mp_context=multiprocessing.get_context("spawn"))
+    atexit.register(ejecutor.shutdown, cancel_futures=True)
+    return ejecutor
+
+
+def ejecutar(funcion, *args, **kwargs):
+    """Devuelve ``funcion(*args, **kwargs)``, calculado en el pool si TRABAJOS_PROCESOS lo activa.
+
+    ``funcion`` tiene que ser de nivel de módulo, y sus argumentos y resultado
+    serializables con pickle. Un ``progreso`` no cruza al otro proceso: en el
+    pool se descarta.
+    """
+    if not PROCESOS:
+        return funcion(*args, **kwargs)
+    kwargs.pop("progreso", None)
+    # Un proceso nuevo importa el __main__ del padre (App.py) como __mp_main__, que
+    # solo dibuja la página bajo __main__; la función llega por su nombre de módulo
+    return pool().submit(funcion, *args, **kwargs).result()
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import db
+from db import conexion
+
+# Máquina de estados de un viaje: estado actual -> (estado siguiente, columnas de hora que se marcan)
+TRANSICIONES = {
+    "CARGUE": ("TRANSITO", ["hora_fin_cargue", "hora_inicio_transito"]),
+    "TRANSITO": ("EN ESPERA", ["hora_llegada_planta"]),
+    "EN ESPERA": ("DESCARGA", ["hora_ingreso_planta"]),
+    "DESCARGA": ("EN DESCARGA", ["hora_inicio_descarga"]),
+    "EN DESCARGA": ("FINALIZADO", ["hora_fin_descarga"]),
+}
+ESTADOS = list(TRANSICIONES) + ["FINALIZADO"]
+
+# Cupos de CARGUE simultáneos por jornada; el índice único sobre (id_jornada, cupo_cargue) los hace cumplir
+CUPOS_CARGUE = 2
+_CUPOS_SQL = " UNION ALL ".join(f"SELECT {n} AS cupo" for n in range(1, CUPOS_CARGUE + 1))
+
+# Mensajes para las restricciones que la base de datos hace cumplir
+_MENSAJES_RESTRICCION = {
+    "uq_viajes_placa_activa": "🚫 Este vehículo ya tiene un viaje activo.",
+    "uq_viajes_cupo_cargue": f"🚧 Solo se permiten {CUPOS_CARGUE} viajes en estado CARGUE simultáneamente.",
+}
+
+
+class ViajeError(Exception):
+    """Operación sobre un viaje rechazada por la máquina de estados o por una restricción."""
+
+
+def crear(id_jornada, clave_descarga, placa, hora=None, cursor=None):
+    """Crea un viaje en CARGUE y devuelve su consecutivo.
+
+    El consecutivo sale del contador de la jornada, que queda bloqueada hasta el
+    commit: dos tabletas no pueden obtener el mismo número. El límite de CARGUE y
+    la placa activa los garantizan índices únicos, no una consulta previa.
+    Con ``cursor`` se escribe en esa transacción (ver escrituras.py).
+    """
+    if cursor is None:
+        with conexion() as conn:
+            return crear(id_jornada, clave_descarga, placa, hora, conn.cursor())
+    hora = hora or datetime.now()
+    try:
+        cursor.execute("""
+            UPDATE jornadas SET ultimo_consecutivo = ultimo_consecutivo + 1
+            WHERE id = %s AND hora_fin IS NULL
+            RETURNING ultimo_consecutivo
+        """, (int(id_jornada),))
+        fila = cursor.fetchone()
+        if fila is None:
+            raise ViajeError("⚠️ La jornada ya fue finalizada.")
+        consecutivo = f"V{fila[0]:03d}"
+        cursor.execute(f"""
+            INSERT INTO viajes (clave_descarga, id_jornada, consecutivo, placa, estado, hora_inicio_cargue, cupo_cargue)
+            SELECT %s, %s, %s, %s, 'CARGUE', %s, c.cupo
+            FROM ({_CUPOS_SQL}) c
+            WHERE c.cupo NOT IN (
+                SELECT cupo_cargue FROM viajes WHERE id_jornada = %s AND cupo_cargue IS NOT NULL
+            )
+            ORDER BY c.cupo
+            LIMIT 1
+            RETURNING id
+        """, (clave_descarga, int(id_jornada), consecutivo, placa, hora, int(id_jornada)))
+        if cursor.fetchone() is None:
+            raise ViajeError(_MENSAJES_RESTRICCION["uq_viajes_cupo_cargue"])
+    except db.ERRORES_UNICIDAD as e:
+        mensaje = _MENSAJES_RESTRICCION.get(db.restriccion_violada(e))
+        if mensaje is None:
+            raise
+        raise ViajeError(mensaje) from e
+    return consecutivo
+
+
+def avanzar(id_viaje, estado_actual, hora=None, cursor=None):
+    """Pasa el viaje al estado siguiente solo si sigue en ``estado_actual``; devuelve el nuevo estado.
+
+    La verificación y el cambio van en un único UPDATE ... WHERE estado = ...,
+    así que si otra tableta ya lo movió la operación se rechaza en lugar de
+    sobrescribir sus horas.
+    """
+    if estado_actual not in TRANSICIONES:
+        raise ViajeError(f"⚠️ Un viaje en estado {estado_actual} no puede avanzar.")
+    if cursor is None:
+        with conexion() as conn:
+            return avanzar(id_viaje, estado_actual, hora, conn.cursor())
+    siguiente, columnas = TRANSICIONES[estado_actual]
+    hora = hora or datetime.now()
+    asignaciones = ", ".join(f"{col} = %s" for col in columnas)
+    cursor.execute(
+        f"UPDATE viajes SET estado = %s, {asignaciones}, cupo_cargue = NULL WHERE id = %s AND estado = %s RETURNING id",
+        (siguiente, *[hora] * len(columnas), int(id_viaje), estado_actual),
+    )
+    if cursor.fetchone() is None:
+        raise ViajeError("⚠️ El viaje ya cambió de estado en otro dispositivo.")
+    return siguiente
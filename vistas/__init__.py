@@ -0,0 +1,50 @@
+import importlib
+
+# Pantallas de la app, un módulo por sección con su función mostrar(). App.py
+# solo arma el menú: el módulo de una sección, y lo que este importa (datos y
+# pandas, plotly, openpyxl, la analítica), se carga la primera vez que alguien
+# la abre en el proceso. La pantalla inicial (crear) no necesita ninguno.
+
+# clave: (etiqueta del menú, módulo de vistas)
+SECCIONES = {
+    "crear": ("🔧 Crear Descarga", "crear"),
+    "jornadas": ("🕒 Jornadas", "jornadas"),
+    "viajes": ("🚛 Viajes", "viajes"),
+    "temperaturas": ("🌡️ Temperaturas", "temperaturas"),
+    "monitoreo": ("📉 Monitoreo", "monitoreo"),
+    "resumen": ("📊 Resumen", "resumen"),
+    "analisis": ("📈 Análisis", "analisis"),
+    "exportar": ("📄 Exportar", "exportar"),
+    "importar": ("📥 Importar", "importar"),
+}
+# Oculta: solo con ?diagnostico=1
+DIAGNOSTICO = ("🩺 Diagnóstico", "diagnostico")
+
+# ==== CSS para botón flotante ====
+BOTON_FLOTANTE = """
+<style>
+.fab {
+    position: fixed;
+    bottom: 30px;
+    right: 30px;
+    background-color: #0e1117;
+    color: white;
+    border-radius: 50%;
+    padding: 16px 20px;
+    font-size: 24px;
+    box-shadow: 0px 4px 12px rgba(0,0,0,0.2);
+    cursor: pointer;
+    z-index: 9999;
+    text-align: center;
+}
+.fab:hover {
+    background-color: #202431;
+}
+</style>
+<a href="?seccion=crear" target="_self" class="fab">＋</a>
+"""
+
+
+def mostrar(modulo):
+    """Dibuja la sección de ``vistas.<modulo>``; importarlo cuesta solo la primera vez."""
+    importlib.import_module(f"{__name__}.{modulo}").mostrar()
@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+import streamlit as st
+
+import datos
+
+
+def mostrar():
+    st.subheader("📈 Análisis de viajes")
+
+    barcos = st.multiselect("Barcos (vacío = todos)", datos.listar_barcos())
+    rango = st.date_input("Fechas de jornada", value=(date.today() - timedelta(days=365), date.today()))
+    desde, hasta = rango if len(rango) == 2 else (None, None)
+
+    analisis = datos.analisis_viajes(tuple(barcos), desde, hasta)
+    if not analisis["viajes"]:
+        st.info("No hay viajes finalizados para estos filtros.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🧾 Viajes finalizados", analisis["viajes"])
+    cuello = analisis["cuello"]
+    if cuello:
+        col2.metric("🐢 Cuello de botella", cuello["eslabon"], f"p50 {cuello['p50']} min · {cuello['participacion']:.0%} del viaje", delta_color="off")
+        col3.metric("🎲 Eslabón más variable", cuello["mas_variable"], f"p90 − p50 = {cuello['dispersion']:.1f} min", delta_color="off")
+
+    st.markdown("### ⏱️ Percentiles por eslabón (minutos)")
+    st.dataframe(analisis["percentiles"], use_container_width=True)
+
+    st.markdown("### 🚚 Viajes terminados por hora")
+    st.bar_chart(analisis["por_hora"].groupby("hora")["viajes"].sum())
+    st.dataframe(analisis["por_jornada"], use_container_width=True)
+
+    st.markdown("### 🚢 Comparación por barco (medianas en minutos)")
+    st.dataframe(analisis["por_barco"], use_container_width=True)
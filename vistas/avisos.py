@@ -0,0 +1,46 @@
+import streamlit as st
+
+# Las escrituras pasan por escrituras.enviar: con ESCRITURAS_ASYNC terminan después,
+# en segundo plano, y su resultado se atiende en el primer rerun que las vea listas.
+
+def avisar(tipo, mensaje, clave="avisos"):
+    st.session_state.setdefault(clave, []).append((tipo, mensaje))
+
+
+def mostrar_avisos(clave="avisos", como_toast=False):
+    for tipo, mensaje in st.session_state.pop(clave, []):
+        if como_toast:
+            st.toast(mensaje)
+        else:
+            getattr(st, tipo)(mensaje)
+
+
+def seguir_escritura(futuro, al_terminar=None, al_fallar=None):
+    st.session_state.setdefault("escrituras", []).append((futuro, al_terminar, al_fallar))
+
+
+def revisar_escrituras():
+    """Atiende las escrituras de esta sesión que ya terminaron; devuelve cuántas siguen pendientes."""
+    pendientes = []
+    for futuro, al_terminar, al_fallar in st.session_state.get("escrituras", []):
+        if not futuro.done():
+            pendientes.append((futuro, al_terminar, al_fallar))
+        elif futuro.exception() is None:
+            if al_terminar:
+                al_terminar(futuro.result())
+        elif al_fallar:
+            al_fallar(futuro.exception())
+        else:
+            avisar("error", f"🚫 No se guardó el cambio: {futuro.exception()}")
+    st.session_state["escrituras"] = pendientes
+    return len(pendientes)
+
+
+@st.fragment(run_every=1)
+def estado_escrituras():
+    # Cambios de esta sesión que aún no llegan a la base y resultado de los que ya llegaron;
+    # App.py lo muestra solo con ESCRITURAS_ASYNC
+    pendientes = revisar_escrituras()
+    if pendientes:
+        st.caption(f"⏳ {pendientes} cambio(s) guardándose…")
+    mostrar_avisos(como_toast=True)
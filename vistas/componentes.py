@@ -0,0 +1,57 @@
+from datetime import datetime, time
+
+import streamlit as st
+
+import datos
+import grillas
+
+
+def selector_descarga(etiqueta, key):
+    """Selectbox de descargas con búsqueda en el servidor; devuelve la clave o None."""
+    texto = st.text_input("🔎 Buscar descarga (clave o barco)", key=f"{key}_buscar")
+    encontradas = datos.buscar_descargas(texto)
+    if not encontradas:
+        st.warning("⚠️ No hay descargas que coincidan." if texto else "⚠️ No hay descargas registradas.")
+        return None
+    if len(encontradas) == datos.LIMITE_BUSQUEDA:
+        st.caption(f"Se muestran las {datos.LIMITE_BUSQUEDA} más recientes; escriba para filtrar.")
+    return st.selectbox(etiqueta, encontradas, key=key)
+
+
+def rango_horas(key, con_hora=True):
+    """Filtro desde/hasta; los extremos sin elegir quedan en None."""
+    columnas = st.columns(4 if con_hora else 2)
+    dia_desde = columnas[0].date_input("Desde", value=None, key=f"{key}_desde")
+    dia_hasta = columnas[-2 if con_hora else 1].date_input("Hasta", value=None, key=f"{key}_hasta")
+    if not con_hora:
+        return dia_desde, dia_hasta
+    hora_desde = columnas[1].time_input("Hora desde", value=None, key=f"{key}_hora_desde")
+    hora_hasta = columnas[3].time_input("Hora hasta", value=None, key=f"{key}_hora_hasta")
+    return (
+        datetime.combine(dia_desde, hora_desde or time.min) if dia_desde else None,
+        datetime.combine(dia_hasta, hora_hasta or time.max) if dia_hasta else None,
+    )
+
+
+def grilla(nombre, clave_descarga, filtros, key):
+    """Grilla paginada en el servidor: trae solo la página visible (ver grillas.py)."""
+    definicion = grillas.GRILLAS[nombre]
+    col1, col2 = st.columns([3, 1])
+    orden = col1.selectbox("Ordenar por", list(definicion["orden"]), format_func=definicion["orden"].get, key=f"{key}_orden")
+    descendente = col2.toggle("Descendente", value=definicion["por_defecto"][1], key=f"{key}_descendente")
+
+    # Pila con la marca de inicio de cada página visitada; vuelve a la primera si cambia la consulta
+    consulta = (clave_descarga, repr(filtros), orden, descendente)
+    estado = st.session_state.get(key)
+    if estado is None or estado["consulta"] != consulta:
+        estado = st.session_state[key] = {"consulta": consulta, "marcas": [None]}
+    marcas = estado["marcas"]
+    filas, siguiente = datos.pagina_grilla(nombre, clave_descarga, filtros, orden, descendente, marcas[-1])
+    total = datos.total_grilla(nombre, clave_descarga, filtros)
+
+    st.dataframe(filas, use_container_width=True, hide_index=True)
+    col1, col2, col3 = st.columns([1, 2, 1])
+    col1.button("⬅️ Anterior", key=f"{key}_anterior", disabled=len(marcas) == 1, on_click=marcas.pop)
+    paginas = max(1, -(-total // grillas.FILAS_POR_PAGINA))
+    col2.caption(f"Página {len(marcas)} de {paginas} · {total} filas")
+    col3.button("Siguiente ➡️", key=f"{key}_siguiente", disabled=siguiente is None, on_click=marcas.append, args=(siguiente,))
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import streamlit as st
+
+import descargas
+import escrituras
+from vistas.avisos import avisar, mostrar_avisos, seguir_escritura, revisar_escrituras
+
+
+def mostrar():
+    st.subheader("Registrar nueva descarga")
+    st.markdown('<div id="registrar-descarga"></div>', unsafe_allow_html=True)
+    barco = st.text_input("Nombre del barco", key="barco_input")
+    lote = st.text_input("Lote", key="lote_input")
+    fecha = st.date_input("Fecha", value=datetime.today(), key="fecha_input")
+    if st.button("Crear descarga", key="crear_descarga_btn"):
+        if not barco or not lote:
+            st.warning("⚠️ Debe ingresar el nombre del barco y el lote.")
+        else:
+            # La pantalla inicial no lee nada de la base; datos (y con él pandas) se
+            # importa recién aquí, para invalidar la lista de descargas
+            import datos
+
+            futuro = escrituras.enviar(descargas.crear, barco, lote, fecha, despues=lambda _: datos.invalidar_descargas())
+            seguir_escritura(futuro, lambda clave: avisar("success", f"✅ Descarga registrada con clave: {clave}"))
+            revisar_escrituras()
+    mostrar_avisos()
@@ -0,0 +1,42 @@
+import os
+
+import streamlit as st
+
+import db
+import instrumentacion
+import sincronizacion
+
+
+def mostrar():
+    st.subheader("🩺 Diagnóstico")
+    worker = os.getenv("SERVIDOR_WORKER")
+    st.caption("Mediciones de este proceso desde que arrancó (o desde el último reinicio)."
+               + (f" Worker {worker} (ver servidor.py)." if worker else ""))
+
+    reruns = instrumentacion.eventos("rerun")
+    contadores = instrumentacion.contadores()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Reruns medidos", len(reruns))
+    if reruns:
+        tiempos = sorted(e["ms"] for e in reruns)
+        col2.metric("Rerun p50 (ms)", round(tiempos[len(tiempos) // 2], 1))
+        col3.metric("Rerun p95 (ms)", round(tiempos[int(len(tiempos) * 0.95)], 1))
+    col4.metric("Conexiones abiertas", int(contadores.get("conexiones_abiertas", 0)))
+    if db.es_sqlite() and sincronizacion.ACTIVO:
+        st.caption(f"Outbox pendiente de sincronizar: {sincronizacion.iniciar().pendientes() or 'vacío'}")
+
+    st.markdown("### 🐢 Consultas más lentas (tiempo total)")
+    st.dataframe(instrumentacion.totales("consulta")[:25], use_container_width=True)
+
+    st.markdown("### 🧩 Secciones y tramos")
+    tramos = [t for t in instrumentacion.totales() if t["tipo"] != "consulta"]
+    st.dataframe(tramos, use_container_width=True)
+
+    st.markdown("### 🕒 Últimos reruns")
+    st.dataframe(list(reversed(reruns[-50:])), use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    col1.download_button("📥 Métricas Prometheus", instrumentacion.prometheus(), file_name="metrics.txt")
+    if col2.button("🔄 Reiniciar mediciones", key="reiniciar_diagnostico_btn"):
+        instrumentacion.reiniciar()
+        st.rerun()
@@ -0,0 +1,54 @@
+import os
+from datetime import date
+
+import streamlit as st
+
+import datos
+import exportar
+import trabajos
+
+
+def mostrar():
+    st.subheader("📄 Exportar bitácora")
+
+    # Filtros: sin selección se exporta todo
+    # Las opciones salen de la búsqueda; las ya elegidas se conservan al cambiar el texto
+    texto = st.text_input("🔎 Buscar descargas (clave o barco)", key="exportar_buscar")
+    elegidas = st.session_state.get("exportar_claves", [])
+    opciones = list(dict.fromkeys(elegidas + datos.buscar_descargas(texto)))
+    claves = st.multiselect("Descargas a exportar (vacío = todas)", opciones, key="exportar_claves")
+    filtrar_fechas = st.checkbox("Filtrar por fecha de descarga")
+    desde = hasta = None
+    if filtrar_fechas:
+        rango = st.date_input("Rango de fechas", value=(date.today(), date.today()))
+        if len(rango) == 2:
+            desde, hasta = rango
+    formato = st.radio("Formato", list(exportar.FORMATOS), horizontal=True)
+
+    # La exportación solo se arma al pulsar el botón
+    if st.button("⚙️ Generar exportación", key="generar_export_btn"):
+        barra = st.progress(0.0, text="Exportando...")
+        # Con TRABAJOS_PROCESOS se arma en otro proceso (sin barra de avance)
+        ruta, nombre, mime = trabajos.ejecutar(
+            exportar.exportar, formato, claves=claves, desde=desde, hasta=hasta,
+            progreso=lambda n: barra.progress(n / len(exportar.TABLAS), text="Exportando..."),
+        )
+        barra.empty()
+        _descartar()
+        st.session_state["exportacion"] = (ruta, nombre, mime)
+
+    # La sesión guarda solo la ruta del temporal; el archivo se lee al dibujar el botón
+    # y se borra al descargarlo
+    if "exportacion" in st.session_state:
+        ruta, nombre, mime = st.session_state["exportacion"]
+        if os.path.exists(ruta):
+            with open(ruta, "rb") as archivo:
+                st.download_button(f"📥 Descargar {nombre}", archivo, file_name=nombre, mime=mime, on_click=_descartar)
+        else:
+            del st.session_state["exportacion"]
+            st.info("ℹ️ La exportación venció; vuelva a generarla.")
+
+
+def _descartar():
+    if "exportacion" in st.session_state:
+        exportar.descartar(st.session_state.pop("exportacion")[0])
@@ -0,0 +1,45 @@
+import streamlit as st
+
+import datos
+import importar
+
+
+def mostrar():
+    st.subheader("📥 Importar bitácoras históricas")
+    st.caption(
+        "Mismo formato que la exportación: un libro XLSX con las hojas Descargas, Jornadas, Viajes y "
+        "Temperaturas, o un ZIP con un CSV por hoja. Las descargas que ya existen se omiten."
+    )
+    archivo = st.file_uploader("Archivo", type=["xlsx", "zip"], key="importar_archivo")
+    simular = st.checkbox("Solo validar (no guarda nada)", key="importar_simular")
+
+    if archivo is not None and st.button("📥 Importar", key="importar_btn"):
+        hojas = [hoja for hoja, *_ in importar.HOJAS]
+        barra = st.progress(0.0, text="Importando...")
+        try:
+            resumen = importar.importar(
+                archivo, simular=simular,
+                progreso=lambda hoja, filas: barra.progress(hojas.index(hoja) / len(hojas), text=f"{hoja}: {filas:,} filas"),
+            )
+        except importar.ImportacionError as e:
+            barra.empty()
+            st.error(str(e))
+            st.markdown("\n".join(f"- {error}" for error in e.errores))
+            return
+        except ValueError as e:
+            barra.empty()
+            st.error(str(e))
+            return
+        barra.empty()
+        if not simular:
+            datos.invalidar_importacion()
+        filas = ", ".join(f"{tabla} {n or 0:,}" for tabla, n in resumen["filas"].items())
+        if simular:
+            st.info(f"🧪 El archivo es válido ({filas}); no se guardó nada.")
+        else:
+            st.success(f"✅ Importado en {resumen['segundos']:.1f} s: {filas}")
+        if resumen["descargas_omitidas"]:
+            st.warning(
+                f"ℹ️ {len(resumen['descargas_omitidas'])} descarga(s) ya existían y se omitieron con "
+                f"{resumen['filas_omitidas']:,} filas: {', '.join(resumen['descargas_omitidas'][:10])}"
+            )
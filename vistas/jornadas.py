@@ -0,0 +1,36 @@
+import streamlit as st
+
+import datos
+import descargas
+from vistas.componentes import selector_descarga, rango_horas, grilla
+
+
+def mostrar():
+    st.subheader("Jornadas")
+    clave_sel = selector_descarga("Selecciona descarga", key="clave_descarga_jornada")
+
+    if clave_sel:
+
+        if st.button("🟢 Iniciar jornada para descarga", key="iniciar_jornada_btn"):
+            # Las jornadas se escriben en línea: lo que sigue en pantalla depende del resultado
+            if not descargas.iniciar_jornada(clave_sel):
+                st.warning("⚠️ Ya existe una jornada abierta para esta descarga. Finalízala antes de iniciar una nueva.")
+            else:
+                datos.invalidar_jornadas(clave_sel)
+                st.success("✅ Jornada iniciada.")
+                st.rerun()
+
+        abiertas = datos.jornadas_abiertas()
+        jornada_abierta = abiertas[abiertas["clave_descarga"] == clave_sel]
+        if not jornada_abierta.empty:
+            jornada_id = jornada_abierta.iloc[0]["id"]
+            if st.button("🛑 Finalizar jornada actual", key="finalizar_jornada_btn"):
+                descargas.finalizar_jornada(jornada_id)
+                datos.invalidar_jornadas(clave_sel)
+                st.success("✅ Jornada finalizada.")
+                st.rerun()
+        else:
+            st.info("ℹ️ No hay jornadas abiertas para esta descarga.")
+
+        filtros = {"fecha": rango_horas("filtro_jornadas", con_hora=False)}
+        grilla("jornadas", clave_sel, filtros, key="grilla_jornadas")
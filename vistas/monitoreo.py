@@ -0,0 +1,106 @@
+import streamlit as st
+
+import datos
+import escrituras
+import temperaturas
+from vistas.avisos import avisar, mostrar_avisos, seguir_escritura, revisar_escrituras
+from vistas.componentes import selector_descarga
+
+
+def grafico_temperaturas(serie, umbrales=None):
+    """Promedio de cada serie como línea y mínima–máxima como banda; Planta con línea punteada."""
+    import plotly.colors
+    import plotly.graph_objects as go
+
+    colores = plotly.colors.qualitative.Plotly
+    figura = go.Figure()
+    nombres = list(dict.fromkeys(serie["serie"]))
+    for (nombre, lugar), puntos in serie.groupby(["serie", "lugar"], observed=True):
+        color = colores[nombres.index(nombre) % len(colores)]
+        banda = "rgba({}, {}, {}, 0.15)".format(*plotly.colors.hex_to_rgb(color))
+        grupo = f"{nombre} · {lugar}"
+        figura.add_trace(go.Scatter(
+            x=puntos["hora"], y=puntos["maxima"], mode="lines", line=dict(width=0),
+            legendgroup=grupo, showlegend=False, hoverinfo="skip",
+        ))
+        figura.add_trace(go.Scatter(
+            x=puntos["hora"], y=puntos["minima"], mode="lines", line=dict(width=0), fill="tonexty",
+            fillcolor=banda, legendgroup=grupo, showlegend=False, hoverinfo="skip",
+        ))
+        figura.add_trace(go.Scatter(
+            x=puntos["hora"], y=puntos["promedio"], mode="lines", name=grupo, legendgroup=grupo,
+            line=dict(color=color, dash="solid" if lugar == "Puerto" else "dash"),
+            customdata=puntos[["minima", "maxima", "lecturas"]],
+            hovertemplate="%{y:.1f} °C (%{customdata[0]:.1f} a %{customdata[1]:.1f}, %{customdata[2]} lecturas)",
+        ))
+    if umbrales is not None:
+        for fila in umbrales[umbrales["especie"].isin(nombres)].itertuples():
+            color = colores[nombres.index(fila.especie) % len(colores)]
+            figura.add_hline(y=fila.temperatura_max, line_dash="dot", line_color=color,
+                             annotation_text=f"máx. {fila.especie}")
+    figura.update_layout(yaxis_title="°C", hovermode="x unified", margin=dict(t=30, b=10))
+    st.plotly_chart(figura, use_container_width=True)
+
+
+def mostrar():
+    st.subheader("📉 Monitoreo de temperaturas")
+    clave_sel = selector_descarga("Selecciona la descarga", key="clave_descarga_monitoreo")
+    if not clave_sel:
+        return
+
+    col1, col2 = st.columns(2)
+    agrupar = col1.radio("Series por", temperaturas.SERIES, format_func=str.capitalize, horizontal=True, key="monitoreo_agrupar")
+    lugares = col2.multiselect("Lugar", temperaturas.LUGARES, default=temperaturas.LUGARES, key="monitoreo_lugares")
+
+    # La base entrega la serie ya reducida a intervalos (ver repositorio.serie_temperaturas)
+    segundos, serie = datos.serie_temperaturas(clave_sel, agrupar)
+    serie = serie[serie["lugar"].isin(lugares)]
+    if serie.empty:
+        st.info("ℹ️ No hay lecturas de temperatura para esta descarga.")
+    else:
+        st.caption(
+            f"{int(serie['lecturas'].sum()):,} lecturas en intervalos de {segundos // 60} min: "
+            "promedio de cada intervalo (línea) y su mínima y máxima (banda)."
+        )
+        grafico_temperaturas(serie, datos.umbrales_temperatura() if agrupar == "especie" else None)
+        st.markdown("### 🏭 Puerto vs Planta")
+        st.dataframe(temperaturas.comparar_lugares(serie), use_container_width=True)
+
+    st.markdown("### 🚨 Alertas de cadena de frío")
+    revisar_escrituras()
+    pendientes, total, sin_revisar = datos.alertas_temperatura(clave_sel)
+    if not sin_revisar:
+        st.success(f"✅ Sin alertas pendientes ({total} revisadas).")
+    else:
+        st.caption(f"{sin_revisar} sin revisar de {total}" + (f"; se muestran las {len(pendientes)} más recientes." if len(pendientes) < sin_revisar else "."))
+        st.dataframe(pendientes, use_container_width=True, hide_index=True)
+        if st.button("✔️ Marcar todas como revisadas", key="revisar_alertas_btn"):
+            futuro = escrituras.enviar(temperaturas.revisar_alertas, clave_sel, despues=lambda _: datos.invalidar_alertas(clave_sel))
+            seguir_escritura(futuro, lambda n: avisar("success", f"✅ {n} alerta(s) marcadas como revisadas."))
+            st.rerun()
+    mostrar_avisos()
+
+    with st.expander("⚙️ Umbrales por especie"):
+        st.caption("Cada lectura nueva se compara con el umbral de su especie al guardarse. "
+                   "Un cambio vale para las lecturas que vengan; las anteriores se comparan solo al reevaluar.")
+        umbrales = st.data_editor(
+            datos.umbrales_temperatura(), num_rows="dynamic", use_container_width=True, key="editor_umbrales",
+            column_config={
+                "especie": st.column_config.SelectboxColumn("Especie", options=temperaturas.ESPECIES, required=True),
+                "temperatura_max": st.column_config.NumberColumn("Máxima (°C)", step=0.5, required=True),
+                "temperatura_min": st.column_config.NumberColumn("Mínima (°C, opcional)", step=0.5),
+            },
+        )
+        col1, col2 = st.columns(2)
+        if col1.button("💾 Guardar umbrales", key="guardar_umbrales_btn"):
+            filas, errores = temperaturas.validar_umbrales(umbrales)
+            for error in errores:
+                st.error(f"🚫 {error}")
+            if not errores:
+                temperaturas.guardar_umbrales(filas)
+                datos.invalidar_umbrales()
+                st.success("✅ Umbrales guardados.")
+        if col2.button("🔁 Reevaluar esta descarga", key="reevaluar_alertas_btn"):
+            temperaturas.reevaluar_alertas(clave_sel)
+            datos.invalidar_alertas(clave_sel)
+            st.rerun()
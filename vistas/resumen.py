@@ -0,0 +1,45 @@
+import streamlit as st
+
+import datos
+
+
+def mostrar():
+    st.subheader("📊 Resumen de Operaciones")
+
+    # Combinaciones barco/fecha/lote que tienen viajes finalizados
+    opciones = datos.opciones_resumen()
+
+    if opciones.empty:
+        st.info("No hay viajes finalizados para mostrar.")
+    else:
+        # Filtro por barco
+        barcos = opciones["barco"].unique()
+        barco_sel = st.selectbox("Selecciona un barco", sorted(barcos))
+        opciones_barco = opciones[opciones["barco"] == barco_sel]
+
+        # Filtro por fecha
+        fechas = opciones_barco["fecha"].unique()
+        fecha_sel = st.selectbox("Selecciona una fecha", sorted(fechas, reverse=True))
+        opciones_fecha = opciones_barco[opciones_barco["fecha"] == fecha_sel]
+
+        # Filtro por lote
+        lotes = opciones_fecha["lote"].unique()
+        lote_sel = st.selectbox("Selecciona un lote", sorted(lotes))
+
+        # Conteos y promedios calculados en la base de datos
+        viajes_por_vehiculo, promedios = datos.resumen_operaciones(barco_sel, fecha_sel, lote_sel)
+
+        st.metric("🧾 Total de viajes", int(viajes_por_vehiculo["# Viajes"].sum()))
+
+        # Viajes por vehículo
+        st.markdown("### 🚛 Viajes por vehículo")
+        st.dataframe(viajes_por_vehiculo, use_container_width=True)
+
+        # Promedios de tiempos
+        st.markdown("### ⏱️ Tiempos promedio por eslabón (minutos)")
+        st.dataframe(promedios, use_container_width=True)
+
+        # Detalle por viaje (solo se consulta si se pide)
+        if st.toggle("🔍 Ver detalle por viaje"):
+            detalle = datos.resumen_viajes_por_fecha(barco_sel, fecha_sel, lote_sel)
+            st.dataframe(detalle[["consecutivo", "placa"] + datos.ESLABONES], use_container_width=True)
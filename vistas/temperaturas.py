@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import streamlit as st
+
+import datos
+import escrituras
+import temperaturas
+from vistas.avisos import avisar, mostrar_avisos, seguir_escritura, revisar_escrituras
+from vistas.componentes import selector_descarga, rango_horas, grilla
+
+
+def mostrar():
+    st.subheader("🌡️ Registro de Temperaturas")
+
+    # Selección de descarga
+    clave_sel = selector_descarga("Selecciona la descarga", key="clave_descarga_temperaturas")
+
+    if clave_sel:
+
+        # Obtener jornadas relacionadas
+        jornadas = datos.jornadas_por_descarga(clave_sel)
+
+        # Las alertas las genera la base al guardar cada lectura (ver migraciones.py)
+        _, _, sin_revisar = datos.alertas_temperatura(clave_sel)
+        if sin_revisar:
+            st.warning(f"🚨 {sin_revisar} lectura(s) fuera del umbral de su especie sin revisar (ver 📉 Monitoreo).")
+
+        if not jornadas:
+            st.info("ℹ️ No hay jornadas registradas para esta descarga.")
+        else:
+            jornada_id = st.selectbox("Selecciona la jornada", list(jornadas))
+
+            # Lote de lecturas: se editan localmente y se guardan todas juntas.
+            # Primero se atienden las escrituras terminadas, que pueden reponer el editor.
+            revisar_escrituras()
+            version = st.session_state.setdefault("lote_temperaturas_version", 0)
+            with st.form("lote_temperaturas"):
+                col1, col2, col3 = st.columns(3)
+                bodega = col1.text_input("Bodega")
+                lugar = col2.radio("Lugar de medición", temperaturas.LUGARES, horizontal=True)
+                hora = col3.time_input("Hora de medición", value=datetime.now().time())
+                lote = st.data_editor(
+                    # Si el último guardado falló, el editor vuelve con esas lecturas
+                    st.session_state.get("lote_temperaturas_no_guardado", temperaturas.lote_vacio()),
+                    num_rows="dynamic",
+                    use_container_width=True,
+                    key=f"editor_temperaturas_{version}",
+                    column_config={
+                        "hora": st.column_config.TimeColumn("Hora (opcional)", format="HH:mm"),
+                        "especie": st.column_config.SelectboxColumn("Especie", options=temperaturas.ESPECIES, required=True),
+                        "talla": st.column_config.SelectboxColumn("Talla", options=temperaturas.TALLAS, required=True),
+                        "temperatura": st.column_config.NumberColumn("Temperatura (°C)", step=0.1, required=True),
+                    },
+                )
+                guardar = st.form_submit_button("💾 Guardar lecturas")
+
+            if guardar:
+                registros, errores = temperaturas.validar_lote(lote, bodega, lugar, hora, jornadas[jornada_id])
+                if errores:
+                    for error in errores:
+                        st.error(f"🚫 {error}")
+                else:
+                    st.session_state.pop("lote_temperaturas_no_guardado", None)
+
+                    def al_fallar(error, lote=lote):
+                        st.session_state["lote_temperaturas_no_guardado"] = lote
+                        st.session_state["lote_temperaturas_version"] += 1
+                        avisar("error", f"🚫 No se guardaron las lecturas: {error}")
+
+                    futuro = escrituras.enviar(
+                        temperaturas.guardar_lote, registros, clave_sel, jornada_id,
+                        despues=lambda _: datos.invalidar_temperaturas(clave_sel),
+                    )
+                    seguir_escritura(futuro, lambda n: avisar("success", f"✅ {n} lecturas guardadas exitosamente."), al_fallar)
+                    # El editor se vacía ya; si la escritura falla, al_fallar lo repone
+                    st.session_state["lote_temperaturas_version"] = version + 1
+                    st.rerun()
+
+            mostrar_avisos()
+
+            # Registros anteriores, paginados y filtrados en la base
+            st.markdown("### 📋 Registros guardados")
+            col1, col2, col3 = st.columns(3)
+            filtros = {
+                "bodega": col1.text_input("Bodega contiene", key="filtro_temperaturas_bodega"),
+                "especie": col2.multiselect("Especie", temperaturas.ESPECIES, key="filtro_temperaturas_especie"),
+                "lugar": col3.selectbox("Lugar", [None] + temperaturas.LUGARES, format_func=lambda l: l or "Todos", key="filtro_temperaturas_lugar"),
+                "hora_medicion": rango_horas("filtro_temperaturas"),
+            }
+            grilla("temperaturas", clave_sel, filtros, key="grilla_temperaturas")
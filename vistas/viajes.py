@@ -0,0 +1,161 @@
+import os
+from datetime import datetime
+
+import streamlit as st
+
+import datos
+import escrituras
+import instrumentacion
+import viajes
+from vistas.avisos import avisar, mostrar_avisos, seguir_escritura, revisar_escrituras
+from vistas.componentes import rango_horas, grilla
+
+REFRESCO_VIAJES = int(os.getenv("VIAJES_REFRESCO_SEG", "5"))
+
+
+def mostrar():
+    st.subheader("Gestión de viajes")
+    
+    # Jornadas abiertas con el barco/lote/fecha de su descarga
+    jornadas_detalle = datos.jornadas_abiertas().rename(columns={"id": "id_jornada"})
+
+    if jornadas_detalle.empty:
+        st.info("ℹ️ No hay jornadas abiertas actualmente.")
+    else:
+
+        # Crear columna combinada para mostrar en el selectbox
+        jornadas_detalle["label"] = jornadas_detalle.apply(
+            lambda row: f"{row['barco_descarga']} - Lote {row['lote_descarga']} ({row['fecha_descarga']}) [Jornada ID {row['id_jornada']}]",
+            axis=1
+        )
+
+        # Selector de jornada
+        seleccion = st.selectbox("Selecciona una jornada abierta (por barco/lote)", jornadas_detalle["label"])
+        jornada_info = jornadas_detalle[jornadas_detalle["label"] == seleccion].iloc[0]
+        jornada_id = int(jornada_info["id_jornada"])
+        clave_desc = jornada_info["clave_descarga"]
+
+        panel_viajes(jornada_id, clave_desc)
+
+        with st.expander("📚 Historial de viajes de la descarga"):
+            col1, col2 = st.columns(2)
+            filtros = {
+                "estado": col1.multiselect("Estado", viajes.ESTADOS, key="filtro_viajes_estado"),
+                "placa": col2.text_input("Placa contiene", key="filtro_viajes_placa"),
+                "hora_inicio_cargue": rango_horas("filtro_viajes"),
+            }
+            grilla("viajes", clave_desc, filtros, key="grilla_viajes")
+
+
+# Botón de cada estado: (etiqueta, prefijo de key)
+BOTONES_ESTADO = {
+    "CARGUE": ("✅ Fin Cargue", "fc"),
+    "TRANSITO": ("🏁 Llegada Planta", "t"),
+    "EN ESPERA": ("🏭 Ingreso Planta", "e"),
+    "DESCARGA": ("🚚 Inicio Descarga", "id"),
+    "EN DESCARGA": ("📦 Fin Descarga", "fd"),
+}
+
+
+# Los botones cambian el tablero de la sesión al instante (de forma optimista) y
+# envían la escritura; si falla se descarta ese cambio y se vuelve a leer la jornada.
+
+def _descartar_tablero(jornada_id):
+    datos.invalidar_viajes(jornada_id)
+    st.session_state.pop(f"tablero_viajes_{jornada_id}", None)
+
+
+def crear_viaje(jornada_id, clave_desc):
+    placa = st.session_state.get(f"placa_viaje_{jornada_id}", "").strip().upper()
+    if not placa:
+        avisar("warning", "⚠️ Debe ingresar la placa del vehículo.", "avisos_viajes")
+        return
+    hora = datetime.now()
+    tablero = st.session_state.get(f"tablero_viajes_{jornada_id}")
+    # Fila provisional con id negativo hasta que la escritura traiga la real
+    provisional = -int(hora.timestamp() * 1000)
+    if tablero is not None:
+        tablero["filas"][provisional] = {"id": provisional, "consecutivo": "⏳", "placa": placa, "estado": "CARGUE", "hora_inicio_cargue": hora}
+
+    def quitar_provisional():
+        if tablero is not None:
+            tablero["filas"].pop(provisional, None)
+
+    def al_terminar(consecutivo):
+        quitar_provisional()
+        avisar("success", f"✅ Viaje {consecutivo} creado.", "avisos_viajes")
+
+    def al_fallar(error):
+        quitar_provisional()
+        avisar("error", str(error) if isinstance(error, viajes.ViajeError) else f"🚫 No se creó el viaje: {error}", "avisos_viajes")
+
+    futuro = escrituras.enviar(viajes.crear, jornada_id, clave_desc, placa, hora, despues=lambda _: datos.invalidar_viajes(jornada_id))
+    seguir_escritura(futuro, al_terminar, al_fallar)
+
+
+def avanzar_viaje(jornada_id, id_viaje, estado):
+    hora = datetime.now()
+    id_viaje = int(id_viaje)
+    siguiente, columnas = viajes.TRANSICIONES[estado]
+    tablero = st.session_state.get(f"tablero_viajes_{jornada_id}")
+    fila = None
+    if tablero is not None and id_viaje in tablero["filas"]:
+        fila = None if siguiente == "FINALIZADO" else {**tablero["filas"][id_viaje], "estado": siguiente, **{col: hora for col in columnas}}
+        # Se mantiene sobre las lecturas hasta que la escritura termine
+        tablero.setdefault("optimistas", {})[id_viaje] = fila
+        if fila is None:
+            tablero["filas"].pop(id_viaje)
+        else:
+            tablero["filas"][id_viaje] = fila
+
+    def al_terminar(_):
+        # Solo si no hubo otro clic después sobre el mismo viaje
+        if tablero is not None and tablero.get("optimistas", {}).get(id_viaje, False) is fila:
+            tablero["optimistas"].pop(id_viaje)
+
+    def al_fallar(error):
+        _descartar_tablero(jornada_id)
+        if isinstance(error, viajes.ViajeError):
+            avisar("warning", str(error), "avisos_viajes")
+        else:
+            avisar("error", f"🚫 No se guardó el cambio de estado: {error}", "avisos_viajes")
+
+    futuro = escrituras.enviar(
+        viajes.avanzar, id_viaje, estado, hora,
+        despues=lambda nuevo: datos.invalidar_viajes(jornada_id, finalizado=nuevo == "FINALIZADO"),
+    )
+    seguir_escritura(futuro, al_terminar, al_fallar)
+
+
+# Los viajes activos se refrescan solos cada REFRESCO_VIAJES segundos. Los botones
+# escriben en su callback y solo re-ejecutan este fragmento, que trae únicamente
+# las filas modificadas desde la última marca; no hay st.rerun() de toda la app.
+@st.fragment(run_every=REFRESCO_VIAJES)
+@instrumentacion.medido("fragmento", "viajes")
+def panel_viajes(jornada_id, clave_desc):
+    revisar_escrituras()
+    clave_tablero = f"tablero_viajes_{jornada_id}"
+    tablero = datos.actualizar_tablero(jornada_id, st.session_state.get(clave_tablero))
+    st.session_state[clave_tablero] = tablero
+    df = datos.tablero_a_dataframe(tablero)
+
+    mostrar_avisos("avisos_viajes")
+
+    # Crear nuevo viaje
+    if (df["estado"] == "CARGUE").sum() < 2:
+        st.text_input("Placa del vehículo", key=f"placa_viaje_{jornada_id}")
+        st.button("Crear nuevo viaje", on_click=crear_viaje, args=(jornada_id, clave_desc))
+    else:
+        st.warning("🚧 Solo se permiten 2 viajes en estado CARGUE simultáneamente.")
+
+    for _, row in df.iterrows():
+        st.markdown(f"---\n**{row['consecutivo']} - {row['placa']} - Estado: {row['estado']}**")
+        col1, _ = st.columns(2)
+        if row['id'] < 0:
+            col1.caption("⏳ Guardando…")
+        elif row['estado'] in BOTONES_ESTADO:
+            etiqueta, prefijo = BOTONES_ESTADO[row['estado']]
+            col1.button(etiqueta, key=f"{prefijo}_{row['id']}", on_click=avanzar_viaje, args=(jornada_id, row['id'], row['estado']))
+
+    st.markdown("### 🚚 Viajes activos")
+    st.dataframe(df, use_container_width=True)